@@ -59,6 +59,9 @@ class AppInsightsLogger(LoggerInterface, ObservabilityAbstract):
         mexporter.add_telemetry_processor(self.callback_function)
         stats_module.stats.view_manager.register_exporter(mexporter)
 
+        # measures by metric name, their views are registered once
+        self.measures = {}
+
     def log_metric(
         self, name="", value="", description="", log_parent=False,
     ):
@@ -74,11 +77,39 @@ class AppInsightsLogger(LoggerInterface, ObservabilityAbstract):
             stats_module.stats.stats_recorder.new_measurement_map()
         tag_map = tag_map_module.TagMap()
 
-        measure = measure_module.MeasureFloat(name, description)
-        self.set_view(name, description, measure)
+        measure = self.get_measure(name, description)
         measurement_map.measure_float_put(measure, value)
         measurement_map.record(tag_map)
 
+    def log_metrics(self, metrics):
+        """
+        Sends a batch of custom metrics to appInsights in one measurement,
+        only the last value of each metric is kept by its view
+        :param metrics: metric entries
+        :return:
+        """
+        measurement_map = \
+            stats_module.stats.stats_recorder.new_measurement_map()
+        for metric in metrics:
+            measure = self.get_measure(metric.name, metric.description)
+            measurement_map.measure_float_put(measure, metric.values[-1])
+        measurement_map.record(tag_map_module.TagMap())
+
+    def get_measure(self, name, description):
+        """
+        Gets the measure of a metric, creating it and
+        registering its view on the first call
+        :param name: name of the metric
+        :param description: description of the metric
+        :return: the measure of the metric
+        """
+        measure = self.measures.get(name)
+        if measure is None:
+            measure = measure_module.MeasureFloat(name, description)
+            self.set_view(name, description, measure)
+            self.measures[name] = measure
+        return measure
+
     def log(self, description="", severity=Severity.INFO):
         """
         Sends the logs to App Insights
@@ -88,15 +119,34 @@ class AppInsightsLogger(LoggerInterface, ObservabilityAbstract):
         """
         # Overwrite custom dimensions with caller data
         modulename, filename, lineno = self.get_callee_details(2)
+        span = self.current_span()
+        self.send_log(description, severity, modulename, filename, lineno,
+                      span.name if span is not None else None)
+
+    def log_entries(self, entries):
+        """
+        Sends a batch of logs to App Insights, the process of each
+        log is the span it was logged in, taken from its entry as
+        the current span is the one of the exporter thread
+        :param entries: log entries
+        :return:
+        """
+        for entry in entries:
+            self.send_log(entry.description, entry.severity,
+                          entry.module_name, entry.file_name,
+                          entry.line_number, entry.span_name)
+
+    def send_log(self, description, severity, modulename, filename, lineno,
+                 span_name):
         self.custom_dimensions[self.CUSTOM_DIMENSIONS][self.FILENAME] =\
             filename
         self.custom_dimensions[self.CUSTOM_DIMENSIONS][self.LINENO] =\
             lineno
         self.custom_dimensions[self.CUSTOM_DIMENSIONS][self.MODULE] =\
             modulename
-        if self.current_span() is not None:
+        if span_name is not None:
             self.custom_dimensions[self.CUSTOM_DIMENSIONS][self.PROCESS] =\
-                self.current_span().name
+                span_name
 
         if severity == self.severity.DEBUG:
             self.logger.debug(description, extra=self.custom_dimensions)
@@ -0,0 +1,168 @@
+import atexit
+import threading
+from collections import deque
+
+from .logger_interface import LogEntry, MetricEntry
+
+
+class OverflowPolicy:
+    # wait for the flusher to free space in the queue
+    BLOCK = "block"
+    # drop the oldest queued entry to make space
+    DROP_OLDEST = "drop_oldest"
+
+
+class AsyncExporter:
+    """
+    Queues logs and metrics in memory and sends them
+    to the loggers in batches from a background thread
+    """
+
+    def __init__(self, loggers, max_queue_size=10000, flush_interval=1.0,
+                 overflow_policy=OverflowPolicy.BLOCK, max_batch_size=1000):
+        if overflow_policy not in (OverflowPolicy.BLOCK,
+                                   OverflowPolicy.DROP_OLDEST):
+            raise ValueError(
+                f"Unknown overflow policy: {overflow_policy}")
+        self.loggers = loggers
+        self.max_queue_size = max_queue_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.max_batch_size = min(max_batch_size, max_queue_size)
+
+        self.queued = 0
+        self.dropped = 0
+        self.flushed = 0
+
+        self._queue = deque()
+        self._in_flight = 0
+        self._flush_requested = False
+        self._closed = False
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._ready = threading.Condition(self._lock)
+        self._drained = threading.Condition(self._lock)
+
+        self._thread = threading.Thread(
+            target=self._run, name="observability-exporter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def counters(self):
+        """
+        :return: the number of queued, dropped and flushed entries
+        since the exporter started, and the entries pending export
+        """
+        with self._lock:
+            return {
+                "queued": self.queued,
+                "dropped": self.dropped,
+                "flushed": self.flushed,
+                "pending": len(self._queue) + self._in_flight,
+            }
+
+    def put_metric(self, name, value, description="", log_parent=False):
+        self._put(MetricEntry(name, [value], description, log_parent))
+
+    def put_log(self, description, severity, module_name, file_name,
+                line_number, span_name=None):
+        self._put(LogEntry(description, severity, module_name, file_name,
+                           line_number, span_name))
+
+    def _put(self, entry):
+        with self._lock:
+            if self._closed:
+                self.dropped += 1
+                return
+            while len(self._queue) >= self.max_queue_size:
+                if self.overflow_policy == OverflowPolicy.DROP_OLDEST:
+                    self._queue.popleft()
+                    self.dropped += 1
+                else:
+                    self._ready.notify()
+                    self._not_full.wait()
+            self._queue.append(entry)
+            self.queued += 1
+            if len(self._queue) >= self.max_batch_size:
+                self._ready.notify()
+
+    def flush(self, timeout=None):
+        """
+        Sends the queued entries and waits until they are exported
+        :param timeout: max seconds to wait, None waits until done
+        :return: True if every queued entry was exported
+        """
+        with self._lock:
+            self._flush_requested = True
+            self._ready.notify()
+            return self._drained.wait_for(
+                lambda: not self._queue and not self._in_flight, timeout)
+
+    def close(self, timeout=None):
+        """
+        Exports the queued entries and stops the background thread
+        :param timeout: max seconds to wait for the export
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._ready.notify()
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                self._ready.wait_for(
+                    lambda: self._closed or self._flush_requested
+                    or len(self._queue) >= self.max_batch_size,
+                    self.flush_interval)
+                self._flush_requested = False
+                batch = list(self._queue)
+                self._queue.clear()
+                self._in_flight = len(batch)
+                closed = self._closed
+                self._not_full.notify_all()
+
+            if batch:
+                self._export(batch)
+
+            with self._lock:
+                self.flushed += len(batch)
+                self._in_flight = 0
+                self._drained.notify_all()
+            if closed:
+                return
+
+    def _export(self, batch):
+        metrics, entries = self.coalesce(batch)
+        for logger in self.loggers:
+            try:
+                if metrics:
+                    logger.log_metrics(metrics)
+                if entries:
+                    logger.log_entries(entries)
+            except Exception as e:
+                print(f"Failed to export to {type(logger).__name__}: {e}")
+
+    @staticmethod
+    def coalesce(batch):
+        """
+        Groups the values of each metric in a batch
+        :param batch: metric and log entries in the order they were queued
+        :return: (metric entries, log entries)
+        """
+        metrics = {}
+        entries = []
+        for entry in batch:
+            if isinstance(entry, MetricEntry):
+                key = (entry.name, entry.log_parent)
+                if key in metrics:
+                    metrics[key].values.extend(entry.values)
+                else:
+                    metrics[key] = entry
+            else:
+                entries.append(entry)
+        return list(metrics.values()), entries
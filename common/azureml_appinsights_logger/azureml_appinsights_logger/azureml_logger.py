@@ -32,6 +32,21 @@ class AzureMlLogger(LoggerInterface, ObservabilityAbstract):
             ) if log_parent is False or self.run.parent is None \
                 else self.run.parent.log(name, value, description)
 
+    def log_metrics(self, metrics):
+        """Log a batch of metrics to the run, the values of a metric
+        logged several times are sent with a single log_list call.
+        :param metrics: metric entries
+        """
+        for metric in metrics:
+            if metric.name == "":
+                continue
+            run = self.run if metric.log_parent is False \
+                or self.run.parent is None else self.run.parent
+            if len(metric.values) == 1:
+                run.log(metric.name, metric.values[0], metric.description)
+            else:
+                run.log_list(metric.name, metric.values, metric.description)
+
     def log(self, description="", severity=Severity.INFO):
         """
         Sends the logs to AML (experiments -> logs/outputs)
@@ -40,18 +55,33 @@ class AzureMlLogger(LoggerInterface, ObservabilityAbstract):
         :return:
         """
         if self.level <= severity and self.env.log_text_to_aml:
-            time_stamp = datetime.datetime.fromtimestamp(time.time()).strftime(
-                "%Y-%m-%d %H:%M:%S"
-            )
             callee = self.get_callee(
                 2
             )  # to get the script who is calling Observability
-            print(
-                "{}, [{}], {}:{}".format(
-                    time_stamp, self.severity_map[severity],
-                    callee, description
-                )
+            self.print_log(description, severity, callee)
+
+    def log_entries(self, entries):
+        """
+        Sends a batch of logs to AML (experiments -> logs/outputs)
+        :param entries: log entries
+        :return:
+        """
+        if not self.env.log_text_to_aml:
+            return
+        for entry in entries:
+            if self.level <= entry.severity:
+                self.print_log(entry.description, entry.severity, entry.callee)
+
+    def print_log(self, description, severity, callee):
+        time_stamp = datetime.datetime.fromtimestamp(time.time()).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        )
+        print(
+            "{}, [{}], {}:{}".format(
+                time_stamp, self.severity_map[severity],
+                callee, description
             )
+        )
 
     def exception(self, exception: Exception):
         """
@@ -33,18 +33,31 @@ class ConsoleLogger(LoggerInterface, ObservabilityAbstract):
         :return:
         """
         if self.level <= severity:
-            time_stamp = datetime.datetime.fromtimestamp(time.time()).strftime(
-                "%Y-%m-%d %H:%M:%S"
-            )
             callee = self.get_callee(
                 2
             )  # to get the script who is calling Observability
-            print(
-                "{}, [{}], {}:{}".format(
-                    time_stamp, self.severity_map[severity],
-                    callee, description
-                )
+            self.print_log(description, severity, callee)
+
+    def log_entries(self, entries):
+        """
+        Prints a batch of logs to console
+        :param entries: log entries
+        :return:
+        """
+        for entry in entries:
+            if self.level <= entry.severity:
+                self.print_log(entry.description, entry.severity, entry.callee)
+
+    def print_log(self, description, severity, callee):
+        time_stamp = datetime.datetime.fromtimestamp(time.time()).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        )
+        print(
+            "{}, [{}], {}:{}".format(
+                time_stamp, self.severity_map[severity],
+                callee, description
             )
+        )
 
     def exception(self, exception: Exception):
         """
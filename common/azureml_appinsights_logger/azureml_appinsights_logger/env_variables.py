@@ -21,6 +21,11 @@ class Env:
     trace_sampling_rate: float = float(os.environ.get("TRACE_SAMPLING_RATE", 1.0))  # NOQA: E501
     metrics_export_interval: int = int(os.environ.get("METRICS_EXPORT_INTERVAL", 15))  # NOQA: E501
     enable_standard_metrics: Optional[bool] = os.environ.get("ENABLE_STANDARD_METRICS", "false").lower().strip() == "true"  # NOQA: E501
+    callee_attribution: Optional[str] = os.environ.get("CALLEE_ATTRIBUTION", "fast").lower().strip()  # NOQA: E501
+    async_logging: Optional[bool] = os.environ.get("ASYNC_LOGGING", "false").lower().strip() == "true"  # NOQA: E501
+    async_queue_size: int = int(os.environ.get("ASYNC_QUEUE_SIZE", 10000))  # NOQA: E501
+    async_flush_interval: float = float(os.environ.get("ASYNC_FLUSH_INTERVAL", 1.0))  # NOQA: E501
+    async_overflow_policy: Optional[str] = os.environ.get("ASYNC_OVERFLOW_POLICY", "block").lower().strip()  # NOQA: E501
 
     build_id: Optional[str] = str(os.environ.get("BUILD_ID", "local"))  # NOQA: E501
 
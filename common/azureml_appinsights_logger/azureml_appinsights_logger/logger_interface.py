@@ -1,7 +1,12 @@
 import inspect
+import os
+import sys
 import uuid
+from typing import List, NamedTuple
 from opencensus.trace.tracer import Tracer
 
+from .env_variables import Env
+
 
 class Severity:
     DEBUG = 10
@@ -11,6 +16,44 @@ class Severity:
     CRITICAL = 50
 
 
+class CalleeAttribution:
+    # sys._getframe with the code object details cached, default
+    FAST = "fast"
+    # inspect.stack, reads the source context of every frame of the stack
+    STACK = "stack"
+    # no callee details are logged
+    OFF = "off"
+
+
+class MetricEntry(NamedTuple):
+    """The values of a metric, in the order they were logged"""
+    name: str
+    values: list
+    description: str
+    log_parent: bool
+
+
+class LogEntry(NamedTuple):
+    """
+    A log message with the details of the code that logged it
+    and the name of the span it was logged in
+    """
+    description: str
+    severity: int
+    module_name: str
+    file_name: str
+    line_number: int
+    span_name: str = None
+
+    @property
+    def callee(self):
+        # no file name when the callee attribution is off
+        if self.file_name is None:
+            return ""
+        return "{}:{}".format(os.path.basename(self.file_name),
+                              self.line_number)
+
+
 class LoggerInterface(Tracer):
 
     def log_metric(self, name, value, description, log_parent):
@@ -19,6 +62,27 @@ class LoggerInterface(Tracer):
     def log(self, name, value, description, severity, log_parent):
         pass
 
+    def log_metrics(self, metrics: List[MetricEntry]):
+        """
+        Sends a batch of metrics, loggers that can send several
+        values at once should override this method
+        :param metrics: metric entries
+        :return:
+        """
+        for metric in metrics:
+            for value in metric.values:
+                self.log_metric(metric.name, value, metric.description,
+                                metric.log_parent)
+
+    def log_entries(self, entries: List[LogEntry]):
+        """
+        Sends a batch of logs, the callee of each log is
+        taken from its entry instead of the stack
+        :param entries: log entries
+        :return:
+        """
+        pass
+
     def exception(self, exception):
         pass
 
@@ -70,6 +134,41 @@ class ObservabilityAbstract:
     severity = Severity()
     severity_map = {10: "DEBUG", 20: "INFO",
                     30: "WARNING", 40: "ERROR", 50: "CRITICAL"}
+    callee_attribution = Env().callee_attribution
+    # (module_name, file_name) by code object
+    _code_details = {}
+
+    @staticmethod
+    def set_callee_attribution(callee_attribution):
+        """
+        Sets how the callee of the logs is found for all loggers
+        :param callee_attribution: one of the CalleeAttribution values
+        :return:
+        """
+        if callee_attribution not in (CalleeAttribution.FAST,
+                                      CalleeAttribution.STACK,
+                                      CalleeAttribution.OFF):
+            raise ValueError(
+                f"Unknown callee attribution: {callee_attribution}")
+        ObservabilityAbstract.callee_attribution = callee_attribution
+
+    @staticmethod
+    def get_frame_details(stack_level):
+        """
+        This method returns the callee details of the frame
+        stack_level levels above the caller, using sys._getframe
+        and caching the module and file name of each code object
+        :param stack_level:
+        :return: (module_name, file_name, line_number)
+        """
+        frame = sys._getframe(stack_level + 1)
+        code = frame.f_code
+        details = ObservabilityAbstract._code_details.get(code)
+        if details is None:
+            details = (inspect.getmodulename(code.co_filename),
+                       code.co_filename)
+            ObservabilityAbstract._code_details[code] = details
+        return details[0], details[1], frame.f_lineno
 
     def get_run_id_and_set_context(self, run):
         """
@@ -124,12 +223,19 @@ class ObservabilityAbstract:
         :param stack_level:
         :return: string of [file_name:line_number]
         """
+        callee_attribution = ObservabilityAbstract.callee_attribution
+        if callee_attribution == CalleeAttribution.OFF:
+            return ""
         try:
+            if callee_attribution == CalleeAttribution.FAST:
+                _, file_name, line_number = \
+                    ObservabilityAbstract.get_frame_details(stack_level + 1)
+                return "{}:{}".format(file_name.split("/")[-1], line_number)
             stack = inspect.stack()
             file_name = stack[stack_level + 1].filename.split("/")[-1]
             line_number = stack[stack_level + 1].lineno
             return "{}:{}".format(file_name, line_number)
-        except IndexError:
+        except (IndexError, ValueError):
             print("Index error, failed to log to AzureML")
             return ""
 
@@ -141,12 +247,18 @@ class ObservabilityAbstract:
         :param stack_level:
         :return: (module_name, file_name, line_number)
         """
+        callee_attribution = ObservabilityAbstract.callee_attribution
+        if callee_attribution == CalleeAttribution.OFF:
+            return None, None, None
         try:
+            if callee_attribution == CalleeAttribution.FAST:
+                return ObservabilityAbstract.get_frame_details(
+                    stack_level + 1)
             stack = inspect.stack()
             file_name = stack[stack_level + 1].filename
             line_number = stack[stack_level + 1].lineno
             module_name = inspect.getmodulename(file_name)
             return module_name, file_name, line_number
-        except IndexError:
+        except (IndexError, ValueError):
             print("Index error, failed to log to AzureML")
-            return ""
+            return None, None, None
@@ -1,6 +1,7 @@
 from azureml.core import Run
 
 from .env_variables import Env
+from .async_exporter import AsyncExporter
 from .appinsights_logger import AppInsightsLogger
 from .azureml_logger import AzureMlLogger
 from .console_logger import ConsoleLogger
@@ -65,6 +66,57 @@ class Observability(LoggerInterface):
             print('Initializing the Observability Singleton')
             self.__initialized = True
             self._loggers = Loggers()
+            self._exporter = None
+            e = Env()
+            if e.async_logging:
+                self.enable_async(e.async_queue_size, e.async_flush_interval,
+                                  e.async_overflow_policy)
+
+    def enable_async(self, max_queue_size=10000, flush_interval=1.0,
+                     overflow_policy="block"):
+        """
+        Queues logs and metrics in memory and sends them to the
+        registered loggers in batches from a background thread
+        :param max_queue_size: max number of entries waiting to be sent
+        :param flush_interval: max seconds an entry waits to be sent
+        :param overflow_policy: "block" waits for space in a full queue,
+        "drop_oldest" drops the oldest entry
+        :return:
+        """
+        if self._exporter is None:
+            print('Enabling asynchronous logging')
+            self._exporter = AsyncExporter(
+                self._loggers.loggers, max_queue_size, flush_interval,
+                overflow_policy)
+
+    def disable_async(self):
+        """
+        Sends the queued logs and metrics, then
+        sends the next ones synchronously
+        :return:
+        """
+        if self._exporter is not None:
+            self._exporter.close()
+            self._exporter = None
+
+    def flush(self, timeout=None):
+        """
+        Waits until the queued logs and metrics are sent
+        :param timeout: max seconds to wait, None waits until done
+        :return: True if every queued entry was sent
+        """
+        if self._exporter is None:
+            return True
+        return self._exporter.flush(timeout)
+
+    def get_counters(self):
+        """
+        :return: the number of queued, dropped and flushed
+        logs and metrics in asynchronous mode
+        """
+        if self._exporter is None:
+            return {"queued": 0, "dropped": 0, "flushed": 0, "pending": 0}
+        return self._exporter.counters
 
     def log_metric(
             self, name="", value="", description="", log_parent=False,
@@ -77,6 +129,9 @@ class Observability(LoggerInterface):
         :param log_parent: (only for AML), send the metric to the run.parent
         :return:
         """
+        if self._exporter is not None:
+            self._exporter.put_metric(name, value, description, log_parent)
+            return
         for logger in self._loggers.loggers:
             logger.log_metric(name, value, description, log_parent)
 
@@ -87,6 +142,15 @@ class Observability(LoggerInterface):
         :param severity: log Severity
         :return:
         """
+        if self._exporter is not None:
+            # the callee and the span are resolved now, the loggers run
+            # on another thread, which has its own current span
+            module_name, file_name, line_number = \
+                ObservabilityAbstract.get_callee_details(1)
+            self._exporter.put_log(description, severity, module_name,
+                                   file_name, line_number,
+                                   self.get_current_span_name())
+            return
         for logger in self._loggers.loggers:
             logger.log(description, severity)
 
@@ -96,6 +160,8 @@ class Observability(LoggerInterface):
         :param exception: Actual exception to be sent
         :return:
         """
+        # keep the queued logs ahead of the exception
+        self.flush()
         for logger in self._loggers.loggers:
             logger.exception(exception)
 
@@ -144,6 +210,17 @@ class Observability(LoggerInterface):
         for logger in self._loggers.loggers:
             logger.end_span()
 
+    def get_current_span_name(self):
+        """
+        :return: the name of the current span of the first logger
+        tracing spans in the calling thread, None if there is none
+        """
+        for logger in self._loggers.loggers:
+            span = logger.current_span()
+            if span is not None:
+                return span.name
+        return None
+
     def current_span(self):
         """Return the current span from first logger"""
         if len(self._loggers.loggers) > 0:
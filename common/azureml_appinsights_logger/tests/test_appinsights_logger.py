@@ -1,5 +1,6 @@
 from azureml_appinsights_logger.appinsights_logger \
     import AppInsightsLogger, logging, Severity
+from azureml_appinsights_logger.logger_interface import LogEntry, MetricEntry
 import uuid
 from opencensus.trace.span import SpanKind
 import pytest
@@ -205,3 +206,40 @@ def test_log_matches_severity(mocker, severity, mock_exporter):
         mock_logger.return_value.critical.assert_called_once()
 
     mock_logger.reset_mock()
+
+
+def test_log_metric_registers_view_once_per_metric(mocker, mock_exporter):
+    # arrange
+    mock_run = mocker.MagicMock()
+    mock_run.id = 'OfflineRun'
+    mock_set_view = mocker.patch.object(AppInsightsLogger, 'set_view')
+
+    # act
+    logger = AppInsightsLogger(mock_run)
+    for value in range(3):
+        logger.log_metric("FOO", value)
+    logger.log_metrics([MetricEntry("FOO", [3, 4], "", False),
+                        MetricEntry("BAR", [5], "", False)])
+
+    # assert
+    assert mock_set_view.call_count == 2
+    assert list(logger.measures) == ["FOO", "BAR"]
+
+
+def test_log_entries_use_span_of_entry(mocker, mock_exporter):
+    # arrange
+    mock_run = mocker.MagicMock()
+    mock_run.id = 'OfflineRun'
+    mock_logger = mocker.patch.object(logging, 'getLogger')
+    logger = AppInsightsLogger(mock_run)
+    # the exporter thread has a span of its own
+    mocker.patch.object(logger, 'current_span').return_value.name = 'BAZ'
+
+    # act
+    logger.log_entries([
+        LogEntry("FOO", Severity.WARNING, "train", "train.py", 1, "BAR")])
+
+    # assert
+    extra = mock_logger.return_value.warning.call_args[1]['extra']
+    assert extra['custom_dimensions']['process'] == 'BAR'
+    assert extra['custom_dimensions']['lineNumber'] == 1
@@ -0,0 +1,166 @@
+import threading
+
+import pytest
+from azureml_appinsights_logger.async_exporter import (
+    AsyncExporter,
+    OverflowPolicy,
+)
+from azureml_appinsights_logger.console_logger import ConsoleLogger
+from azureml_appinsights_logger.logger_interface import (
+    CalleeAttribution,
+    LogEntry,
+    MetricEntry,
+    ObservabilityAbstract,
+    Severity,
+)
+
+
+@pytest.fixture
+def mock_logger(mocker):
+    return mocker.MagicMock()
+
+
+def test_flush_coalesces_metric_values(mock_logger):
+    # arrange
+    exporter = AsyncExporter([mock_logger], flush_interval=60)
+
+    # act
+    for value in range(3):
+        exporter.put_metric("FOO", value, "BAR")
+    exporter.put_metric("BAZ", 10)
+    flushed = exporter.flush(timeout=5)
+    exporter.close()
+
+    # assert
+    assert flushed
+    mock_logger.log_metrics.assert_called_once_with([
+        MetricEntry("FOO", [0, 1, 2], "BAR", False),
+        MetricEntry("BAZ", [10], "", False)])
+    mock_logger.log_entries.assert_not_called()
+    assert exporter.counters == {
+        "queued": 4, "dropped": 0, "flushed": 4, "pending": 0}
+
+
+def test_flush_sends_log_entries_in_order(mock_logger):
+    # arrange
+    exporter = AsyncExporter([mock_logger], flush_interval=60)
+    entries = [
+        LogEntry("FOO", Severity.INFO, "train", "train.py", 1),
+        LogEntry("BAR", Severity.ERROR, "train", "train.py", 2)]
+
+    # act
+    for entry in entries:
+        exporter.put_log(*entry)
+    exporter.flush(timeout=5)
+    exporter.close()
+
+    # assert
+    mock_logger.log_entries.assert_called_once_with(entries)
+    mock_logger.log_metrics.assert_not_called()
+
+
+def test_logs_are_sent_when_callee_attribution_off(mocker, capsys):
+    # arrange
+    mocker.patch.object(ObservabilityAbstract, "callee_attribution",
+                        CalleeAttribution.OFF)
+    mocker.patch.object(ConsoleLogger, "get_run_id_and_set_context",
+                        return_value="MYRUN")
+    logger = ConsoleLogger(mocker.MagicMock())
+    logger.level = Severity.INFO
+    exporter = AsyncExporter([logger], flush_interval=60)
+
+    # act
+    for description in ("FOO", "BAR"):
+        exporter.put_log(description, Severity.INFO,
+                         *ObservabilityAbstract.get_callee_details(1))
+    exporter.flush(timeout=5)
+    exporter.close()
+
+    # assert
+    captured = capsys.readouterr()
+    assert "[INFO], :FOO" in captured.out
+    assert "[INFO], :BAR" in captured.out
+    assert "Failed to export" not in captured.out
+    assert exporter.counters["flushed"] == 2
+
+
+def test_full_batch_is_sent_without_flush(mock_logger):
+    # arrange
+    sent = threading.Event()
+    mock_logger.log_metrics.side_effect = lambda metrics: sent.set()
+    exporter = AsyncExporter([mock_logger], flush_interval=60,
+                             max_batch_size=2)
+
+    # act
+    exporter.put_metric("FOO", 1)
+    exporter.put_metric("FOO", 2)
+
+    # assert
+    assert sent.wait(timeout=5)
+    exporter.close()
+
+
+def test_drop_oldest_policy_drops_oldest_entries(mock_logger):
+    # arrange
+    release = threading.Event()
+    mock_logger.log_metrics.side_effect = lambda metrics: release.wait(5)
+    exporter = AsyncExporter([mock_logger], max_queue_size=2,
+                             flush_interval=60,
+                             overflow_policy=OverflowPolicy.DROP_OLDEST)
+    # the first entry keeps the flusher busy while the queue overflows
+    exporter.put_metric("BUSY", 0)
+    exporter.flush(timeout=0.1)
+
+    # act
+    for value in range(4):
+        exporter.put_metric("FOO", value)
+    release.set()
+    exporter.flush(timeout=5)
+    exporter.close()
+
+    # assert
+    mock_logger.log_metrics.assert_called_with(
+        [MetricEntry("FOO", [2, 3], "", False)])
+    assert exporter.counters == {
+        "queued": 5, "dropped": 2, "flushed": 3, "pending": 0}
+
+
+def test_block_policy_waits_for_space(mock_logger):
+    # arrange
+    exporter = AsyncExporter([mock_logger], max_queue_size=2,
+                             flush_interval=60)
+
+    # act
+    for value in range(10):
+        exporter.put_metric("FOO", value)
+    exporter.flush(timeout=5)
+    exporter.close()
+
+    # assert
+    values = [value
+              for call in mock_logger.log_metrics.call_args_list
+              for metric in call[0][0]
+              for value in metric.values]
+    assert values == list(range(10))
+    assert exporter.counters["dropped"] == 0
+
+
+def test_failing_logger_does_not_stop_other_loggers(mocker, mock_logger):
+    # arrange
+    failing_logger = mocker.MagicMock()
+    failing_logger.log_metrics.side_effect = Exception("FOO")
+    exporter = AsyncExporter([failing_logger, mock_logger],
+                             flush_interval=60)
+
+    # act
+    exporter.put_metric("FOO", 1)
+    exporter.flush(timeout=5)
+    exporter.close()
+
+    # assert
+    mock_logger.log_metrics.assert_called_once()
+
+
+def test_unknown_overflow_policy_raises(mock_logger):
+    with pytest.raises(ValueError):
+        AsyncExporter([mock_logger], overflow_policy="FOO")
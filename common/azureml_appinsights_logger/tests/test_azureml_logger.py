@@ -1,5 +1,5 @@
 from azureml_appinsights_logger.azureml_logger import AzureMlLogger
-from azureml_appinsights_logger.logger_interface import Severity
+from azureml_appinsights_logger.logger_interface import Severity, MetricEntry
 
 
 def test_get_callee_returns_callee_file_with_line_number():
@@ -148,3 +148,20 @@ def test_log_when_log_text_to_aml_is_true(mocker, capsys):
     # assert
     captured = capsys.readouterr()
     assert 'FOO' in captured.out
+
+
+def test_log_metrics_sends_several_values_with_log_list(mocker):
+    # arrange
+    mocked_run = mocker.MagicMock()
+    mocked_run.parent = mocker.MagicMock()
+    logger = AzureMlLogger(mocked_run)
+    metrics = [MetricEntry('FOO', [1, 2], 'BAR', False),
+               MetricEntry('BAZ', [3], 'BAR', True)]
+
+    # act
+    logger.log_metrics(metrics)
+
+    # assert
+    mocked_run.log_list.assert_called_once_with('FOO', [1, 2], 'BAR')
+    mocked_run.parent.log.assert_called_once_with('BAZ', 3, 'BAR')
+    mocked_run.log.assert_not_called()
@@ -1,6 +1,6 @@
 import pytest
 from azureml_appinsights_logger.console_logger import ConsoleLogger
-from azureml_appinsights_logger.logger_interface import Severity
+from azureml_appinsights_logger.logger_interface import Severity, LogEntry
 
 
 @pytest.fixture
@@ -67,3 +67,20 @@ def test_logs_with_default_severity(mocker, mock_run, capsys):
     spy.assert_called_once_with("FOO")
     captured = capsys.readouterr()
     assert "FOO" in captured.out
+
+
+def test_log_entries_prints_entry_callee(mocker, mock_run, capsys):
+    # arrange:
+    logger = ConsoleLogger(mock_run)
+    logger.level = Severity.WARNING
+    entries = [
+        LogEntry("FOO", Severity.ERROR, "train", "/src/train.py", 42),
+        LogEntry("BAZ", Severity.INFO, "train", "/src/train.py", 43)]
+
+    # act:
+    logger.log_entries(entries)
+
+    # assert:
+    captured = capsys.readouterr()
+    assert "[ERROR], train.py:42:FOO" in captured.out
+    assert "BAZ" not in captured.out
@@ -0,0 +1,101 @@
+import inspect
+import time
+
+import pytest
+from azureml_appinsights_logger.logger_interface import (
+    CalleeAttribution,
+    ObservabilityAbstract,
+)
+
+
+@pytest.fixture
+def callee_attribution():
+    previous = ObservabilityAbstract.callee_attribution
+    yield ObservabilityAbstract.set_callee_attribution
+    ObservabilityAbstract.set_callee_attribution(previous)
+
+
+def call_at_depth(depth, fn):
+    if depth <= 0:
+        return fn()
+    return call_at_depth(depth - 1, fn)
+
+
+@pytest.mark.parametrize(
+    "attribution", [CalleeAttribution.FAST, CalleeAttribution.STACK])
+def test_get_callee_matches_caller(callee_attribution, attribution):
+    # arrange
+    callee_attribution(attribution)
+    expected_line_number = inspect.currentframe().f_lineno + 3
+
+    # act
+    actual = ObservabilityAbstract.get_callee(0)
+    actual_details = ObservabilityAbstract.get_callee_details(0)
+
+    # assert
+    assert actual == f"test_logger_interface.py:{expected_line_number}"
+    assert actual_details[0] == "test_logger_interface"
+    assert actual_details[1] == __file__
+    assert actual_details[2] == expected_line_number + 1
+
+
+def test_get_callee_is_empty_when_attribution_off(callee_attribution):
+    # arrange
+    callee_attribution(CalleeAttribution.OFF)
+
+    # act
+    actual = ObservabilityAbstract.get_callee(0)
+    actual_details = ObservabilityAbstract.get_callee_details(0)
+
+    # assert
+    assert actual == ""
+    assert actual_details == (None, None, None)
+
+
+def test_get_callee_handles_level_above_stack(callee_attribution):
+    # arrange
+    callee_attribution(CalleeAttribution.FAST)
+
+    # act
+    actual = ObservabilityAbstract.get_callee(10000)
+
+    # assert
+    assert actual == ""
+
+
+def test_get_callee_details_handles_level_above_stack(callee_attribution):
+    # arrange
+    callee_attribution(CalleeAttribution.STACK)
+
+    # act
+    actual = ObservabilityAbstract.get_callee_details(10000)
+
+    # assert
+    assert actual == (None, None, None)
+
+
+def test_unknown_callee_attribution_raises():
+    with pytest.raises(ValueError):
+        ObservabilityAbstract.set_callee_attribution("FOO")
+
+
+@pytest.mark.parametrize("depth", [10, 50])
+def test_fast_attribution_is_cheaper_than_stack(callee_attribution, depth):
+    # microbenchmark of the per-call cost, run with -s to see the timings
+    calls = 200
+    costs = {}
+    for attribution in (CalleeAttribution.STACK, CalleeAttribution.FAST):
+        callee_attribution(attribution)
+
+        def get_callees():
+            start = time.perf_counter()
+            for _ in range(calls):
+                ObservabilityAbstract.get_callee_details(1)
+            return (time.perf_counter() - start) / calls
+
+        costs[attribution] = call_at_depth(depth, get_callees)
+
+    print(f"\ndepth {depth}: "
+          f"stack {costs[CalleeAttribution.STACK] * 1e6:.1f}us/call, "
+          f"fast {costs[CalleeAttribution.FAST] * 1e6:.1f}us/call")
+    assert costs[CalleeAttribution.FAST] < costs[CalleeAttribution.STACK]
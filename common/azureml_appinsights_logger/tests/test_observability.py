@@ -62,3 +62,34 @@ def test_log_is_called_by_all_loggers(mocker, mock_loggers):
         "FOO", Severity.CRITICAL)
     mock_observability._loggers.loggers[2].log.assert_called_with(
         "FOO", Severity.CRITICAL)
+
+
+def test_async_log_is_sent_by_all_loggers_with_callee(mocker, mock_loggers):
+    # arrange
+    mocker.patch(
+        'azureml_appinsights_logger.observability.Observability._loggers',
+        new_callable=mocker.PropertyMock,
+        return_value=mock_loggers,
+        create=True
+    )
+    mock_observability = Observability()
+    mock_observability.enable_async(flush_interval=60)
+
+    mock_loggers.loggers[0].current_span.return_value.name = "BAZ"
+
+    # act
+    mock_observability.log("FOO", Severity.CRITICAL)
+    mock_observability.log_metric("BAR", 1)
+    mock_observability.flush(timeout=5)
+    counters = mock_observability.get_counters()
+    mock_observability.disable_async()
+
+    # assert
+    for logger in mock_observability._loggers.loggers:
+        entry = logger.log_entries.call_args[0][0][0]
+        assert entry.description == "FOO"
+        assert entry.module_name == "test_observability"
+        assert entry.span_name == "BAZ"
+        logger.log.assert_not_called()
+        logger.log_metrics.assert_called_once()
+    assert counters["flushed"] == 2
@@ -1,12 +1,106 @@
 import os
 import json
+import time
 import logging
 from opencensus.ext.azure.log_exporter import AzureLogHandler
 
 from azureml.core import Workspace, Run
 from azureml.core.authentication import MsiAuthentication
+from azureml.exceptions import AuthenticationException, ServiceException
 import azure.functions as func
 
+# The workspace, the log exporter and the parent runs are kept by the worker
+# between the invocations of the function, so that a warm start doesn't
+# authenticate, connect to Application Insights or fetch the parent run again
+WORKSPACE_REFRESH_SECONDS = 3600
+PARENT_RUN_TTL_SECONDS = 60
+PARENT_RUN_CACHE_SIZE = 100
+# status codes of the service for the requests of expired credentials
+UNAUTHORIZED_STATUS_CODES = (401, 403)
+
+logger = logging.getLogger(__name__)
+workspace_cache = {}
+parent_run_cache = {}
+
+
+def get_workspace(refresh=False):
+    """ Returns the Azure ML workspace authenticated with the managed identity,
+    created again after WORKSPACE_REFRESH_SECONDS or when refresh is set
+    """
+    now = time.monotonic()
+    if refresh or 'workspace' not in workspace_cache or \
+            now - workspace_cache['created'] > WORKSPACE_REFRESH_SECONDS:
+        # Managed identity authentication
+        msi_auth = MsiAuthentication()
+
+        # Azure ML workspace
+        workspace_cache['workspace'] = Workspace(subscription_id=os.environ["SUBSCRIPTION_ID"],
+                                                 resource_group=os.environ["RESOURCE_GROUP"],
+                                                 workspace_name=os.environ["WORKSPACE_NAME"],
+                                                 auth=msi_auth
+                                                 )
+        workspace_cache['created'] = now
+        logging.info(f"Azure ML workspace: {workspace_cache['workspace']}")
+    return workspace_cache['workspace']
+
+
+def get_logger():
+    """ Returns the logger for Application Insights, adding its handler once.
+    The handler exports the records in batches, every LOG_EXPORT_INTERVAL
+    seconds or LOG_EXPORT_BATCH_SIZE records, so that a burst of events is
+    exported in a few requests
+    """
+    if not any(isinstance(handler, AzureLogHandler) for handler in logger.handlers):
+        logger.addHandler(AzureLogHandler(
+            connection_string=os.environ["APP_INSIGHTS_CONNECTION_STRING"],
+            export_interval=float(os.environ.get("LOG_EXPORT_INTERVAL", 15)),
+            max_batch_size=int(os.environ.get("LOG_EXPORT_BATCH_SIZE", 100)))
+        )
+    return logger
+
+
+def is_authentication_error(ex):
+    return isinstance(ex, AuthenticationException) or \
+        (isinstance(ex, ServiceException) and getattr(ex, "status_code", None) in UNAUTHORIZED_STATUS_CODES)
+
+
+def get_run(run_id):
+    try:
+        return Run.get(get_workspace(), run_id)
+    except Exception as ex:
+        # only stale credentials of the cached workspace are retried with a new one, other errors,
+        # e.g. of an unknown run, are raised without discarding the workspace
+        if not is_authentication_error(ex):
+            raise
+        logging.warning(f"PipelineRunMonitor: could not get the run, refreshing the workspace: {ex}")
+        return Run.get(get_workspace(refresh=True), run_id)
+
+
+def get_parent_run(aml_run):
+    """ Returns the parent of the run, or the run when it has no parent.
+    The steps of a pipeline run share their parent run, which is fetched once
+    per PARENT_RUN_TTL_SECONDS, so that its status is at most that old
+    """
+    # _run_dto is private to azureml-core, it is read on purpose as it holds the parent run ID
+    # of the fetched run, while aml_run.parent fetches the parent run
+    run_dto = getattr(aml_run, "_run_dto", None)
+    if not isinstance(run_dto, dict) or "parent_run_id" not in run_dto:
+        return aml_run.parent or aml_run
+    parent_run_id = run_dto["parent_run_id"]
+    if parent_run_id is None:
+        return aml_run
+
+    now = time.monotonic()
+    cached = parent_run_cache.get(parent_run_id)
+    if cached is not None and now - cached[0] < PARENT_RUN_TTL_SECONDS:
+        return cached[1]
+
+    parent_run = aml_run.parent or aml_run
+    if len(parent_run_cache) >= PARENT_RUN_CACHE_SIZE:
+        parent_run_cache.clear()
+    parent_run_cache[parent_run_id] = (now, parent_run)
+    return parent_run
+
 
 def main(event: func.EventGridEvent):
 
@@ -22,46 +116,24 @@ def main(event: func.EventGridEvent):
 
         if (event.event_type == "Microsoft.MachineLearningServices.RunCompleted" or event.get_json()["runStatus"] == "Failed"):
 
-            # Retrieve environment variables
-            subscriptionId = os.environ["SUBSCRIPTION_ID"]
-            rg_name = os.environ["RESOURCE_GROUP"]
-            ws_name = os.environ["WORKSPACE_NAME"]
-            app_insights_connection_string = os.environ["APP_INSIGHTS_CONNECTION_STRING"]
-
-            # Managed identity authentication
-            msi_auth = MsiAuthentication()
-
-            # Azure ML workspace
-            aml_workspace = Workspace(subscription_id=subscriptionId,
-                                      resource_group=rg_name,
-                                      workspace_name=ws_name,
-                                      auth=msi_auth
-                                      )
-            logging.info(f"Azure ML workspace: {aml_workspace}")
-
-            # Set up logger for Application Insights
-            logger = logging.getLogger(__name__)
-            logger.addHandler(AzureLogHandler(
-                connection_string=app_insights_connection_string)
-            )
-
-            aml_run = Run.get(aml_workspace, event.get_json()["runId"])
+            aml_run = get_run(event.get_json()["runId"])
+            parent_run = get_parent_run(aml_run)
             custom_dimensions = {
-                "parent_run_id": aml_run.parent.id if aml_run.parent else aml_run.id,
-                "parent_run_name": aml_run.parent.name if aml_run.parent else aml_run.name,
-                "parent_run_number": aml_run.parent.number if aml_run.parent else aml_run.number,
+                "parent_run_id": parent_run.id,
+                "parent_run_name": parent_run.name,
+                "parent_run_number": parent_run.number,
                 "run_number": aml_run.number,
                 "step_id": aml_run.id,
                 "step_name": aml_run.name,
                 "experiment_name": aml_run.experiment.name,
-                "run_url": aml_run.parent.get_portal_url() if aml_run.parent else aml_run.get_portal_url(),
-                "parent_run_status": aml_run.parent.status if aml_run.parent else aml_run.status,
+                "run_url": parent_run.get_portal_url(),
+                "parent_run_status": parent_run.status,
                 "run_status": aml_run.status,
                 "type": "run_detail",
                 "workspace_name": aml_run.experiment.workspace.name
             }
             details = aml_run.get_details()
-            logger.info(json.dumps(details, default=lambda o: ''), extra={'custom_dimensions': custom_dimensions})
+            get_logger().info(json.dumps(details, default=lambda o: ''), extra={'custom_dimensions': custom_dimensions})
 
         elif (event.event_type == "Microsoft.MachineLearningServices.RunStatusChanged" and event.get_json()["runStatus"] == "Running" and event.get_json()["runProperties"]["azureml.runsource"] == "azureml.PipelineRun"):
             # Please write a pipeline run notification here
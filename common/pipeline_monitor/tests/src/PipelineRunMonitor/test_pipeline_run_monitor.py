@@ -1,10 +1,37 @@
 import pytest
 import logging
 from pytest_mock import MockFixture
+from opencensus.ext.azure.log_exporter import AzureLogHandler
+from src.PipelineRunMonitor import pipeline_run_monitor
 from src.PipelineRunMonitor.pipeline_run_monitor import main
+from azureml.exceptions import AuthenticationException
 import azure.functions as func
 
 
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """ Start each test with a cold worker
+    """
+    pipeline_run_monitor.workspace_cache.clear()
+    pipeline_run_monitor.parent_run_cache.clear()
+    yield
+    for handler in list(pipeline_run_monitor.logger.handlers):
+        if isinstance(handler, AzureLogHandler):
+            pipeline_run_monitor.logger.removeHandler(handler)
+
+
+def create_event(run_id):
+    return func.EventGridEvent(
+        id="xxx",
+        data={"runId": run_id},
+        topic="httpxxx",
+        subject="xxx",
+        event_type="Microsoft.MachineLearningServices.RunCompleted",
+        event_time=0,
+        data_version="xxx"
+    )
+
+
 def test_pipeline_run_monitor_success(monkeypatch, mocker: MockFixture):
     """ Test main function for expected success
     """
@@ -67,3 +94,103 @@ def test_pipeline_run_monitor_fail(monkeypatch, mocker: MockFixture):
     with (pytest.raises(Exception)) as execinfo:
         main(event)
         assert "runStatus" in str(execinfo)
+
+
+def test_pipeline_run_monitor_warm_start(monkeypatch, mocker: MockFixture):
+    """ Test main function reuses the workspace, the log handler and the parent run between events
+    """
+    # arrange
+    monkeypatch.setenv("WORKSPACE_NAME", "mock_workspace_name")
+    monkeypatch.setenv("SUBSCRIPTION_ID", "mock_subscription_id")
+    monkeypatch.setenv("RESOURCE_GROUP", "mock_resource_group")
+    monkeypatch.setenv("APP_INSIGHTS_CONNECTION_STRING", "InstrumentationKey=00000000-0000-0000-0000-000000000001")
+
+    mock_logger_info = mocker.patch.object(pipeline_run_monitor.logger, 'info')
+    mock_workspace = mocker.patch("src.PipelineRunMonitor.pipeline_run_monitor.Workspace")
+    mock_msi_auth = mocker.patch("src.PipelineRunMonitor.pipeline_run_monitor.MsiAuthentication")
+    mock_run = mocker.patch("src.PipelineRunMonitor.pipeline_run_monitor.Run")
+    step_runs = [mocker.MagicMock(), mocker.MagicMock()]
+    for step_run in step_runs:
+        step_run._run_dto = {"parent_run_id": "parent"}
+        step_run.parent = step_runs[0].parent
+    mock_run.get.side_effect = step_runs
+
+    # act
+    main(create_event("step1"))
+    main(create_event("step2"))
+
+    # assert
+    assert mock_logger_info.call_count == 2
+    mock_workspace.assert_called_once()
+    mock_msi_auth.assert_called_once()
+    assert sum(isinstance(handler, AzureLogHandler) for handler in pipeline_run_monitor.logger.handlers) == 1
+    assert pipeline_run_monitor.parent_run_cache["parent"][1] is step_runs[0].parent
+    custom_dimensions = mock_logger_info.call_args[1]["extra"]["custom_dimensions"]
+    assert custom_dimensions["parent_run_id"] == step_runs[0].parent.id
+
+
+def test_pipeline_run_monitor_refresh_workspace(monkeypatch, mocker: MockFixture):
+    """ Test main function creates the workspace again when the run can't be fetched
+    """
+    # arrange
+    monkeypatch.setenv("WORKSPACE_NAME", "mock_workspace_name")
+    monkeypatch.setenv("SUBSCRIPTION_ID", "mock_subscription_id")
+    monkeypatch.setenv("RESOURCE_GROUP", "mock_resource_group")
+    monkeypatch.setenv("APP_INSIGHTS_CONNECTION_STRING", "InstrumentationKey=00000000-0000-0000-0000-000000000001")
+
+    mock_logger_info = mocker.patch.object(pipeline_run_monitor.logger, 'info')
+    mock_workspace = mocker.patch("src.PipelineRunMonitor.pipeline_run_monitor.Workspace")
+    mock_run = mocker.patch("src.PipelineRunMonitor.pipeline_run_monitor.Run")
+    step_run = mocker.MagicMock()
+    step_run._run_dto = {}
+    step_run.parent = None
+    mock_run.get.side_effect = [AuthenticationException("token expired"), step_run]
+
+    # act
+    main(create_event("step1"))
+
+    # assert
+    mock_logger_info.assert_called_once()
+    assert mock_workspace.call_count == 2
+    custom_dimensions = mock_logger_info.call_args[1]["extra"]["custom_dimensions"]
+    assert custom_dimensions["parent_run_id"] == step_run.id
+
+
+def test_pipeline_run_monitor_run_error_keeps_workspace(monkeypatch, mocker: MockFixture):
+    """ Test main function keeps the workspace when the run can't be fetched for another reason than the credentials
+    """
+    # arrange
+    monkeypatch.setenv("WORKSPACE_NAME", "mock_workspace_name")
+    monkeypatch.setenv("SUBSCRIPTION_ID", "mock_subscription_id")
+    monkeypatch.setenv("RESOURCE_GROUP", "mock_resource_group")
+    monkeypatch.setenv("APP_INSIGHTS_CONNECTION_STRING", "InstrumentationKey=00000000-0000-0000-0000-000000000001")
+
+    mock_logger_info = mocker.patch.object(pipeline_run_monitor.logger, 'info')
+    mock_workspace = mocker.patch("src.PipelineRunMonitor.pipeline_run_monitor.Workspace")
+    mock_run = mocker.patch("src.PipelineRunMonitor.pipeline_run_monitor.Run")
+    mock_run.get.side_effect = Exception("run not found")
+
+    # act
+    with pytest.raises(Exception, match="PipelineRunMonitor error"):
+        main(create_event("unknown"))
+
+    # assert
+    mock_logger_info.assert_not_called()
+    assert mock_run.get.call_count == 1
+    assert mock_workspace.call_count == 1
+    assert pipeline_run_monitor.workspace_cache["workspace"] is mock_workspace.return_value
+
+
+def test_get_parent_run_without_run_dto(mocker: MockFixture):
+    """ Test the parent run is fetched when the run details have no parent run ID
+    """
+    # arrange
+    step_run = mocker.MagicMock()
+    step_run._run_dto = {"run_id": "step1"}
+
+    # act
+    parent_run = pipeline_run_monitor.get_parent_run(step_run)
+
+    # assert
+    assert parent_run is step_run.parent
+    assert not pipeline_run_monitor.parent_run_cache
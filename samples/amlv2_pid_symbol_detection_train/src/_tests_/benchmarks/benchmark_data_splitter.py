@@ -0,0 +1,125 @@
+"""
+benchmark of the reference and the indexed stratified group data splitter
+
+usage: python _tests_/benchmarks/benchmark_data_splitter.py --sizes 10000 100000 1000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+import warnings
+from typing import List, Tuple
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+from app.pipeline_steps.data_splitter_src.data_splitter import (  # noqa: E402
+    stratified_group_data_splitter,
+    stratified_group_data_splitter_indexed,
+)
+
+
+def make_dataset(
+    n_annotations: int,
+    boxes_per_file: int = 20,
+    n_classes: int = 60,
+    n_rare_classes: int = 3,
+    seed: int = 33,
+) -> Tuple[List[str], List[str], List[str]]:
+    """create a synthetic P&ID annotation set
+
+    Args:
+        n_annotations (int): number of bounding box annotations
+        boxes_per_file (int, optional): average bounding boxes per image
+        n_classes (int, optional): number of common classes
+        n_rare_classes (int, optional): number of classes found in a single image
+        seed (int, optional): random seed
+
+    Returns:
+        Tuple[List[str], List[str], List[str]]: file names and labels per
+         annotation, and the names of the images which are not upsampled
+    """
+    rng = random.Random(seed)
+    n_files = max(n_annotations // boxes_per_file, 10)
+    image_names = [f"{file_idx}.jpg" for file_idx in range(n_files)]
+    unique_file_names = [f"azureml://paths/{name}" for name in image_names]
+    # a tenth of the images have one upsampled copy
+    unique_file_names += [
+        f"azureml://paths/{file_idx}_upsampled_01.upsampled.jpg"
+        for file_idx in range(0, n_files, 10)
+    ]
+    common_classes = [f"class_{class_idx}" for class_idx in range(n_classes)]
+
+    file_names = [rng.choice(unique_file_names) for _ in range(n_annotations)]
+    labels = [rng.choice(common_classes) for _ in range(n_annotations)]
+    for rare_idx in range(n_rare_classes):
+        file_names[rare_idx] = unique_file_names[rare_idx]
+        labels[rare_idx] = f"rare_{rare_idx}"
+    return file_names, labels, image_names
+
+
+def _time(func, **kwargs) -> Tuple[float, tuple]:
+    start = time.perf_counter()
+    # both splitters print the mandatory file paths
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(**kwargs)
+    return time.perf_counter() - start, result
+
+
+def main(sizes: List[int], n_mandatory: int, skip_reference_above: int):
+    print(f"{'annotations':>12} {'reference (s)':>14} {'indexed (s)':>12} {'speedup':>8}")
+    for size in sizes:
+        file_names, labels, image_names = make_dataset(size)
+        kwargs = {
+            "file_names": file_names,
+            "labels": labels,
+            "mandatory_train_filenames": image_names[:n_mandatory],
+            "mandatory_val_filenames": image_names[n_mandatory:2 * n_mandatory],
+        }
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            indexed_time, indexed_result = _time(
+                stratified_group_data_splitter_indexed, **kwargs
+            )
+            if size > skip_reference_above:
+                print(f"{size:>12} {'skipped':>14} {indexed_time:>12.3f} {'-':>8}")
+                continue
+            reference_time, reference_result = _time(
+                stratified_group_data_splitter, **kwargs
+            )
+
+        if reference_result != indexed_result:
+            raise AssertionError(f"indexed split differs from the reference at {size}")
+        print(
+            f"{size:>12} {reference_time:>14.3f} {indexed_time:>12.3f}"
+            f" {reference_time / indexed_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000, 1_000_000],
+        help="numbers of bounding box annotations to benchmark.",
+    )
+    parser.add_argument(
+        "--n-mandatory",
+        dest="n_mandatory",
+        type=int,
+        default=100,
+        help="number of mandatory train and mandatory val file names.",
+    )
+    parser.add_argument(
+        "--skip-reference-above",
+        dest="skip_reference_above",
+        type=int,
+        default=sys.maxsize,
+        help="only time the indexed splitter above this number of annotations.",
+    )
+    args = parser.parse_args()
+    main(args.sizes, args.n_mandatory, args.skip_reference_above)
@@ -1,10 +1,14 @@
 import os
+import threading
 import unittest
 from unittest.mock import patch, MagicMock
 
+import pandas as pd
+from werkzeug.datastructures import MultiDict
+
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', '..'))
-from app.automl_pipeline.deploy.scoring.online_endpoint_score import run, init
+from app.automl_pipeline.deploy.scoring.online_endpoint_score import run, init, MicroBatcher
 
 
 class TestRun(unittest.TestCase):
@@ -33,7 +37,7 @@ class TestRun(unittest.TestCase):
         request.files = {"image": image_mock}
 
         model_predict_result = MagicMock()
-        model_predict_result.to_json.return_value = '[{"test": "test"}]'
+        model_predict_result.to_dict.return_value = [{"test": "test"}]
         model_mock.predict.return_value = model_predict_result
 
         # Act
@@ -44,6 +48,29 @@ class TestRun(unittest.TestCase):
         self.assertEqual(response.response, [b'{"test": "test"}'])
 
 
+    @patch("app.automl_pipeline.deploy.scoring.online_endpoint_score.model")
+    def test_happy_path_multi_image_post_request(self, model_mock):
+        # Arrange
+        image_mocks = [MagicMock(), MagicMock()]
+        image_mocks[0].read.return_value = b"first"
+        image_mocks[1].read.return_value = b"second"
+
+        request = MagicMock()
+        request.method = "POST"
+        request.files = MultiDict([("images", image_mocks[0]), ("images", image_mocks[1])])
+
+        model_mock.predict.side_effect = lambda df: pd.DataFrame({"boxes": list(range(len(df)))})
+
+        # Act
+        response = run(request)
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.response, [b'[{"boxes":0},{"boxes":1}]'])
+        self.assertEqual(response.headers["Content-Type"], "application/json")
+        model_mock.predict.assert_called_once()
+        self.assertEqual(list(model_mock.predict.call_args[0][0]["image"]), ["Zmlyc3Q=\n", "c2Vjb25k\n"])
+
     def test_when_no_image_in_request_then_returns_bad_request(self):
         # Arrange
         request = MagicMock()
@@ -58,6 +85,57 @@ class TestRun(unittest.TestCase):
         self.assertEqual(response.response, [b'{"message": "No image found in the request. Please send the request with an image that has a key of \\"image\\"."}'])
 
 
+class TestMicroBatcher(unittest.TestCase):
+    def test_concurrent_requests_are_predicted_in_one_batch(self):
+        # Arrange
+        batch_sizes = []
+
+        def predict(df):
+            batch_sizes.append(len(df))
+            return pd.DataFrame({"image": df["image"].str.upper()})
+
+        batcher = MicroBatcher(predict, max_batch_size=4, max_wait_ms=1000)
+        results = {}
+
+        def send(images):
+            results[images[0]] = list(batcher.predict(images)["image"])
+
+        threads = [threading.Thread(target=send, args=(images,)) for images in (["a", "b"], ["c"], ["d"])]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        self.assertEqual(batch_sizes, [4])
+        self.assertEqual(results, {"a": ["A", "B"], "c": ["C"], "d": ["D"]})
+
+    def test_when_wait_expires_then_predicts_partial_batch(self):
+        # Arrange
+        predict = MagicMock(side_effect=lambda df: df)
+        batcher = MicroBatcher(predict, max_batch_size=8, max_wait_ms=1)
+
+        # Act
+        result = batcher.predict(["a"])
+
+        # Assert
+        self.assertEqual(list(result["image"]), ["a"])
+        predict.assert_called_once()
+
+    def test_when_predict_fails_then_raises_in_every_request(self):
+        # Arrange
+        batcher = MicroBatcher(MagicMock(side_effect=ValueError("test")), max_batch_size=2, max_wait_ms=1)
+
+        # Act
+        with self.assertRaises(ValueError) as error:
+            batcher.predict(["a"])
+
+        # Assert
+        self.assertEqual(str(error.exception), "test")
+
+
 class TestInit(unittest.TestCase):
     _model_path = os.path.join(os.path.dirname(__file__), "input-data")
 
@@ -44,6 +44,9 @@ class TestGetArgs(unittest.TestCase):
         self.assertEqual(args.environment_image, "test_image")
         self.assertEqual(args.compute_instance_type, "Standard_DS3_v2")
         self.assertEqual(args.compute_instance_count, 1)
+        self.assertEqual(args.max_concurrent_requests_per_instance, 1)
+        self.assertEqual(args.micro_batch_max_size, 1)
+        self.assertEqual(args.micro_batch_max_wait_ms, 5)
 
     @patch(
         "sys.argv",
@@ -136,6 +139,10 @@ class TestCreateOnlineEndpoint(unittest.TestCase):
         # assert
         self.assertEqual(actual_online_deployment.name, deployment_name)
         self.assertEqual(actual_online_endpoint.scoring_uri, scoring_uri)
+        self.assertEqual(
+            actual_online_deployment.environment_variables,
+            {"MICRO_BATCH_MAX_SIZE": "1", "MICRO_BATCH_MAX_WAIT_MS": "5"},
+        )
 
         ml_client.online_endpoints.begin_create_or_update.assert_called_once_with(
             ANY, local=True
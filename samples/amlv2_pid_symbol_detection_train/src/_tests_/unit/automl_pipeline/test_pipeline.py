@@ -161,6 +161,7 @@ class TestPipeline(unittest.TestCase):
                     mandatory_val_filenames=";",
                     stratified_split_n_fold=5,
                     use_stratified_split=True,
+                    use_streaming_split=False,
                 )
             ]
         )
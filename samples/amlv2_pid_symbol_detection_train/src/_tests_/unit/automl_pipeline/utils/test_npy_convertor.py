@@ -2,9 +2,15 @@ import unittest
 import numpy as np
 import sys
 import os
+import tempfile
+import cv2
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'app'))
 from app.automl_pipeline.utils.npy_convertor import NpyConvertor
+from app.automl_pipeline.utils.image_helper import ImageHelper
+
+INPUT_FILES_DIR = os.path.join(os.path.dirname(__file__), 'input_files')
 
 
 class TestNpyConvertor(unittest.TestCase):
@@ -46,3 +52,60 @@ class TestNpyConvertor(unittest.TestCase):
             ]
         }
         self.assertEqual(result, expected_result)
+
+    def test_to_jsonl_fast_matches_to_jsonl(self):
+        labels_map = {"1": "symbol_1", "2": "symbol_2"}
+        image_path = os.path.join(INPUT_FILES_DIR, '0.jpg')
+
+        for npy_array in [
+            np.array([['symbol_1', [10, 10, 20, 20], '1'], ['symbol_2', [100, 100, 200, 200], '2']], dtype=object),
+            np.array([['symbol_1', [3, 7.5, 11, 13], 1]], dtype=object),
+            np.empty((0, 3), dtype=object),
+        ]:
+            # act
+            result = NpyConvertor.to_jsonl_fast(npy_array, image_path, '0.jpg', labels_map)
+
+            # assert
+            self.assertEqual(result, NpyConvertor.to_jsonl(npy_array, image_path, '0.jpg', labels_map))
+
+    def test_convert_npy_files(self):
+        labels_map = {"1": "symbol_1", "2": "symbol_2"}
+        npy_array = np.array([['symbol_1', [10, 10, 20, 20], '1']], dtype=object)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            npy_files = []
+            for idx in range(3):
+                npy_file = os.path.join(temp_dir, f'{idx}_symbols.npy')
+                np.save(npy_file, npy_array, allow_pickle=True)
+                npy_files.append(npy_file)
+                os.link(os.path.join(INPUT_FILES_DIR, '0.jpg'), os.path.join(temp_dir, f'{idx}.jpg'))
+
+            # act
+            results = NpyConvertor.convert_npy_files(npy_files, temp_dir, labels_map, num_workers=2, chunksize=1)
+
+        # assert
+        self.assertEqual([result['image_url'] for result in results], ['0.jpg', '1.jpg', '2.jpg'])
+        self.assertEqual(results[0]['image_details']['width'], 7168)
+        self.assertEqual(results[0]['label'][0]['topX'], 10 / 7168)
+
+
+class TestImageHelper(unittest.TestCase):
+    """
+    This class will test reading the image dimensions from the image headers
+    """
+    def test_get_image_size_jpeg(self):
+        self.assertEqual(ImageHelper.get_image_size(os.path.join(INPUT_FILES_DIR, '0.jpg')), (7168, 4561))
+
+    def test_get_image_size_png(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            image_path = os.path.join(temp_dir, '0.png')
+            cv2.imwrite(image_path, np.zeros((30, 40, 3), dtype=np.uint8))
+
+            self.assertEqual(ImageHelper.get_image_size(image_path), (40, 30))
+
+    def test_get_image_size_unsupported_format(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            image_path = os.path.join(temp_dir, '0.bmp')
+            cv2.imwrite(image_path, np.zeros((30, 40, 3), dtype=np.uint8))
+
+            self.assertIsNone(ImageHelper.get_image_size(image_path))
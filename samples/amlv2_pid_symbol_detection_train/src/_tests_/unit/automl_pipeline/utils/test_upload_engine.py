@@ -0,0 +1,138 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'app'))
+from app.automl_pipeline.utils.upload_engine import UploadEngine, UploadMetrics
+
+
+class LocalBlobClient:
+    """
+    Blob client writing blobs into a local folder
+    """
+    def __init__(self, container, name):
+        self.container = container
+        self.name = name
+        self.path = os.path.join(container.root, name.lstrip('/'))
+        self.staged_blocks = {}
+
+    def upload_blob(self, data, overwrite=False, content_settings=None):
+        if self.container.fail_on and self.container.fail_on in self.name:
+            raise IOError(f'failed to upload {self.path}')
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'wb') as f:
+            f.write(data)
+        self.container.record(self.path, 'put')
+
+    def stage_block(self, block_id, data):
+        self.staged_blocks[block_id] = data
+
+    def commit_block_list(self, block_list, content_settings=None):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'wb') as f:
+            for block in block_list:
+                f.write(self.staged_blocks[block.id])
+        self.container.record(self.path, 'blocks')
+
+
+class LocalContainerClient:
+    """
+    Container client storing the blobs in a local folder
+    """
+    def __init__(self, root):
+        self.root = root
+        self.fail_on = None
+        self.uploads = []
+        self._lock = threading.Lock()
+
+    def get_blob_client(self, name):
+        return LocalBlobClient(self, name)
+
+    def record(self, path, kind):
+        with self._lock:
+            self.uploads.append((os.path.relpath(path, self.root), kind))
+
+
+class TestUploadEngine(unittest.TestCase):
+    """
+    This class will test the upload engine against a local folder backed container
+    """
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source_dir = os.path.join(self.temp_dir.name, 'source')
+        self.container = LocalContainerClient(os.path.join(self.temp_dir.name, 'container'))
+        self.checkpoint_path = os.path.join(self.temp_dir.name, 'checkpoint.jsonl')
+        os.makedirs(self.source_dir)
+        self.files = []
+        for idx in range(40):
+            file_path = os.path.join(self.source_dir, f'{idx}.jpg')
+            with open(file_path, 'wb') as f:
+                f.write(os.urandom(100 + idx))
+            self.files.append((file_path, f'images/{idx}.jpg'))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_upload_files(self):
+        engine = UploadEngine(self.container, concurrency=4, block_size=120)
+
+        metrics = engine.upload_files(self.files)
+
+        self.assertEqual(metrics.files, 40)
+        self.assertEqual(metrics.bytes, sum(100 + idx for idx in range(40)))
+        self.assertEqual(len(metrics.latencies), 40)
+        for file_path, blob_name in self.files:
+            self.assertEqual(self._read(os.path.join(self.container.root, blob_name)), self._read(file_path))
+        # files larger than the block size are uploaded in blocks
+        self.assertEqual(sorted(kind for _, kind in self.container.uploads).count('blocks'), 19)
+
+    def test_resume_skips_uploaded_blobs(self):
+        self.container.fail_on = '3'
+        engine = UploadEngine(self.container, concurrency=4, checkpoint_path=self.checkpoint_path)
+        with self.assertRaises(RuntimeError):
+            engine.upload_files(self.files)
+
+        self.container.fail_on = None
+        self.container.uploads = []
+        # a changed file is uploaded again even though it is in the checkpoint
+        with open(self.files[0][0], 'wb') as f:
+            f.write(b'changed')
+        engine = UploadEngine(self.container, concurrency=4, checkpoint_path=self.checkpoint_path)
+        metrics = engine.upload_files(self.files)
+
+        failed_blobs = {blob_name for _, blob_name in self.files if '3' in blob_name}
+        self.assertEqual(metrics.skipped, 40 - len(failed_blobs) - 1)
+        self.assertEqual({blob for blob, _ in self.container.uploads}, failed_blobs | {'images/0.jpg'})
+
+    def test_delete_after_upload(self):
+        engine = UploadEngine(self.container, concurrency=2, delete_after_upload=True)
+
+        engine.upload_files(self.files)
+
+        self.assertEqual(os.listdir(self.source_dir), [])
+
+    def test_auto_tuned_concurrency(self):
+        engine = UploadEngine(self.container, concurrency=None, min_concurrency=2, max_concurrency=8, tune_window=4)
+
+        metrics = engine.upload_files(self.files)
+
+        self.assertEqual(metrics.files, 40)
+        self.assertGreater(len(metrics.concurrency_history), 1)
+        self.assertTrue(all(2 <= concurrency <= 8 for concurrency in metrics.concurrency_history))
+
+
+class TestUploadMetrics(unittest.TestCase):
+    def test_throughput(self):
+        metrics = UploadMetrics(files=20, bytes=40 * 1024 * 1024, elapsed_seconds=2.0,
+                                latencies=[i / 100 for i in range(1, 21)])
+
+        self.assertEqual(metrics.files_per_second, 10.0)
+        self.assertEqual(metrics.mb_per_second, 20.0)
+        self.assertEqual(metrics.p95_latency_seconds, 0.19)
@@ -0,0 +1,74 @@
+import io
+import os
+import sys
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', 'app'))
+from app.automl_pipeline.utils.zip_helper import ZipHelper
+from app.automl_pipeline.utils.file_helper import FileHelper
+
+MEMBERS = {
+    'dataset/images/0.jpg': b'image 0',
+    'dataset/labels/0_symbols.npy': b'labels 0',
+}
+
+
+class TestZipHelper(unittest.TestCase):
+    """
+    This class will test reading archives member by member
+    """
+    def test_iter_members_zip(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            archive_path = os.path.join(temp_dir, 'dataset.zip')
+            with zipfile.ZipFile(archive_path, 'w') as archive:
+                archive.writestr('dataset/images/', '')
+                for name, data in MEMBERS.items():
+                    archive.writestr(name, data)
+
+            # act
+            members = {name: reader.read() for name, reader in ZipHelper.iter_members(archive_path)}
+
+        # assert
+        self.assertEqual(members, MEMBERS)
+
+    def test_iter_members_tar_gz_stream(self):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+            for name, data in MEMBERS.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+        buffer.seek(0)
+
+        # act
+        members = {name: reader.read() for name, reader in ZipHelper.iter_members('dataset.tar.gz', fileobj=buffer)}
+
+        # assert
+        self.assertEqual(members, MEMBERS)
+
+
+class TestFileHelper(unittest.TestCase):
+    """
+    This class will test moving directory trees
+    """
+    def test_move_tree(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source_dir = os.path.join(temp_dir, 'source')
+            destination_dir = os.path.join(temp_dir, 'destination')
+            os.makedirs(os.path.join(source_dir, 'nested'))
+            for name in ['0.jpg', os.path.join('nested', '1.jpg')]:
+                with open(os.path.join(source_dir, name), 'w') as f:
+                    f.write(name)
+
+            # act
+            FileHelper.move_tree(source_dir, destination_dir)
+
+            # assert
+            self.assertEqual(sorted(FileHelper.list_files_endwith(source_dir, '.jpg')), [])
+            self.assertEqual(sorted(os.path.relpath(file, destination_dir)
+                                    for file in FileHelper.list_files_endwith(destination_dir, '.jpg')),
+                             ['0.jpg', os.path.join('nested', '1.jpg')])
@@ -1,9 +1,12 @@
 import json
 import unittest
 import os
+import shutil
 import sys
+import tempfile
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..', '..'))
-from app.pipeline_steps.data_aggregation_src.utils.mltable_aggregator import MltableAggregator
+from app.pipeline_steps.data_aggregation_src.utils.mltable_aggregator import (
+    MltableAggregator, aggregate_label_file, rewrite_image_url)
 
 THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -99,6 +102,106 @@ class TestMltableAggregator(unittest.TestCase):
         self.assertEqual(len(actual_json_lines), len(expected_json_lines))
         self.assertTrue(line in actual_json_lines for line in expected_json_lines)
 
+    def test_rewrite_image_url(self):
+
+        # Arrange
+        mltable_aggregator = MltableAggregator("/path/to/images", "/path/to/labels", "absolute/path/to/images", "/path/to/output")
+        lines = [
+            "{\"image_url\": \"X.jpg\"}\n",
+            "{\"image_url\":\"folder/Y \\\"1\\\".jpg\",\"label\":[{\"label\":\"1\"}]}",
+            "{\"label\": [{\"image_url\": \"nested.jpg\"}], \"image_url\": \"Z.jpg\"}",
+        ]
+
+        for line in lines:
+            # Act
+            actual_line = rewrite_image_url(line, "absolute/path/to/images")
+
+            # Assert
+            self.assertEqual(json.loads(actual_line),
+                             json.loads(mltable_aggregator.set_absolute_image_path_in_label(line)))
+
+    def test_aggregate_label_file_skips_malformed_lines(self):
+
+        # Arrange
+        with tempfile.TemporaryDirectory() as temp_dir:
+            label_file = os.path.join(temp_dir, "0.jsonl")
+            part_file = os.path.join(temp_dir, "0.part.jsonl")
+            with open(label_file, "w") as f:
+                f.write("{\"image_url\": \"x/a.jpg\", \"label\": []}\n")
+                f.write("{\"image_url\": \"x/b.jpg\", \"label\": [\n")
+                f.write("{\"image_url\": \"x/c.jpg\", \"label\": []}\n")
+
+            # Act
+            entry = aggregate_label_file(label_file, part_file, "/abs")
+
+            with open(part_file) as f:
+                image_urls = [json.loads(line)["image_url"] for line in f]
+
+        # Assert
+        self.assertEqual(entry["lines"], 2)
+        self.assertEqual(entry["errors"], 1)
+        self.assertEqual(image_urls, ["/abs/a.jpg", "/abs/c.jpg"])
+        with self.assertRaises(ValueError):
+            rewrite_image_url("{\"image_url\": \"x/b.jpg\", \"label\": [", "/abs")
+
+    def test_aggregate_label_mltables_parallel(self):
+
+        # Arrange
+        input_label_data_path = os.path.join(THIS_DIR, 'test_data/labels/')
+        input_images_string_absolute_path = "absolute/path/to/images"
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            sequential_output_path = os.path.join(temp_dir, "sequential")
+            parallel_output_path = os.path.join(temp_dir, "parallel")
+            os.makedirs(sequential_output_path)
+            os.makedirs(parallel_output_path)
+
+            MltableAggregator("", input_label_data_path, input_images_string_absolute_path,
+                              sequential_output_path).create_aggregated_mltable_file()
+
+            # Act
+            MltableAggregator("", input_label_data_path, input_images_string_absolute_path,
+                              parallel_output_path, num_workers=2).create_aggregated_mltable_file()
+
+            # Assert
+            actual_json_lines = []
+            expected_json_lines = []
+            for output_path, json_lines in [(parallel_output_path, actual_json_lines),
+                                            (sequential_output_path, expected_json_lines)]:
+                with open(os.path.join(output_path, "annotations.jsonl")) as f:
+                    json_lines.extend(json.loads(line) for line in f if line.strip())
+                self.assertTrue(os.path.isfile(os.path.join(output_path, "MLTable")))
+
+        self.assertEqual(sorted(actual_json_lines, key=json.dumps), sorted(expected_json_lines, key=json.dumps))
+
+    def test_aggregate_label_mltables_parallel_is_incremental(self):
+
+        # Arrange
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_label_data_path = os.path.join(temp_dir, "labels")
+            cache_path = os.path.join(temp_dir, "cache")
+            shutil.copytree(os.path.join(THIS_DIR, 'test_data/labels/'), input_label_data_path)
+
+            mltable_aggregator = MltableAggregator("", input_label_data_path, "absolute/path/to/images",
+                                                   temp_dir, num_workers=2, cache_path=cache_path)
+
+            # Act
+            first_stats = mltable_aggregator.aggregate_label_mltables_parallel(cache_path)
+            second_stats = mltable_aggregator.aggregate_label_mltables_parallel(cache_path)
+            with open(os.path.join(input_label_data_path, "2.jsonl"), "w") as f:
+                f.write("{\"image_url\": \"2.jpg\", \"label\": []}\n")
+            os.remove(os.path.join(input_label_data_path, "0.jsonl"))
+            third_stats = mltable_aggregator.aggregate_label_mltables_parallel(cache_path)
+
+            with open(os.path.join(temp_dir, "annotations.jsonl")) as f:
+                image_urls = [json.loads(line)["image_url"] for line in f]
+
+        # Assert
+        self.assertEqual(first_stats, {"processed": 2, "reused": 0, "removed": 0})
+        self.assertEqual(second_stats, {"processed": 0, "reused": 2, "removed": 0})
+        self.assertEqual(third_stats, {"processed": 1, "reused": 1, "removed": 1})
+        self.assertEqual(image_urls, [os.path.join("absolute/path/to/images", name) for name in ["1.jpg", "2.jpg"]])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -7,7 +7,9 @@ import numpy as np
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
 from app.pipeline_steps.data_splitter_src.data_splitter import (
     stratified_group_data_splitter,
+    stratified_group_data_splitter_indexed,
     get_file_paths,
+    get_file_paths_indexed,
 )
 
 
@@ -158,3 +160,58 @@ class TestDataSplitter(unittest.TestCase):
         # all file in mandatory_val_filenames in val, not in train
         assert set(mandatory_val_filenames).issubset(set(val_files))
 
+    def test_get_file_paths_indexed(self):
+        all_filepaths = [
+            "azureml://paths/0.jpg",
+            "azureml://paths/0_upsampled_01.upsampled.jpg",
+            "azureml://paths/1.jpg",
+            "azureml://paths/1_upsampled_01.upsampled.jpg",
+            "azureml://paths/1_upsampled_02.upsampled.jpg",
+            "azureml://paths/10_upsampled_01.upsampled.jpg",
+            "azureml://paths/1_upsampled_01.upsampled.png",
+            "azureml://paths/2.jpg",
+            "azureml://other/2.jpg",
+        ]
+
+        for search_filenames in [["0.jpg", "2.jpg"], ["1.jpg"], ["4.jpg"], []]:
+            for include_upsample_files in [True, False]:
+                self.assertEqual(
+                    get_file_paths_indexed(
+                        search_filenames=search_filenames,
+                        all_filepaths=all_filepaths,
+                        include_upsample_files=include_upsample_files,
+                    ),
+                    get_file_paths(
+                        search_filenames=search_filenames,
+                        all_filepaths=all_filepaths,
+                        include_upsample_files=include_upsample_files,
+                    ),
+                )
+
+    def test_indexed_splitter_matches_reference(self):
+        file_names = self.sample_dataset["file_names"]
+        y = self.sample_dataset["y"]
+        unique_file_names = sorted(set(file_names))
+
+        for kwargs in [
+            {"add_rare_to_val": True},
+            {"add_rare_to_val": False},
+            {"n_splits": 3},
+            {
+                "mandatory_train_filenames": unique_file_names[:3],
+                "mandatory_val_filenames": [unique_file_names[-3]],
+            },
+        ]:
+            expected = stratified_group_data_splitter(
+                file_names=file_names, labels=y, **kwargs
+            )
+            actual = stratified_group_data_splitter_indexed(
+                file_names=file_names, labels=y, **kwargs
+            )
+            self.assertEqual(actual, expected)
+
+    def test_indexed_splitter_raises_on_length_mismatch(self):
+        with self.assertRaises(ValueError):
+            stratified_group_data_splitter_indexed(
+                file_names=["0.jpg", "1.jpg"], labels=["A"]
+            )
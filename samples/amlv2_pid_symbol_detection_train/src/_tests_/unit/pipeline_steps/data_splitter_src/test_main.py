@@ -1,5 +1,7 @@
 import os
 import sys
+import json
+import random
 import unittest
 import tempfile
 from pathlib import Path
@@ -17,7 +19,52 @@ sys.path.append(
         "data_splitter_src",
     )
 )
-from app.pipeline_steps.data_splitter_src.main import main
+from app.pipeline_steps.data_splitter_src.main import (
+    main,
+    read_jsonl_columns,
+    split_jsonl,
+    split_jsonl_streaming,
+)
+
+
+def _write_empty_label_file(jsonl_dir: Path, num_empty_files: int):
+    with Path(jsonl_dir / "empty.jsonl").open("w") as f:
+        for file_idx in range(num_empty_files):
+            f.write(
+                json.dumps({"image_url": f"azureml://paths/empty_{file_idx}.jpg", "label": []})
+                + "\n"
+            )
+            # an empty label list of an image with bounding boxes in another line
+            f.write(
+                json.dumps({"image_url": f"azureml://paths/{file_idx}.jpg", "label": []})
+                + "\n"
+            )
+
+
+def _write_label_files(jsonl_dir: Path, num_files: int = 60, num_empty_files: int = 0):
+    classes = ["A", "B", "C"]
+    if num_empty_files:
+        _write_empty_label_file(jsonl_dir, num_empty_files)
+    for part in range(2):
+        with Path(jsonl_dir / f"{part}.jsonl").open("w") as f:
+            for file_idx in range(part, num_files, 2):
+                labels = [
+                    {"label": random.choice(classes), "topX": 0.1}
+                    for _ in range(random.randint(1, 5))
+                ]
+                if file_idx == 7:
+                    labels.append({"label": "D", "topX": 0.2})
+                f.write(
+                    json.dumps(
+                        {"image_url": f"azureml://paths/{file_idx}.jpg", "label": labels}
+                    )
+                    + "\n"
+                )
+
+
+def _read_image_urls(jsonl_path: Path):
+    with jsonl_path.open() as f:
+        return sorted(json.loads(line)["image_url"] for line in f if line.strip())
 
 
 class TestMain(unittest.TestCase):
@@ -43,3 +90,62 @@ class TestMain(unittest.TestCase):
         self.assertTrue(Path(Path(val_output_path) / "MLTable").is_file())
 
         temp_out_dir.cleanup()
+
+    def test_read_jsonl_columns(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            jsonl_dir = Path(temp_dir)
+            _write_label_files(jsonl_dir, num_files=10)
+
+            columns = read_jsonl_columns(jsonl_dir)
+
+        self.assertEqual(len(columns.image_urls), 10)
+        self.assertEqual(len(columns.line_image_codes), 10)
+        self.assertEqual(len(columns.box_offsets), 11)
+        self.assertEqual(columns.box_offsets[-1], len(columns.box_label_codes))
+        self.assertEqual(len(columns.box_image_codes), len(columns.box_label_codes))
+        self.assertIn("D", columns.label_names)
+
+    def test_split_jsonl_streaming_matches_split_jsonl(self):
+        self._assert_split_jsonl_streaming_matches_split_jsonl(num_empty_files=0)
+
+    def test_split_jsonl_streaming_matches_split_jsonl_with_empty_labels(self):
+        self._assert_split_jsonl_streaming_matches_split_jsonl(num_empty_files=6)
+
+    def _assert_split_jsonl_streaming_matches_split_jsonl(self, num_empty_files: int):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            jsonl_dir = Path(temp_dir) / "input"
+            jsonl_dir.mkdir()
+            _write_label_files(jsonl_dir, num_empty_files=num_empty_files)
+            train_output_dir = Path(temp_dir) / "train"
+            val_output_dir = Path(temp_dir) / "val"
+
+            jsonl_train, jsonl_val = split_jsonl(
+                jsonl_dir=jsonl_dir, mandatory_train_filenames=["3.jpg"]
+            )
+            df_train_classes, df_val_classes = split_jsonl_streaming(
+                jsonl_dir=jsonl_dir,
+                train_output_dir=train_output_dir,
+                val_output_dir=val_output_dir,
+                mandatory_train_filenames=["3.jpg"],
+            )
+
+            self.assertEqual(
+                _read_image_urls(train_output_dir / "annotations.jsonl"),
+                sorted(jsonl["image_url"] for jsonl in jsonl_train),
+            )
+            self.assertEqual(
+                _read_image_urls(val_output_dir / "annotations.jsonl"),
+                sorted(jsonl["image_url"] for jsonl in jsonl_val),
+            )
+            self.assertNotIn(
+                "azureml://paths/empty_0.jpg",
+                _read_image_urls(train_output_dir / "annotations.jsonl"),
+            )
+        self.assertEqual(
+            df_train_classes["class_count"].sum(),
+            sum(len(jsonl["label"]) for jsonl in jsonl_train),
+        )
+        self.assertEqual(
+            df_val_classes["class_count"].sum(),
+            sum(len(jsonl["label"]) for jsonl in jsonl_val),
+        )
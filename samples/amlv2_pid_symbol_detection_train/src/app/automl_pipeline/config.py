@@ -25,6 +25,7 @@ class Config(object):
 
     _stratified_split_n_fold = None
     _use_stratified_split = None
+    _use_streaming_split = None
     _mandatory_train_filenames = None
     _mandatory_val_filenames = None
 
@@ -57,6 +58,9 @@ class Config(object):
         self._use_stratified_split = str2bool(
             os.getenv("USE_STRATIFIED_SPLIT", default=True)
         )
+        self._use_streaming_split = str2bool(
+            os.getenv("USE_STREAMING_SPLIT", default=False)
+        )
         self._mandatory_train_filenames = os.getenv(
             "MANDATORY_TRAIN_FILENAMES", default=";"
         )
@@ -185,6 +189,10 @@ class Config(object):
     def use_stratified_split(self) -> int:
         return self._use_stratified_split
 
+    @property
+    def use_streaming_split(self) -> bool:
+        return self._use_streaming_split
+
     @property
     def stratified_split_n_fold(self) -> int:
         return self._stratified_split_n_fold
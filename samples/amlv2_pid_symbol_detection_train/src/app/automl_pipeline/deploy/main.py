@@ -106,6 +106,27 @@ def get_args():
         default=60000,
         help="The request timeout in ms",
     )
+    parser.add_argument(
+        "--max-concurrent-requests-per-instance",
+        dest="max_concurrent_requests_per_instance",
+        type=int,
+        default=1,
+        help="The number of concurrent requests per instance, raise it to let the micro-batcher coalesce requests",
+    )
+    parser.add_argument(
+        "--micro-batch-max-size",
+        dest="micro_batch_max_size",
+        type=int,
+        default=1,
+        help="The max number of images the scoring script predicts at once, 1 disables micro-batching",
+    )
+    parser.add_argument(
+        "--micro-batch-max-wait-ms",
+        dest="micro_batch_max_wait_ms",
+        type=float,
+        default=5,
+        help="The max time in ms the scoring script waits for more requests to fill a micro-batch",
+    )
     parser.add_argument(
         "--box-score-thresh",
         dest="box_score_thresh",
@@ -230,6 +251,9 @@ def create_online_endpoint(
     tile_grid_size: Optional[Union[List[int], str]] = None,
     tile_overlap_ratio: Optional[float] = None,
     tile_predictions_nms_thresh: Optional[float] = None,
+    max_concurrent_requests_per_instance: int = 1,
+    micro_batch_max_size: int = 1,
+    micro_batch_max_wait_ms: float = 5,
 ):
     print("Creating or getting the online endpoint...")
     online_endpoint = None
@@ -310,7 +334,12 @@ def create_online_endpoint(
         egress_public_network_access="disabled",
         request_settings=OnlineRequestSettings(
             request_timeout_ms=request_timeout_ms,
+            max_concurrent_requests_per_instance=max_concurrent_requests_per_instance,
         ),
+        environment_variables={
+            "MICRO_BATCH_MAX_SIZE": str(micro_batch_max_size),
+            "MICRO_BATCH_MAX_WAIT_MS": str(micro_batch_max_wait_ms),
+        },
     )
 
     online_deployment_result = ml_client.online_deployments.begin_create_or_update(
@@ -360,6 +389,9 @@ if __name__ == "__main__":
             )
     tile_overlap_ratio = args.tile_overlap_ratio
     tile_predictions_nms_thresh = args.tile_overlap_ratio
+    max_concurrent_requests_per_instance = args.max_concurrent_requests_per_instance
+    micro_batch_max_size = args.micro_batch_max_size
+    micro_batch_max_wait_ms = args.micro_batch_max_wait_ms
 
     if is_local_deployment is False and not model_name:
         raise Exception("The model name is required for non-local deployments")
@@ -392,6 +424,9 @@ if __name__ == "__main__":
         tile_grid_size,
         tile_overlap_ratio,
         tile_predictions_nms_thresh,
+        max_concurrent_requests_per_instance,
+        micro_batch_max_size,
+        micro_batch_max_wait_ms,
     )
 
     print("Online deployment created successfully.")
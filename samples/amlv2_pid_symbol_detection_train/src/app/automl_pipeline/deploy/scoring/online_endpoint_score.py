@@ -2,11 +2,16 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # ---------------------------------------------------------
 import os
+import json
 import mlflow.pyfunc
 import base64
 import pandas as pd
-import json
 import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Tuple
 from azureml.contrib.services.aml_request import rawhttp
 from azureml.contrib.services.aml_response import AMLResponse
 from azureml.contrib.services.aml_request import AMLRequest
@@ -14,11 +19,15 @@ from azureml.contrib.services.aml_request import AMLRequest
 
 TASK_TYPE = 'image-object-detection'
 IMAGE_FILE_KEY = 'image'
+# key of the multi-image request format, repeated once per image
+IMAGES_FILE_KEY = 'images'
+JSON_HEADERS = {'Content-Type': 'application/json'}
 
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 model = None
+batcher = None
 
 
 class RequestMethods:
@@ -26,8 +35,60 @@ class RequestMethods:
     POST = 'POST'
 
 
+class MicroBatcher:
+    """
+    Coalesces the images of concurrent requests into a single predict call. The
+    worker thread waits up to max_wait_ms after the first queued request, or until
+    max_batch_size images are queued, before calling predict.
+    """
+
+    def __init__(self, predict: Callable[[pd.DataFrame], pd.DataFrame], max_batch_size: int, max_wait_ms: float):
+        self._predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def predict(self, images: List[str]) -> pd.DataFrame:
+        """Queue the base64 encoded images of a request and wait for their predictions."""
+        future = Future()
+        self._queue.put((images, future))
+        return future.result()
+
+    def _next_batch(self) -> List[Tuple[List[str], Future]]:
+        batch = [self._queue.get()]
+        batch_size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait_seconds
+        while batch_size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            batch_size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                result = self._predict(_create_request_df([image for images, _ in batch for image in images]))
+                offset = 0
+                for images, future in batch:
+                    future.set_result(result.iloc[offset:offset + len(images)])
+                    offset += len(images)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+
 def init():
     global model
+    global batcher
 
     # Set up logging
     azure_model_dir = os.path.join(os.getenv('AZUREML_MODEL_DIR'))
@@ -49,6 +110,29 @@ def init():
         logger.error("Loading failed: {}.".format(e))
         raise
 
+    # micro-batching is enabled with a max batch size above 1
+    max_batch_size = int(os.getenv('MICRO_BATCH_MAX_SIZE', 1))
+    max_wait_ms = float(os.getenv('MICRO_BATCH_MAX_WAIT_MS', 5))
+    if max_batch_size > 1:
+        logger.info("Micro-batching up to {} images for {} ms.".format(max_batch_size, max_wait_ms))
+        batcher = MicroBatcher(model.predict, max_batch_size, max_wait_ms)
+    else:
+        batcher = None
+
+
+def _create_request_df(images: List[str]) -> pd.DataFrame:
+    return pd.DataFrame(data=images, columns=["image"])
+
+
+def _encode_image(file_bytes) -> str:
+    return base64.encodebytes(file_bytes.read()).decode('utf-8')
+
+
+def _predict(images: List[str]) -> pd.DataFrame:
+    if batcher is not None:
+        return batcher.predict(images)
+    return model.predict(_create_request_df(images))
+
 
 def _create_error_message(message: str):
     return {
@@ -64,6 +148,16 @@ def run(request: AMLRequest):
         return AMLResponse(response_body, 200)
 
     elif request.method == RequestMethods.POST:
+        if IMAGES_FILE_KEY in request.files:
+            # multi-image request, the results are returned as a list in the order of the images
+            images = [_encode_image(file_bytes) for file_bytes in request.files.getlist(IMAGES_FILE_KEY)]
+            logger.info("The request contains {} valid files... Passing the request to the model...".format(len(images)))
+
+            result = _predict(images).to_json(orient='records')
+
+            logger.info("Finished running inference on the images.")
+            return AMLResponse(result, 200, response_headers=JSON_HEADERS)
+
         if IMAGE_FILE_KEY not in request.files:
             return AMLResponse(
                 _create_error_message('No image found in the request. Please send the request with an image that has a key of "image".'),
@@ -73,13 +167,9 @@ def run(request: AMLRequest):
 
         logger.info("The request contains a valid file... Passing the request to the model...")
         file_bytes = request.files[IMAGE_FILE_KEY]
-        request_df = pd.DataFrame(
-            data=[base64.encodebytes(file_bytes.read()).decode('utf-8')],
-            columns=["image"],
-        )
 
-        result = model.predict(request_df).to_json(orient='records')
-        result = json.loads(result)[0]
+        # the single record of the image is returned without the enclosing list
+        result = json.dumps(_predict([_encode_image(file_bytes)]).to_dict(orient='records')[0])
 
         logger.info("Finished running inference on the image.")
-        return AMLResponse(result, 200, json_str=True)
+        return AMLResponse(result, 200, response_headers=JSON_HEADERS)
@@ -48,6 +48,7 @@ def pipeline_steps_setup(
             mandatory_val_filenames=mandatory_val_filenames,
             use_stratified_split=config.use_stratified_split,
             stratified_split_n_fold=stratified_split_n_fold,
+            use_streaming_split=config.use_streaming_split,
         )
 
         register_data_asset_step = ComponentsRepository.register_data_asset(
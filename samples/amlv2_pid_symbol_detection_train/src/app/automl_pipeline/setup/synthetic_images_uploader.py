@@ -1,15 +1,18 @@
 import os
 import json
+import queue
+import shutil
 import argparse
 import subprocess
+import urllib.request
+import concurrent.futures
+from pathlib import PurePosixPath
+from typing import Dict, List, Optional, Tuple
 from dotenv import load_dotenv
-import numpy as np
-from tqdm import tqdm
 from automl_pipeline.utils.uploader_client import UploaderClient
 from automl_pipeline.utils.zip_helper import ZipHelper
 from automl_pipeline.utils.npy_convertor import NpyConvertor
 from automl_pipeline.utils.file_helper import FileHelper
-import distutils.dir_util
 
 load_dotenv()
 label_config_map_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'label_config_map.json')
@@ -21,17 +24,128 @@ def get_args():
     parser.add_argument('--raw-input-path', dest='raw_input_path', type=str, required=True)
     parser.add_argument('--image-output-path', dest='image_output_path', type=str, required=True)
     parser.add_argument('--label-output-path', dest='label_output_path', type=str, required=True)
+    parser.add_argument('--num-workers', dest='num_workers', type=int, default=os.cpu_count(),
+                        help='Number of worker processes converting the npy label files.')
+    parser.add_argument('--streaming', dest='streaming', action='store_true',
+                        help='Upload the images while the archive is downloaded and extracted.')
+    parser.add_argument('--upload-workers', dest='upload_workers', type=int, default=10,
+                        help='Number of threads uploading the images in streaming mode.')
+    parser.add_argument('--queue-size', dest='queue_size', type=int, default=1000,
+                        help='Maximum number of extracted images waiting for upload in streaming mode.')
 
     args = parser.parse_args()
     return args
 
 
+def get_member_destination(member_name: str, image_output_path: str, labels_dir: str) -> Optional[str]:
+    """
+    map an archive member under an images/ or labels/ folder to its destination path
+    """
+    parts = PurePosixPath(member_name).parts
+    for folder, destination_dir in [('images', image_output_path), ('labels', labels_dir)]:
+        if folder in parts[:-1]:
+            relative_parts = parts[parts.index(folder) + 1:]
+            if '..' in relative_parts:
+                return None
+            return os.path.join(destination_dir, *relative_parts)
+    return None
+
+
+def _put(file_queue: queue.Queue, file_path: Optional[str], upload_futures: List[concurrent.futures.Future]):
+    """
+    put a file in the bounded upload queue, raising the first upload error instead of blocking forever
+    """
+    while True:
+        try:
+            file_queue.put(file_path, timeout=1)
+            return
+        except queue.Full:
+            for future in upload_futures:
+                if future.done() and future.exception() is not None:
+                    raise future.exception()
+
+
+def streaming_ingest(raw_input_path: str, raw_url: str, image_output_path: str, labels_dir: str,
+                     uploader_client: UploaderClient, upload_workers: int = 10,
+                     queue_size: int = 1000) -> Tuple[Dict[str, Tuple[int, int]], List[str]]:
+    """
+    extract the archive member by member straight to the image output path and the labels
+    directory, while a pool of upload workers drains the extracted images from a bounded queue.
+    A .tar.gz archive which is not available locally is read from the raw url as it downloads.
+
+    Returns:
+        Tuple[Dict[str, Tuple[int, int]], List[str]]: (width, height) of each image by name, read
+         from the image headers before upload, and the extracted npy label files
+    """
+    image_sizes = {}
+    npy_files = []
+    file_queue = queue.Queue(maxsize=queue_size)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=upload_workers) as executor:
+        upload_futures = [executor.submit(uploader_client.upload_from_queue, file_queue) for _ in range(upload_workers)]
+        try:
+            if os.path.exists(raw_input_path) or not raw_input_path.endswith('.tar.gz'):
+                if not os.path.exists(raw_input_path):
+                    download(raw_input_path, raw_url)
+                members = ZipHelper.iter_members(raw_input_path)
+                response = None
+            else:
+                print(f'Streaming {raw_input_path} from {raw_url}')
+                response = urllib.request.urlopen(raw_url)
+                members = ZipHelper.iter_members(raw_input_path, fileobj=response)
+
+            for member_name, reader in members:
+                destination = get_member_destination(member_name, image_output_path, labels_dir)
+                if destination is None:
+                    continue
+                FileHelper.ensure_folder_exists(os.path.dirname(destination))
+                with open(destination, 'wb') as f:
+                    shutil.copyfileobj(reader, f)
+
+                if destination.startswith(labels_dir):
+                    if destination.endswith('symbols.npy'):
+                        npy_files.append(destination)
+                    continue
+                image_size = NpyConvertor.get_image_size(destination)
+                if image_size is not None:
+                    image_sizes[os.path.basename(destination)] = image_size
+                _put(file_queue, destination, upload_futures)
+
+            if response is not None:
+                response.close()
+        finally:
+            # one sentinel per upload worker
+            for _ in upload_futures:
+                _put(file_queue, None, upload_futures)
+
+        uploaded = sum(future.result() for future in upload_futures)
+    print(f'Uploaded {uploaded} images while extracting {raw_input_path}')
+    return image_sizes, npy_files
+
+
+def download(raw_input_path: str, raw_url: str):
+    """
+    download the raw input zip file from the raw blob SAS url
+    """
+    print(f'Downloading {raw_input_path} from {raw_url}')
+
+    # download the raw input zip file from the raw blob SAS url
+    curl_command = ['curl', '-o', raw_input_path, raw_url]
+
+    completed_process = subprocess.run(curl_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    print(completed_process.stdout.decode('utf-8'))
+
+
 def main():
     # unzip the raw input path
     args = get_args()
     raw_input_path = args.raw_input_path
     image_output_path = args.image_output_path
     label_output_path = args.label_output_path
+    num_workers = args.num_workers
+    streaming = args.streaming
+    upload_workers = args.upload_workers
+    queue_size = args.queue_size
 
     # this is the raw blob SAS url
     raw_url = args.raw_url
@@ -46,67 +160,64 @@ def main():
     FileHelper.ensure_folder_exists(image_output_path)
     FileHelper.ensure_folder_exists(label_output_path)
 
-    # download the raw input zip file from the raw blob SAS url
-    if not os.path.exists(raw_input_path):
-        print(f'Downloading {raw_input_path} from {raw_url}')
-
-        # download the raw input zip file from the raw blob SAS url
-        curl_command = ['curl', '-o', raw_input_path, raw_url]
-
-        completed_process = subprocess.run(curl_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-        print(completed_process.stdout.decode('utf-8'))
-
-    # unzip the raw input zip file to a temp directory in the same folder as the raw input path
+    uploader_client = UploaderClient(storage_account_connection_string, storage_account_container_name)
     temp_dir = os.path.join(os.path.dirname(raw_input_path), 'temp')
-    print(f'Unzipping {raw_input_path} to {temp_dir}')
-    ZipHelper.unzip(raw_input_path, temp_dir)
-    print(f'Unzipped {raw_input_path} to {temp_dir}')
-
-    # extract file name from raw input path
-    file_extension = os.path.splitext(raw_input_path)[1]
-    unarchive_folder_name = os.path.join(temp_dir, os.path.basename(raw_input_path).replace(file_extension, ''))
-
-    # copy all images to the image output path after unzipping from the images directory in the temp directory
-    images_dir = os.path.join(unarchive_folder_name, 'images')
-    print(f'Copy all jpg files from {images_dir} to {image_output_path}')
 
-    # copy all jpg files from the images directory to the image output path
-    try:
-        distutils.dir_util.copy_tree(images_dir, image_output_path)
-        print("Copying successful")
-    except Exception as e:
-        print("Error:", e)
+    if streaming:
+        # images are uploaded (and deleted) while the archive is extracted, so their dimensions are
+        # read from their headers as they are extracted
+        labels_dir = os.path.join(temp_dir, 'labels')
+        image_sizes, npy_files = streaming_ingest(raw_input_path, raw_url, image_output_path, labels_dir,
+                                                  uploader_client, upload_workers, queue_size)
+        images_dir = image_output_path
+    else:
+        # download the raw input zip file from the raw blob SAS url
+        if not os.path.exists(raw_input_path):
+            download(raw_input_path, raw_url)
+
+        # unzip the raw input zip file to a temp directory in the same folder as the raw input path
+        print(f'Unzipping {raw_input_path} to {temp_dir}')
+        ZipHelper.unzip(raw_input_path, temp_dir)
+        print(f'Unzipped {raw_input_path} to {temp_dir}')
+
+        # extract file name from raw input path
+        file_extension = os.path.splitext(raw_input_path)[1]
+        unarchive_folder_name = os.path.join(temp_dir, os.path.basename(raw_input_path).replace(file_extension, ''))
+
+        # move all images to the image output path after unzipping from the images directory in the temp directory
+        unarchived_images_dir = os.path.join(unarchive_folder_name, 'images')
+        print(f'Move all jpg files from {unarchived_images_dir} to {image_output_path}')
+
+        # move instead of copying all jpg files from the images directory to the image output path
+        try:
+            FileHelper.move_tree(unarchived_images_dir, image_output_path)
+            print("Moving successful")
+        except Exception as e:
+            print("Error:", e)
+
+        images_dir = image_output_path
+        image_sizes = None
+        labels_dir = os.path.join(unarchive_folder_name, 'labels')
+        npy_files = FileHelper.list_files_endwith(labels_dir, 'symbols.npy')
 
     # load all npy files containing label information and convert them to a jsonl file compatible with Azure Machine Learning Tables
     # all labels needs to be normalized to a value between 0 and 1 as per the dimensions of the image
     # the jsonl file will contain the following fields: image_url, "image_details (format, width and height) and labels (label, topX, topY,
     # bottomX, bottomY) in normalized values
     print('Converting npy files to jsonl format...')
-    jsonl_file = []
-    labels_dir = os.path.join(unarchive_folder_name, 'labels')
-
-    for npy_file in tqdm(FileHelper.list_files_endwith(labels_dir, 'symbols.npy')):
-        # load the npy file
-        npy_array = np.load(npy_file, allow_pickle=True)
 
-        # get the image name
-        image_name = os.path.basename(npy_file).replace('_symbols.npy', '.jpg')
-
-        # load image and get its dimenstions
-        image_path = os.path.join(images_dir, image_name)
-
-        json_line = NpyConvertor.to_jsonl(npy_array, image_path, image_name, label_config_map)
-
-        # append the json line to the jsonl file
-        jsonl_file.append(json_line)
+    # the image dimensions are read from the image headers, and the files are converted by a process pool
+    jsonl_file = NpyConvertor.convert_npy_files(npy_files, images_dir, label_config_map, num_workers=num_workers,
+                                                image_sizes=image_sizes)
+    print(f'Converted {len(jsonl_file)} npy files')
 
     # write the jsonl file to the label output path
     jsonl_file_path = os.path.join(label_output_path, 'synthetic-image-annotations.jsonl')
     FileHelper.save_jsonl(jsonl_file, jsonl_file_path)
 
     # upload files located in the image output path to Azure Blob Storage
-    uploader_client = UploaderClient(storage_account_connection_string, storage_account_container_name)
-    uploader_client.upload(image_output_path, "")
+    if not streaming:
+        uploader_client.upload(image_output_path, "")
 
     # upload files located in the label output path to Azure Blob Storage
     uploader_client.upload(label_output_path, "")
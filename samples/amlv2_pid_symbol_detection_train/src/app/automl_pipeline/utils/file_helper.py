@@ -1,5 +1,6 @@
 import os
 import json
+import shutil
 
 
 class FileHelper:
@@ -41,6 +42,18 @@ class FileHelper:
         if not os.path.exists(directory):
             os.makedirs(directory)
 
+    @staticmethod
+    def move_tree(source_dir: str, destination_dir: str):
+        """
+        Moving all files of a directory tree into the destination directory. Files are renamed when both
+        directories are on the same file system, so no data is duplicated on disk
+        """
+        for root, _, files in os.walk(source_dir):
+            destination_root = os.path.join(destination_dir, os.path.relpath(root, source_dir))
+            FileHelper.ensure_folder_exists(destination_root)
+            for name in files:
+                shutil.move(os.path.join(root, name), os.path.join(destination_root, name))
+
     @staticmethod
     def delete(file_path: str):
         """
@@ -0,0 +1,101 @@
+import struct
+from typing import BinaryIO, Optional, Tuple
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# start of frame markers carrying the image dimensions; DHT (C4), JPG (C8)
+# and DAC (CC) share the range but are not frames
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# markers without a length field
+JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8}
+JPEG_APP1_MARKER = 0xE1
+EXIF_ORIENTATION_TAG = 0x0112
+
+
+class ImageHelper:
+    """
+    This class reads image metadata without decoding the pixels
+    """
+
+    @staticmethod
+    def get_image_size(image_path: str) -> Optional[Tuple[int, int]]:
+        """
+        Read the (width, height) of a JPEG or PNG image from its header, as
+        cv2.imread would report them after applying the EXIF orientation.
+        Returns None when the format is not supported or the header is invalid.
+        """
+        with open(image_path, 'rb') as f:
+            signature = f.read(8)
+            if signature == PNG_SIGNATURE:
+                return ImageHelper._get_png_size(f)
+            if signature[:2] == b'\xff\xd8':
+                f.seek(2)
+                return ImageHelper._get_jpeg_size(f)
+        return None
+
+    @staticmethod
+    def _get_png_size(f: BinaryIO) -> Optional[Tuple[int, int]]:
+        chunk = f.read(16)
+        if len(chunk) != 16 or chunk[4:8] != b'IHDR':
+            return None
+        width, height = struct.unpack('>II', chunk[8:16])
+        return width, height
+
+    @staticmethod
+    def _get_jpeg_size(f: BinaryIO) -> Optional[Tuple[int, int]]:
+        orientation = 1
+        while True:
+            byte = f.read(1)
+            if not byte:
+                return None
+            if byte != b'\xff':
+                continue
+            # markers can be preceded by any number of fill bytes
+            marker = f.read(1)
+            while marker == b'\xff':
+                marker = f.read(1)
+            if not marker:
+                return None
+            marker = marker[0]
+            if marker in JPEG_STANDALONE_MARKERS or marker == 0x00:
+                continue
+            if marker == 0xD9 or marker == 0xDA:
+                # end of image or start of scan before any frame header
+                return None
+
+            length_bytes = f.read(2)
+            if len(length_bytes) != 2:
+                return None
+            length = struct.unpack('>H', length_bytes)[0]
+            segment = f.read(length - 2)
+            if len(segment) != length - 2:
+                return None
+
+            if marker == JPEG_APP1_MARKER and segment[:6] == b'Exif\x00\x00':
+                orientation = ImageHelper._get_exif_orientation(segment[6:]) or orientation
+            elif marker in JPEG_SOF_MARKERS:
+                height, width = struct.unpack('>HH', segment[1:5])
+                # orientations 5 to 8 rotate the image by 90 degrees
+                if orientation in (5, 6, 7, 8):
+                    return height, width
+                return width, height
+
+    @staticmethod
+    def _get_exif_orientation(tiff: bytes) -> Optional[int]:
+        if tiff[:2] == b'II':
+            endian = '<'
+        elif tiff[:2] == b'MM':
+            endian = '>'
+        else:
+            return None
+        try:
+            ifd_offset = struct.unpack(endian + 'I', tiff[4:8])[0]
+            entries = struct.unpack(endian + 'H', tiff[ifd_offset:ifd_offset + 2])[0]
+            for entry in range(entries):
+                entry_offset = ifd_offset + 2 + entry * 12
+                tag, _, _, value = struct.unpack(endian + 'HHIH', tiff[entry_offset:entry_offset + 10])
+                if tag == EXIF_ORIENTATION_TAG:
+                    return value
+        except struct.error:
+            return None
+        return None
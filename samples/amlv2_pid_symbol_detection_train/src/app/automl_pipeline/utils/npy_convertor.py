@@ -1,4 +1,11 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
 import cv2
+import numpy as np
+
+from automl_pipeline.utils.image_helper import ImageHelper
 
 
 class NpyConvertor:
@@ -42,3 +49,99 @@ class NpyConvertor:
         }
 
         return json_line
+
+    @staticmethod
+    def to_jsonl_fast(npy_array, image_path, image_name, label_map: dict):
+        """
+        This method convert an Npy array to a jsonl format, producing the same json line
+        as to_jsonl. The image dimensions are read from the JPEG/PNG header instead of
+        decoding the image, and all bounding boxes are normalized in one NumPy operation.
+        """
+
+        image_size = NpyConvertor.get_image_size(image_path)
+
+        return NpyConvertor.to_jsonl_with_size(npy_array, image_size, image_name, label_map)
+
+    @staticmethod
+    def get_image_size(image_path) -> Optional[Tuple[int, int]]:
+        """
+        This method reads the (width, height) of an image from its JPEG/PNG header, and
+        decodes the image only for other formats. Returns None if the file is not an image
+        """
+
+        image_size = ImageHelper.get_image_size(image_path)
+        if image_size is None:
+            image = cv2.imread(image_path)
+            if image is None:
+                return None
+            image_height, image_width, _ = image.shape
+            image_size = (image_width, image_height)
+
+        return image_size
+
+    @staticmethod
+    def to_jsonl_with_size(npy_array, image_size: Tuple[int, int], image_name, label_map: dict):
+        """This method convert an Npy array to a jsonl format given the (width, height) of the image"""
+
+        image_width, image_height = image_size
+
+        # normalize the labels
+        bounding_boxes = np.array([label[1] for label in npy_array], dtype=np.float64).reshape(-1, 4)
+        normalized_boxes = (bounding_boxes / np.array([image_width, image_height, image_width, image_height])).tolist()
+        normalized_labels = [
+            {
+                'label': label_map[str(label[2])],
+                'topX': box[0],
+                'topY': box[1],
+                'bottomX': box[2],
+                'bottomY': box[3]
+            }
+            for label, box in zip(npy_array, normalized_boxes)
+        ]
+
+        # create the json line
+        json_line = {
+            'image_url': image_name,
+            'image_details': {
+                'format': 'jpg',
+                'width': image_width,
+                'height': image_height
+            },
+            'label': normalized_labels
+        }
+
+        return json_line
+
+    @staticmethod
+    def convert_npy_file(npy_file: str, images_dir: str, label_map: dict, image_size: Optional[Tuple[int, int]] = None):
+        """
+        This method convert a <image name>_symbols.npy file to a jsonl format. The image is only
+        read when its (width, height) is not given
+        """
+
+        npy_array = np.load(npy_file, allow_pickle=True)
+        image_name = os.path.basename(npy_file).replace('_symbols.npy', '.jpg')
+        if image_size is not None:
+            return NpyConvertor.to_jsonl_with_size(npy_array, image_size, image_name, label_map)
+
+        image_path = os.path.join(images_dir, image_name)
+        return NpyConvertor.to_jsonl_fast(npy_array, image_path, image_name, label_map)
+
+    @staticmethod
+    def convert_npy_files(npy_files: List[str], images_dir: str, label_map: dict, num_workers: int = None,
+                          chunksize: int = 64, image_sizes: Optional[Dict[str, Tuple[int, int]]] = None):
+        """
+        This method convert <image name>_symbols.npy files to the jsonl format with a process pool.
+        image_sizes optionally maps image names to their already known (width, height).
+        The json lines are returned in the order of npy_files.
+        """
+
+        image_sizes = image_sizes or {}
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            return list(executor.map(NpyConvertor.convert_npy_file,
+                                     npy_files,
+                                     [images_dir] * len(npy_files),
+                                     [label_map] * len(npy_files),
+                                     [image_sizes.get(os.path.basename(npy_file).replace('_symbols.npy', '.jpg'))
+                                      for npy_file in npy_files],
+                                     chunksize=chunksize))
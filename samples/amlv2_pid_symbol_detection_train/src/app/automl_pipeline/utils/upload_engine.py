@@ -0,0 +1,207 @@
+import os
+import json
+import math
+import time
+import base64
+import hashlib
+import threading
+import concurrent.futures
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from azure.storage.blob import BlobBlock, ContentSettings
+from automl_pipeline.utils.file_helper import FileHelper
+
+MB = 1024 * 1024
+
+
+@dataclass
+class UploadMetrics:
+    '''
+    Throughput metrics of an upload run
+    '''
+
+    files: int = 0
+    skipped: int = 0
+    failed: int = 0
+    bytes: int = 0
+    elapsed_seconds: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    concurrency_history: List[int] = field(default_factory=list)
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.bytes / MB / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def p95_latency_seconds(self) -> float:
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        return latencies[math.ceil(0.95 * len(latencies)) - 1]
+
+    def __str__(self):
+        return (f'{self.files} files uploaded ({self.skipped} skipped, {self.failed} failed) in {self.elapsed_seconds:.1f}s: '
+                f'{self.files_per_second:.1f} files/s, {self.mb_per_second:.1f} MB/s, '
+                f'p95 latency {self.p95_latency_seconds * 1000:.0f} ms')
+
+
+class UploadCheckpoint:
+    '''
+    Append-only manifest of the blobs already uploaded, so an interrupted upload can be resumed
+    '''
+
+    def __init__(self, checkpoint_path: Optional[str]):
+        self.checkpoint_path = checkpoint_path
+        self.entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # the last line can be truncated if the previous run was killed while writing it
+                        continue
+                    self.entries[entry['blob']] = entry
+
+    def is_uploaded(self, file_path: str, blob_name: str) -> bool:
+        '''
+        Check whether the file was uploaded to the blob with the same size and MD5
+        '''
+
+        entry = self.entries.get(blob_name)
+        if entry is None or entry['size'] != os.path.getsize(file_path):
+            return False
+        return entry['md5'] == file_md5(file_path).hex()
+
+    def record(self, blob_name: str, size: int, md5: bytes):
+        if not self.checkpoint_path:
+            return
+        line = json.dumps({'blob': blob_name, 'size': size, 'md5': md5.hex()})
+        with self._lock:
+            with open(self.checkpoint_path, 'a') as f:
+                f.write(line + '\n')
+
+
+def file_md5(file_path: str) -> bytes:
+    md5 = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(MB), b''):
+            md5.update(chunk)
+    return md5.digest()
+
+
+class UploadEngine:
+    '''
+    Upload files to a blob container with a configurable or auto-tuned concurrency level, block uploads
+    for large files, a checkpoint manifest to resume interrupted uploads and throughput metrics
+    '''
+
+    def __init__(self, container_client, concurrency: Optional[int] = 10, min_concurrency: int = 2,
+                 max_concurrency: int = 64, block_size: int = 8 * MB, checkpoint_path: Optional[str] = None,
+                 delete_after_upload: bool = False, tune_window: int = 16):
+        '''
+        concurrency is the number of files uploaded in parallel; when None it is tuned between
+        min_concurrency and max_concurrency by hill climbing on the throughput measured every
+        tune_window completed files. Files larger than block_size are uploaded in blocks of block_size.
+        '''
+
+        self.container_client = container_client
+        self.auto_tune = concurrency is None
+        self.concurrency = min_concurrency if self.auto_tune else concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max(max_concurrency, self.concurrency)
+        self.block_size = block_size
+        self.checkpoint = UploadCheckpoint(checkpoint_path)
+        self.delete_after_upload = delete_after_upload
+        self.tune_window = tune_window
+
+    def upload_files(self, files: List[Tuple[str, str]]) -> UploadMetrics:
+        '''
+        Upload (file path, blob name) pairs, skipping the blobs recorded in the checkpoint
+        '''
+
+        metrics = UploadMetrics()
+        start = time.perf_counter()
+        pending = []
+        for file_path, blob_name in files:
+            if self.checkpoint.is_uploaded(file_path, blob_name):
+                metrics.skipped += 1
+                if self.delete_after_upload:
+                    FileHelper.delete(file_path)
+            else:
+                pending.append((file_path, blob_name))
+        pending.reverse()
+
+        target = self.concurrency
+        metrics.concurrency_history.append(target)
+        window_start, window_bytes, window_files = time.perf_counter(), 0, 0
+        last_throughput, direction = 0.0, 1
+        first_error = None
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            in_flight = set()
+            while pending or in_flight:
+                while pending and len(in_flight) < target:
+                    in_flight.add(executor.submit(self._upload_file, *pending.pop()))
+
+                done, in_flight = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        size, latency = future.result()
+                    except Exception as exc:
+                        metrics.failed += 1
+                        first_error = first_error or exc
+                        continue
+                    metrics.files += 1
+                    metrics.bytes += size
+                    metrics.latencies.append(latency)
+                    window_bytes += size
+                    window_files += 1
+
+                if self.auto_tune and window_files >= max(self.tune_window, target):
+                    throughput = window_bytes / (time.perf_counter() - window_start)
+                    # keep moving in the same direction while the throughput improves, reverse otherwise
+                    if throughput < last_throughput * 1.05:
+                        direction = -direction
+                    step = max(1, target // 4)
+                    target = min(self.max_concurrency, max(self.min_concurrency, target + direction * step))
+                    metrics.concurrency_history.append(target)
+                    last_throughput = throughput
+                    window_start, window_bytes, window_files = time.perf_counter(), 0, 0
+
+        metrics.elapsed_seconds = time.perf_counter() - start
+        if first_error is not None:
+            raise RuntimeError(f'{metrics.failed} files failed to upload: {metrics}') from first_error
+        return metrics
+
+    def _upload_file(self, file_path: str, blob_name: str) -> Tuple[int, float]:
+        start = time.perf_counter()
+        size = os.path.getsize(file_path)
+        blob_client = self.container_client.get_blob_client(blob_name)
+
+        md5 = hashlib.md5()
+        with open(file_path, 'rb') as data:
+            if size <= self.block_size:
+                content = data.read()
+                md5.update(content)
+                blob_client.upload_blob(content, overwrite=True,
+                                        content_settings=ContentSettings(content_md5=bytearray(md5.digest())))
+            else:
+                block_list = []
+                for index, chunk in enumerate(iter(lambda: data.read(self.block_size), b'')):
+                    md5.update(chunk)
+                    block_id = base64.b64encode(f'{index:08d}'.encode()).decode()
+                    blob_client.stage_block(block_id=block_id, data=chunk)
+                    block_list.append(BlobBlock(block_id=block_id))
+                blob_client.commit_block_list(block_list,
+                                              content_settings=ContentSettings(content_md5=bytearray(md5.digest())))
+
+        self.checkpoint.record(blob_name, size, md5.digest())
+        if self.delete_after_upload:
+            FileHelper.delete(file_path)
+        return size, time.perf_counter() - start
@@ -1,8 +1,9 @@
 import os
-import concurrent.futures
-from tqdm import tqdm
+import queue
+from typing import Optional
 from azure.storage.blob import BlobServiceClient
 from automl_pipeline.utils.file_helper import FileHelper
+from automl_pipeline.utils.upload_engine import UploadEngine
 
 
 class UploaderClient:
@@ -10,11 +11,22 @@ class UploaderClient:
     A class to upload files from local machine to a blob storage
     '''
 
-    def __init__(self, connection_string, container_name):
-        service_client = BlobServiceClient.from_connection_string(connection_string, connection_pool_maxsize=10)
+    def __init__(self, connection_string, container_name, concurrency: Optional[int] = 10,
+                 checkpoint_path: Optional[str] = None, max_concurrency: int = 64):
+        '''
+        concurrency is the number of files uploaded in parallel by upload, None to auto-tune it up
+        to max_concurrency. Uploaded blobs are recorded in checkpoint_path, if set, so a restarted
+        upload skips them
+        '''
+        pool_size = max(concurrency or max_concurrency, 10)
+        service_client = BlobServiceClient.from_connection_string(connection_string, connection_pool_maxsize=pool_size)
         self.client = service_client.get_container_client(container_name)
         self.source = ''
         self.prefix = ''
+        self.concurrency = concurrency
+        self.checkpoint_path = checkpoint_path
+        self.max_concurrency = max_concurrency
+        self.last_metrics = None
 
     def upload(self, source, dest):
         '''
@@ -41,6 +53,23 @@ class UploaderClient:
         self._upload_file(file_path, blob_path)
         return file_path
 
+    def upload_from_queue(self, file_queue: queue.Queue) -> int:
+        '''
+        Upload the files put in the queue until a None sentinel is received. Several workers can drain
+        the same queue concurrently, each one consuming a single sentinel
+        '''
+
+        uploaded = 0
+        while True:
+            file_path = file_queue.get()
+            try:
+                if file_path is None:
+                    return uploaded
+                self._upload_file_concurrent(file_path)
+                uploaded += 1
+            finally:
+                file_queue.task_done()
+
     def _upload_dir(self, source, dest):
         '''
         Upload a directory to a path inside the container
@@ -50,21 +79,21 @@ class UploaderClient:
         self.prefix += os.path.basename(source) + '/'
         files = FileHelper.list_files_endwith(source, '')
         self.source = source
-        executor = concurrent.futures.ThreadPoolExecutor(max_workers=10)
-        with executor:
-            progress_bar = tqdm(total=len(files), desc="Uploading files")
-            # Submit the tasks and update the progress bar when each task completes
-            futures = [executor.submit(self._upload_file_concurrent, file_path) for file_path in files]
-            for future in concurrent.futures.as_completed(futures):
-                progress_bar.update(1)
 
-        executor.shutdown(wait=True)
+        engine = UploadEngine(self.client, concurrency=self.concurrency, max_concurrency=self.max_concurrency,
+                              checkpoint_path=self.checkpoint_path, delete_after_upload=True)
+        self.last_metrics = engine.upload_files([(file_path, file_path) for file_path in files])
+        print(f'Uploaded {source}: {self.last_metrics}')
 
 
 def get_args():
     parser = argparse.ArgumentParser()
     parser.add_argument('--image-output-path', dest='image_output_path', type=str, required=True)
     parser.add_argument('--label-output-path', dest='label_output_path', type=str, required=True)
+    parser.add_argument('--concurrency', dest='concurrency', type=int, default=10,
+                        help='Number of files uploaded in parallel, 0 to auto-tune it.')
+    parser.add_argument('--checkpoint-path', dest='checkpoint_path', type=str, default=None,
+                        help='Manifest of the uploaded blobs used to resume an interrupted upload.')
 
     args = parser.parse_args()
     return args
@@ -78,7 +107,8 @@ if __name__ == '__main__':
     label_output_path = args.label_output_path
 
     # upload files located in the image output path to Azure Blob Storage
-    uploader_client = UploaderClient(config.storage_account_connection_string, config.storage_account_container_name)
+    uploader_client = UploaderClient(config.storage_account_connection_string, config.storage_account_container_name,
+                                     concurrency=args.concurrency or None, checkpoint_path=args.checkpoint_path)
     uploader_client.upload(image_output_path, "")
 
     # upload files located in the label output path to Azure Blob Storage
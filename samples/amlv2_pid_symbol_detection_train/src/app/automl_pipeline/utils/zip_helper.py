@@ -1,6 +1,9 @@
 import os
 import logging
 import subprocess
+import tarfile
+import zipfile
+from typing import BinaryIO, Iterator, Optional, Tuple
 
 
 class ZipHelper:
@@ -25,3 +28,26 @@ class ZipHelper:
             logging.error(f'Unsupported file type: {input_path}')
             return
         logging.info(f'Unziped {input_path} to {output_path}')
+
+    @staticmethod
+    def iter_members(input_path: str, fileobj: Optional[BinaryIO] = None) -> Iterator[Tuple[str, BinaryIO]]:
+        """
+        iterate the regular files of a zip/tar file as (member name, reader) pairs, as they are read
+        from the archive, without extracting the archive first. A .tar.gz file can be read from a
+        non-seekable fileobj, such as an HTTP response, while it is being downloaded.
+        """
+        if input_path.endswith('.zip'):
+            with zipfile.ZipFile(fileobj or input_path) as archive:
+                for info in archive.infolist():
+                    if info.is_dir():
+                        continue
+                    with archive.open(info) as reader:
+                        yield info.filename, reader
+        elif input_path.endswith('.tar.gz'):
+            with tarfile.open(name=None if fileobj else input_path, fileobj=fileobj, mode='r|gz') as archive:
+                for member in archive:
+                    if not member.isfile():
+                        continue
+                    yield member.name, archive.extractfile(member)
+        else:
+            logging.error(f'Unsupported file type: {input_path}')
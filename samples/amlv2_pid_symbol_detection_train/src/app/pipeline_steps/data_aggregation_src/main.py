@@ -64,6 +64,22 @@ def get_args():
         required=True,
         help="Fast training flag.",
     )
+    parser.add_argument(
+        "--num-workers",
+        dest="num_workers",
+        type=int,
+        default=1,
+        help="Number of worker processes aggregating the label files.",
+    )
+    parser.add_argument(
+        "--cache-path",
+        dest="cache_path",
+        type=str,
+        default=None,
+        help="Path to the folder keeping the aggregated label files and \
+            their manifest across runs; only changed label files are \
+            aggregated again.",
+    )
 
     args = parser.parse_args()
     return args
@@ -80,6 +96,8 @@ def main():
     input_images_string_absolute_path = args.input_images_string_absolute_path
     output_path = args.output_path
     is_fast_training = args.is_fast_training
+    num_workers = args.num_workers
+    cache_path = args.cache_path
 
     # Create the annotations file
     print("Building annotations file...")
@@ -89,6 +107,8 @@ def main():
         input_images_string_absolute_path,
         output_path,
         is_fast_training,
+        num_workers,
+        cache_path,
     )
     mltable_aggregator.create_aggregated_mltable_file()
 
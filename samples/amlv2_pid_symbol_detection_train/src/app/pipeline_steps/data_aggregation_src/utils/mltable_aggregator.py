@@ -2,8 +2,97 @@
 MltableAggregator
 """
 import glob
+import hashlib
 import json
+import math
 import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+MANIFEST_FILE_NAME = "manifest.json"
+PARTS_DIR_NAME = "parts"
+
+_IMAGE_URL_PATTERN = re.compile(r'"image_url"\s*:\s*"((?:[^"\\]|\\.)*)"')
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def rewrite_image_url(line: str, input_images_string_absolute_path: str) -> str:
+    """
+    Set the absolute image path in a single label json line as "image_url"
+    without re-serializing the whole line.
+
+    The line is parsed first, so a malformed line raises like with a json
+    round trip. Falls back to a json round trip when the "image_url" key can
+    not be located unambiguously.
+    """
+    line = line.strip()
+    json_line = json.loads(line)
+    matches = list(_IMAGE_URL_PATTERN.finditer(line))
+    if len(matches) != 1 or \
+            json.loads(f'"{matches[0].group(1)}"') != json_line["image_url"]:
+        json_line["image_url"] = os.path.join(
+            input_images_string_absolute_path,
+            os.path.basename(json_line["image_url"]))
+        return json.dumps(json_line)
+
+    match = matches[0]
+    image_filename = os.path.basename(json_line["image_url"])
+    image_url_with_path = json.dumps(
+        os.path.join(input_images_string_absolute_path, image_filename))
+    return line[:match.start(1) - 1] + image_url_with_path + \
+        line[match.end(1) + 1:]
+
+
+def file_sha256(file_path: str) -> str:
+    """Hash the content of a file."""
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def aggregate_label_file(label_file: str,
+                         part_file: str,
+                         input_images_string_absolute_path: str) -> Dict:
+    """
+    Rewrite the image urls of a single jsonl label file into a part file.
+    Runs in a worker process of the parallel aggregation.
+
+    Returns:
+        Dict: the manifest entry of the label file
+    """
+    sha256 = hashlib.sha256()
+    lines = 0
+    errors = 0
+    tmp_part_file = part_file + ".tmp"
+    with open(label_file, "rb") as f_in, \
+            open(tmp_part_file, "w", encoding="utf-8") as f_out:
+        for raw_line in f_in:
+            sha256.update(raw_line)
+            line = raw_line.decode("utf-8")
+            if not line.strip():
+                continue
+            try:
+                f_out.write(rewrite_image_url(
+                    line, input_images_string_absolute_path) + "\n")
+                lines += 1
+            except Exception as exc:
+                errors += 1
+                print(f"Error parsing line {line}: {exc}")
+    os.replace(tmp_part_file, part_file)
+
+    stat = os.stat(label_file)
+    return {
+        "mtime": stat.st_mtime,
+        "size": stat.st_size,
+        "sha256": sha256.hexdigest(),
+        "lines": lines,
+        "errors": errors,
+    }
 
 
 class MltableAggregator:
@@ -14,7 +103,9 @@ class MltableAggregator:
                  input_label_data_path: str,
                  input_images_string_absolute_path: str,
                  output_path: str,
-                 is_fast_training: bool = False):
+                 is_fast_training: bool = False,
+                 num_workers: int = 1,
+                 cache_path: Optional[str] = None):
         self.input_image_data_path = input_image_data_path
         self.input_label_data_path = input_label_data_path
         self.input_images_string_absolute_path = \
@@ -23,6 +114,10 @@ class MltableAggregator:
         self.annotations_file_path = os.path.join(output_path,
                                                   "annotations.jsonl")
         self.is_fast_training = is_fast_training
+        # process-pool and incremental aggregation, see
+        # aggregate_label_mltables_parallel
+        self.num_workers = num_workers
+        self.cache_path = cache_path
 
     def create_aggregated_mltable_file(self):
         """
@@ -36,11 +131,18 @@ class MltableAggregator:
         # Aggregate the data from all .jsonl files in the input path
         # into a single jsonl file, making sure that absolute
         # image path is set as "image_url"
-        json_lines = self.aggregate_label_mltables()
+        if self.is_fast_training or \
+                (self.num_workers <= 1 and self.cache_path is None):
+            json_lines = self.aggregate_label_mltables()
 
-        # Write the aggregated jsonl file
-        with open(self.annotations_file_path, "w") as f:
-            f.write("\n".join(json_lines))
+            # Write the aggregated jsonl file
+            with open(self.annotations_file_path, "w") as f:
+                f.write("\n".join(json_lines))
+        elif self.cache_path is None:
+            with tempfile.TemporaryDirectory() as cache_path:
+                self.aggregate_label_mltables_parallel(cache_path)
+        else:
+            self.aggregate_label_mltables_parallel(self.cache_path)
 
         # Create and save mltable
         mltable_file_contents = self.create_ml_table_file(
@@ -69,6 +171,124 @@ class MltableAggregator:
 
         return json_lines
 
+    def aggregate_label_mltables_parallel(self, cache_path: str) -> Dict:
+        """
+        Aggregates data from all jsonl files in input label data path with a
+        process pool, streaming the result into the annotations file.
+
+        Every label file is rewritten into its own part file under
+        `cache_path`, and a manifest of (file, mtime, size, sha256) is kept
+        next to the parts. Label files which are unchanged since the manifest
+        was written are not processed again, so with a persistent
+        `cache_path` a run only processes the label files added or modified
+        since the previous run.
+
+        Returns:
+            Dict: number of label files processed, reused and removed
+        """
+        label_files = sorted(glob.glob(os.path.join(self.input_label_data_path,
+                                                    "*.jsonl")))
+        parts_path = os.path.join(cache_path, PARTS_DIR_NAME)
+        os.makedirs(parts_path, exist_ok=True)
+
+        manifest = self.load_manifest(cache_path)
+        cached_files = manifest["files"]
+        label_file_names = {os.path.basename(file) for file in label_files}
+        removed_files = [name for name in cached_files
+                         if name not in label_file_names]
+        for name in removed_files:
+            del cached_files[name]
+            part_file = os.path.join(parts_path, name)
+            if os.path.exists(part_file):
+                os.remove(part_file)
+
+        changed_files = [
+            file for file in label_files
+            if not self.is_label_file_cached(
+                file, cached_files.get(os.path.basename(file)), parts_path)
+        ]
+        print(f"Aggregating {len(changed_files)} changed label files, "
+              f"reusing {len(label_files) - len(changed_files)}")
+
+        if changed_files:
+            part_files = [os.path.join(parts_path, os.path.basename(file))
+                          for file in changed_files]
+            num_workers = max(1, min(self.num_workers, len(changed_files)))
+            chunksize = max(1, math.ceil(len(changed_files) / (num_workers * 4)))
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                entries = executor.map(
+                    aggregate_label_file,
+                    changed_files,
+                    part_files,
+                    [self.input_images_string_absolute_path] * len(changed_files),
+                    chunksize=chunksize)
+                for file, entry in zip(changed_files, entries):
+                    cached_files[os.path.basename(file)] = entry
+
+        self.save_manifest(cache_path, manifest)
+
+        # Stream the parts into the aggregated jsonl file
+        with open(self.annotations_file_path, "w", encoding="utf-8") as f_out:
+            for file in label_files:
+                part_file = os.path.join(parts_path, os.path.basename(file))
+                with open(part_file, encoding="utf-8") as f_in:
+                    shutil.copyfileobj(f_in, f_out)
+
+        return {
+            "processed": len(changed_files),
+            "reused": len(label_files) - len(changed_files),
+            "removed": len(removed_files),
+        }
+
+    def load_manifest(self, cache_path: str) -> Dict:
+        """
+        Load the manifest of the aggregated label files. The manifest is
+        discarded when it was built for another absolute image path.
+        """
+        manifest_path = os.path.join(cache_path, MANIFEST_FILE_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("input_images_string_absolute_path") == \
+                    self.input_images_string_absolute_path:
+                return manifest
+        return {
+            "input_images_string_absolute_path":
+                self.input_images_string_absolute_path,
+            "files": {},
+        }
+
+    def save_manifest(self, cache_path: str, manifest: Dict):
+        """
+        Save the manifest of the aggregated label files.
+        """
+        manifest_path = os.path.join(cache_path, MANIFEST_FILE_NAME)
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    def is_label_file_cached(self,
+                             label_file: str,
+                             entry: Optional[Dict],
+                             parts_path: str) -> bool:
+        """
+        Check whether the part file of a label file is up to date. The
+        content hash is only computed when the mtime has changed but the
+        size has not, e.g. when the labels are copied to a new location.
+        """
+        if entry is None or not os.path.exists(
+                os.path.join(parts_path, os.path.basename(label_file))):
+            return False
+        stat = os.stat(label_file)
+        if stat.st_size != entry["size"]:
+            return False
+        if stat.st_mtime == entry["mtime"]:
+            return True
+        if file_sha256(label_file) != entry["sha256"]:
+            return False
+        entry["mtime"] = stat.st_mtime
+        return True
+
     def set_absolute_image_path_in_label(self, line):
         """
         Set the absolute image path in a single label
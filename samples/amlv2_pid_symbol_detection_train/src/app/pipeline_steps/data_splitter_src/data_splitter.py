@@ -1,7 +1,7 @@
 """
 data splitter
 """
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 import warnings
 from pathlib import Path
 
@@ -206,3 +206,321 @@ def stratified_group_data_splitter(
     val_files = np.unique(file_name_array[val_idxs]).tolist()
 
     return train_files, val_files, rare_classes
+
+
+class FileNameIndex:
+    """Hash index over a list of file paths for basename and upsample lookups.
+
+    `get_file_paths` compares every search filename against every file path,
+    which is quadratic in the dataset size. This index is built once in
+    O(len(all_filepaths)) and answers the same queries with dict lookups.
+    """
+
+    def __init__(
+        self,
+        all_filepaths: List[str],
+        upsample_prefix: str = "_upsampled_",
+        upsample_ext: str = ".upsampled",
+    ):
+        """build the basename and upsample-stem lookup dicts
+
+        Args:
+            all_filepaths (List[str]): list of full path for all available files
+            upsample_prefix (str, optional): part of file name to indicate a file is
+             upsampeld from other files. Defaults to "_upsampled_".
+            upsample_ext (str, optional): part of of file extension to indicate a file
+             is upsampeld from other files. Defaults to ".upsampled".
+        """
+        self._upsample_prefix = upsample_prefix
+        self._basename_lookup: Dict[str, List[int]] = {}
+        self._upsample_lookup: Dict[Tuple[str, str], List[int]] = {}
+
+        for idx, filepath in enumerate(all_filepaths):
+            name = Path(filepath).name
+            self._basename_lookup.setdefault(name, []).append(idx)
+            for key in self._upsample_keys(name, upsample_prefix, upsample_ext):
+                self._upsample_lookup.setdefault(key, []).append(idx)
+
+    @staticmethod
+    def _upsample_keys(
+        name: str, upsample_prefix: str, upsample_ext: str
+    ) -> List[Tuple[str, str]]:
+        """get every (stem, suffix) of a search filename that `name` is upsampled from
+
+        `name` matches a search filename when it starts with
+        `stem + upsample_prefix` and ends with `upsample_ext + suffix`. A file
+        suffix is either empty or the part of `name` from its last dot.
+        """
+        suffixes = [""]
+        dot_idx = name.rfind(".")
+        if dot_idx > 0:
+            suffixes.append(name[dot_idx:])
+        suffixes = [
+            suffix for suffix in suffixes if name.endswith(upsample_ext + suffix)
+        ]
+        if not suffixes:
+            return []
+
+        keys = []
+        prefix_idx = name.find(upsample_prefix)
+        while prefix_idx != -1:
+            keys.extend((name[:prefix_idx], suffix) for suffix in suffixes)
+            prefix_idx = name.find(upsample_prefix, prefix_idx + 1)
+        return keys
+
+    def lookup(
+        self, search_filenames: List[str], include_upsample_files: bool = True
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """get the positions of the file paths matching the search filenames
+
+        Args:
+            search_filenames (List[str]): list of filenames to be searched
+            include_upsample_files (bool, optional): whether return the positions of
+             files which upsampled from one of the search filename. Defaults to True.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: sorted unique positions of the file paths
+             matching by basename, and of the upsampled file paths
+        """
+        basename_idxs = set()
+        upsample_idxs = set()
+        for search_filename in search_filenames:
+            search_path = Path(search_filename)
+            basename_idxs.update(self._basename_lookup.get(search_path.name, []))
+            if include_upsample_files:
+                upsample_idxs.update(
+                    self._upsample_lookup.get((search_path.stem, search_path.suffix), [])
+                )
+        return (
+            np.array(sorted(basename_idxs), dtype=np.int64),
+            np.array(sorted(upsample_idxs), dtype=np.int64),
+        )
+
+
+def get_file_paths_indexed(
+    search_filenames: List[str],
+    all_filepaths: List[str],
+    include_upsample_files: bool = True,
+    upsample_prefix="_upsampled_",
+    upsample_ext=".upsampled",
+) -> List[str]:
+    """get the file paths containing in file names specified using a `FileNameIndex`
+
+    Returns the same list, in the same order, as `get_file_paths` in time linear
+    in `len(search_filenames) + len(all_filepaths)`.
+
+    Args:
+        search_filenames (List[str]): list of filenames to be searched. An example
+         can be ["0.png", "1.png"]
+        all_filepaths (List[str]): list of full path for all available files.
+        include_upsample_files (bool, optional): whether return the paths of files which
+         upsampled from one of the search filename. Defaults to True.
+        upsample_prefix (str, optional): part of file name to indicate a file is
+         upsampeld from other files. Defaults to "_upsampled_".
+        upsample_ext (str, optional): part of of file extension to indicate a file is
+         upsampeld from other files. Defaults to ".upsampled".
+
+    Returns:
+        List[str]: the list of file paths containing in file names specified.
+    """
+    index = FileNameIndex(
+        all_filepaths, upsample_prefix=upsample_prefix, upsample_ext=upsample_ext
+    )
+    basename_idxs, upsample_idxs = index.lookup(
+        search_filenames, include_upsample_files=include_upsample_files
+    )
+    return [all_filepaths[idx] for idx in basename_idxs] + [
+        all_filepaths[idx] for idx in upsample_idxs
+    ]
+
+
+def _files_with_classes(
+    n_files: int,
+    file_codes: np.ndarray,
+    label_codes: np.ndarray,
+    class_mask: np.ndarray,
+) -> np.ndarray:
+    """get a per-file mask of the files containing any class in `class_mask`"""
+    file_mask = np.zeros(n_files, dtype=bool)
+    file_mask[file_codes[class_mask[label_codes]]] = True
+    return file_mask
+
+
+def stratified_group_data_splitter_indexed(
+    file_names: List[str],
+    labels: List[str],
+    n_splits: int = 5,
+    add_rare_to_val: bool = True,
+    mandatory_train_filenames: Optional[List[str]] = None,
+    mandatory_val_filenames: Optional[List[str]] = None,
+) -> Tuple[List[str], List[str]]:
+    """Split the dataset into the trainning set and validation set,
+     considering the balance of the datasets.
+
+    Produces exactly the same split as `stratified_group_data_splitter`, but
+    factorizes file names and labels to integer codes once and does every
+    mandatory and rare-class step on per-file boolean masks, so the cost is
+    linear in the number of bounding box annotations instead of quadratic.
+
+    Args:
+        file_names (List[str]): file names for each bounding box annotation.
+        y (List[str]): class labels for each bounding box. The order needs
+         to align with `file_names`
+        n_splits (int): number of splits applied wherein the first split will
+         be used for validation set and the rest will go to training.
+        add_rare_to_val (bool): whether add rare class data to validation set.
+         Defaults to True
+        mandatory_train_filenames (Optional[List[str]], optional): the files which
+         must be included in train set, not in val set. Defaults to None.
+        mandatory_val_filenames (Optional[List[str]], optional): the files which
+         must be included in val set, not in train set. Defaults to None.
+
+    Raises:
+        ValueError: Raised when `file_names` length and `y` length don't match
+
+    Returns:
+        List[List[str], List[str]]: file names split into train,
+        and validation sets.
+    """
+
+    if len(file_names) != len(labels):
+        raise ValueError(
+            (
+                "The length of `file_names` and `y` don't match."
+                f"`file_names` got {len(file_names)} elements and `y` got {len(labels)}"
+            )
+        )
+
+    # unique values are sorted, so the codes keep the ordering StratifiedGroupKFold
+    # sees on the raw strings and the folds are identical
+    unique_files, file_codes = np.unique(np.array(file_names), return_inverse=True)
+    unique_labels, label_codes = np.unique(np.array(labels), return_inverse=True)
+
+    return stratified_group_code_splitter(
+        unique_files=unique_files,
+        file_codes=file_codes,
+        unique_labels=unique_labels,
+        label_codes=label_codes,
+        n_splits=n_splits,
+        add_rare_to_val=add_rare_to_val,
+        mandatory_train_filenames=mandatory_train_filenames,
+        mandatory_val_filenames=mandatory_val_filenames,
+    )
+
+
+def stratified_group_code_splitter(
+    unique_files: np.ndarray,
+    file_codes: np.ndarray,
+    unique_labels: np.ndarray,
+    label_codes: np.ndarray,
+    n_splits: int = 5,
+    add_rare_to_val: bool = True,
+    mandatory_train_filenames: Optional[List[str]] = None,
+    mandatory_val_filenames: Optional[List[str]] = None,
+) -> Tuple[List[str], List[str]]:
+    """Split factorized bounding box annotations into the trainning set and
+     validation set. This is the core of `stratified_group_data_splitter_indexed`
+     for callers which already hold the annotations as integer codes.
+
+    Args:
+        unique_files (np.ndarray): sorted unique file names
+        file_codes (np.ndarray): position in `unique_files` of the file of each
+         bounding box annotation
+        unique_labels (np.ndarray): sorted unique class labels
+        label_codes (np.ndarray): position in `unique_labels` of the class label of
+         each bounding box annotation. The order needs to align with `file_codes`
+        n_splits (int): number of splits applied wherein the first split will
+         be used for validation set and the rest will go to training.
+        add_rare_to_val (bool): whether add rare class data to validation set.
+         Defaults to True
+        mandatory_train_filenames (Optional[List[str]], optional): the files which
+         must be included in train set, not in val set. Defaults to None.
+        mandatory_val_filenames (Optional[List[str]], optional): the files which
+         must be included in val set, not in train set. Defaults to None.
+
+    Returns:
+        List[List[str], List[str]]: file names split into train,
+        and validation sets.
+    """
+    if mandatory_train_filenames and mandatory_val_filenames:
+        mandatory_overlapped = set(mandatory_train_filenames).intersection(
+            set(mandatory_val_filenames)
+        )
+        if len(mandatory_overlapped) != 0:
+            raise ValueError(f"overlapped mandatory file set at {mandatory_overlapped}")
+
+    n_files = unique_files.shape[0]
+    n_labels = unique_labels.shape[0]
+
+    cv = StratifiedGroupKFold(n_splits=n_splits, shuffle=True, random_state=33)
+    # the first for val (1/n-split) and the rest for train
+    splitter = iter(cv.split(file_codes, y=label_codes, groups=file_codes))
+    _, val_idxs = next(splitter)
+    # the split is grouped by file, so train and val can be tracked per file
+    val_file_mask = np.zeros(n_files, dtype=bool)
+    val_file_mask[file_codes[val_idxs]] = True
+    train_file_mask = ~val_file_mask
+
+    file_index = None
+    if mandatory_train_filenames or mandatory_val_filenames:
+        file_index = FileNameIndex(unique_files.tolist())
+
+    # set the splitting based on mandatory_{train|val}_filenames
+    if mandatory_train_filenames:
+        mandatory_train_codes = np.concatenate(
+            file_index.lookup(mandatory_train_filenames)
+        )
+        print(f"mandatory_train_filepaths={unique_files[mandatory_train_codes].tolist()}")
+        train_file_mask[mandatory_train_codes] = True
+        val_file_mask[mandatory_train_codes] = False
+
+    if mandatory_val_filenames:
+        mandatory_val_codes = np.concatenate(file_index.lookup(mandatory_val_filenames))
+        print(f"mandatory_val_filepaths={unique_files[mandatory_val_codes].tolist()}")
+        val_file_mask[mandatory_val_codes] = True
+        train_file_mask[mandatory_val_codes] = False
+
+    train_class_mask = (
+        np.bincount(label_codes[train_file_mask[file_codes]], minlength=n_labels) > 0
+    )
+    val_class_mask = (
+        np.bincount(label_codes[val_file_mask[file_codes]], minlength=n_labels) > 0
+    )
+    rare_in_train_mask = train_class_mask & ~val_class_mask
+    rare_in_val_mask = val_class_mask & ~train_class_mask
+    rare_classes_in_train = set(unique_labels[rare_in_train_mask])
+    rare_classes_in_val = set(unique_labels[rare_in_val_mask])
+    rare_classes = (rare_classes_in_train).union(rare_classes_in_val)
+
+    if len(rare_classes_in_val) != 0:
+        warnings.warn(f"rare_classes_in_val = {rare_classes_in_val}")
+    if len(rare_classes_in_train) != 0:
+        warnings.warn(f"rare_classes_in_train = {rare_classes_in_train}")
+
+    # cover corner cases when StratifiedGroupKFold is split more classes for
+    # val compared to train. Rarely happens and need to correct if happened
+    if rare_classes_in_val:
+        warnings.warn(
+            (
+                "val has more classes then the training:"
+                f"{rare_classes_in_val}."
+                "shifting to training"
+            )
+        )
+        val_rare_class_file_mask = _files_with_classes(
+            n_files, file_codes, label_codes, rare_in_val_mask
+        )
+        val_file_mask[val_rare_class_file_mask] = False
+        train_file_mask[val_rare_class_file_mask] = True
+
+    if add_rare_to_val:
+        if rare_classes:
+            rare_class_file_mask = _files_with_classes(
+                n_files, file_codes, label_codes, rare_in_train_mask | rare_in_val_mask
+            )
+            val_file_mask[rare_class_file_mask] = True
+
+    train_files = unique_files[train_file_mask].tolist()
+    val_files = unique_files[val_file_mask].tolist()
+
+    return train_files, val_files, rare_classes
@@ -1,14 +1,40 @@
 import argparse
+from array import array
 from pathlib import Path
-from typing import List, Union, Optional, Any, Dict
+from typing import Iterator, List, NamedTuple, Union, Optional, Any, Dict, Tuple
 import os
 import json
 import shutil
 
 import jsonlines
+import numpy as np
 import pandas as pd
 
-from data_splitter import stratified_group_data_splitter
+from data_splitter import (
+    stratified_group_code_splitter,
+    stratified_group_data_splitter_indexed,
+)
+
+
+class JsonlColumns(NamedTuple):
+    """bounding box annotations of a jsonl dataset held as compact columnar arrays
+
+    `line_image_codes[i]` is the position in `image_urls` of the image of the
+    i-th non-empty json line; the class labels of its bounding boxes are
+    `box_label_codes[box_offsets[i]:box_offsets[i + 1]]`, positions in
+    `label_names`.
+    """
+
+    jsonl_files: List[Path]
+    image_urls: List[str]
+    label_names: List[str]
+    line_image_codes: np.ndarray
+    box_offsets: np.ndarray
+    box_label_codes: np.ndarray
+
+    @property
+    def box_image_codes(self) -> np.ndarray:
+        return np.repeat(self.line_image_codes, np.diff(self.box_offsets))
 
 
 def str2bool(v):
@@ -45,6 +71,26 @@ def _get_class_count(jsonl_list: List[Dict[str, Any]]) -> pd.DataFrame:
     return class_count
 
 
+def _get_class_count_from_codes(
+    label_names: List[str], box_label_codes: np.ndarray
+) -> pd.DataFrame:
+    """get class distribution from the class label codes of a dataset
+
+    Args:
+        label_names (List[str]): class label of each code
+        box_label_codes (np.ndarray): class label code of each bounding box
+
+    Returns:
+        pd.DataFrame: dataframe describing the class distribution
+    """
+    counts = np.bincount(box_label_codes, minlength=len(label_names))
+    class_count = pd.DataFrame({"class_type": label_names, "class_count": counts})
+    class_count = class_count[class_count["class_count"] > 0]
+    return class_count.sort_values("class_count", ascending=False).reset_index(
+        drop=True
+    )
+
+
 def _create_ml_table_file(filename: str) -> str:
     """Create ML Table definition
 
@@ -115,7 +161,7 @@ def split_jsonl(
     labels = df_ann["label"].values.tolist()
     filenames = df_ann["image_url"].values.tolist()
 
-    splitted_filenames = stratified_group_data_splitter(
+    splitted_filenames = stratified_group_data_splitter_indexed(
         labels=labels,
         file_names=filenames,
         n_splits=n_splits,
@@ -133,6 +179,152 @@ def split_jsonl(
     return train_jsonls, val_jsonls
 
 
+def _iter_json_lines(jsonl_files: List[Path]) -> Iterator[str]:
+    """iterate the non-empty lines of the jsonl files in order"""
+    for file in jsonl_files:
+        with open(file, encoding="utf8") as reader:
+            for line in reader:
+                line = line.strip()
+                if line:
+                    yield line
+
+
+def read_jsonl_columns(jsonl_dir: Path) -> JsonlColumns:
+    """read all the jsonls in a directory once into compact columnar arrays
+
+    Args:
+        jsonl_dir (Path): location of the jsonl directory
+
+    Returns:
+        JsonlColumns: image and class label codes of every bounding box
+    """
+    jsonl_files = sorted(jsonl_dir.glob("*.jsonl"))
+    image_codes: Dict[str, int] = {}
+    label_codes: Dict[str, int] = {}
+    line_image_codes = array("q")
+    box_offsets = array("q", [0])
+    box_label_codes = array("q")
+
+    for line in _iter_json_lines(jsonl_files):
+        json_line = json.loads(line)
+        line_image_codes.append(
+            image_codes.setdefault(json_line["image_url"], len(image_codes))
+        )
+        box_label_codes.extend(
+            label_codes.setdefault(item["label"], len(label_codes))
+            for item in json_line["label"]
+        )
+        box_offsets.append(len(box_label_codes))
+
+    return JsonlColumns(
+        jsonl_files=jsonl_files,
+        image_urls=list(image_codes),
+        label_names=list(label_codes),
+        line_image_codes=np.frombuffer(line_image_codes, dtype=np.int64),
+        box_offsets=np.frombuffer(box_offsets, dtype=np.int64),
+        box_label_codes=np.frombuffer(box_label_codes, dtype=np.int64),
+    )
+
+
+def _sorted_codes(values: List[str], codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """remap codes in order of appearance to positions in the sorted values"""
+    order = sorted(range(len(values)), key=values.__getitem__)
+    rank = np.empty(len(values), dtype=np.int64)
+    rank[order] = np.arange(len(values))
+    return np.array([values[idx] for idx in order]), rank[codes]
+
+
+def split_jsonl_streaming(
+    jsonl_dir: Path,
+    train_output_dir: Path,
+    val_output_dir: Path,
+    n_splits: int = 5,
+    add_rare_to_val: bool = True,
+    mandatory_train_filenames: Optional[List[str]] = None,
+    mandatory_val_filenames: Optional[List[str]] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    split all the annotations of the jsonls in a directory into two stratified
+    splits of train and val, and stream the splitted jsonlines into
+    `annotations.jsonl` of the output directories
+
+    Produces the same split as `split_jsonl` while keeping only the image and
+    class label codes of the annotations in memory, so peak memory stays
+    bounded by the number of bounding boxes rather than the size of the
+    jsonl files.
+
+    Args:
+        jsonl_dir (Path): location of the jsonl directory
+        train_output_dir (Path): directory to write the train annotations.jsonl
+        val_output_dir (Path): directory to write the val annotations.jsonl
+        n_splits (int): number of splits applied wherein the first split will
+         be used for validation set and the rest will go to training.
+        add_rare_to_val (bool, optional): whether add rare class data to
+         validation set. Defaults to True
+        mandatory_train_filenames (Optional[List[str]], optional): the files which
+         must be included in train set, not in val set. Defaults to None.
+        mandatory_val_filenames (Optional[List[str]], optional): the files which
+         must be included in val set, not in train set. Defaults to None.
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: class distribution of the train and
+         val datasets
+    """
+    columns = read_jsonl_columns(jsonl_dir)
+    box_image_codes = columns.box_image_codes
+
+    # only the images with bounding boxes are split, as in `split_jsonl`, the
+    # lines of the images without any are written to neither dataset
+    boxed_image_codes = np.unique(box_image_codes)
+    boxed_positions = np.empty(len(columns.image_urls), dtype=np.int64)
+    boxed_positions[boxed_image_codes] = np.arange(len(boxed_image_codes))
+    unique_files, file_codes = _sorted_codes(
+        [columns.image_urls[code] for code in boxed_image_codes],
+        boxed_positions[box_image_codes],
+    )
+    unique_labels, label_codes = _sorted_codes(
+        columns.label_names, columns.box_label_codes
+    )
+    train_files, val_files, _ = stratified_group_code_splitter(
+        unique_files=unique_files,
+        file_codes=file_codes,
+        unique_labels=unique_labels,
+        label_codes=label_codes,
+        n_splits=n_splits,
+        add_rare_to_val=add_rare_to_val,
+        mandatory_train_filenames=mandatory_train_filenames,
+        mandatory_val_filenames=mandatory_val_filenames,
+    )
+
+    train_files, val_files = set(train_files), set(val_files)
+    train_image_mask = np.array(
+        [image_url in train_files for image_url in columns.image_urls], dtype=bool
+    )
+    val_image_mask = np.array(
+        [image_url in val_files for image_url in columns.image_urls], dtype=bool
+    )
+
+    train_output_dir.mkdir(exist_ok=True, parents=True)
+    val_output_dir.mkdir(exist_ok=True, parents=True)
+    with Path(train_output_dir / "annotations.jsonl").open("w") as train_f, Path(
+        val_output_dir / "annotations.jsonl"
+    ).open("w") as val_f:
+        for line, image_code in zip(
+            _iter_json_lines(columns.jsonl_files), columns.line_image_codes
+        ):
+            if train_image_mask[image_code]:
+                train_f.write(line + "\n")
+            if val_image_mask[image_code]:
+                val_f.write(line + "\n")
+
+    df_train_classes = _get_class_count_from_codes(
+        columns.label_names, columns.box_label_codes[train_image_mask[box_image_codes]]
+    )
+    df_val_classes = _get_class_count_from_codes(
+        columns.label_names, columns.box_label_codes[val_image_mask[box_image_codes]]
+    )
+    return df_train_classes, df_val_classes
+
+
 def get_manditory_files(mandatory_filenames_str: str) -> List[str]:
     """get list of filenamse in based on mandatory_filenames_str
 
@@ -194,6 +386,13 @@ def get_args():
         default=None,
         help="list of filenames must be included in val.",
     )
+    parser.add_argument(
+        "--use-streaming-split",
+        dest="use_streaming_split",
+        type=str2bool,
+        default=False,
+        help="Split the jsonl files in a single streaming pass with bounded memory.",
+    )
     parser.add_argument(
         "--train-output-path",
         dest="train_output_path",
@@ -221,6 +420,7 @@ def main(
     mandatory_val_filenames_str: str,
     use_stratified_split: bool = True,
     stratified_split_n_fold: int = 5,
+    use_streaming_split: bool = False,
 ):
     """split the data and save to train and val mltable
 
@@ -234,6 +434,10 @@ def main(
         mandatory_val_filenames_str (str): llist of filenames in string for
          files must in val set seperated by semicolon; example value is
          "32.jpg;33.jpg"
+        use_stratified_split (bool): use stratified split or random split from automl
+        stratified_split_n_fold (int): number of folds of the stratified split
+        use_streaming_split (bool): split the jsonl files with
+         `split_jsonl_streaming` instead of loading them in memory
     """
     print(f"use_stratified_split={use_stratified_split}")
     print(f"type(use_stratified_split)={type(use_stratified_split)}")
@@ -256,15 +460,35 @@ def main(
         mandatory_train_filenames = get_manditory_files(mandatory_train_filenames_str)
         mandatory_val_filenames = get_manditory_files(mandatory_val_filenames_str)
 
-        jsonl_train, jsonl_val = split_jsonl(
-            jsonl_dir=jsonl_dir,
-            mandatory_train_filenames=mandatory_train_filenames,
-            mandatory_val_filenames=mandatory_val_filenames,
-            n_splits=stratified_split_n_fold,
-        )
+        if use_streaming_split:
+            df_train_classes, df_val_classes = split_jsonl_streaming(
+                jsonl_dir=jsonl_dir,
+                train_output_dir=train_output_dir,
+                val_output_dir=val_output_dir,
+                mandatory_train_filenames=mandatory_train_filenames,
+                mandatory_val_filenames=mandatory_val_filenames,
+                n_splits=stratified_split_n_fold,
+            )
+        else:
+            jsonl_train, jsonl_val = split_jsonl(
+                jsonl_dir=jsonl_dir,
+                mandatory_train_filenames=mandatory_train_filenames,
+                mandatory_val_filenames=mandatory_val_filenames,
+                n_splits=stratified_split_n_fold,
+            )
+
+            df_train_classes = _get_class_count(jsonl_train)
+            df_val_classes = _get_class_count(jsonl_val)
+
+            for mltable_dir, jsonl_list in zip(
+                [train_output_dir, val_output_dir], [jsonl_train, jsonl_val]
+            ):
+                mltable_dir.mkdir(exist_ok=True, parents=True)
+                json_path = Path(mltable_dir / "annotations.jsonl")
+                with json_path.open("w") as dataset_f:
+                    for jsonl in jsonl_list:
+                        dataset_f.write(json.dumps(jsonl) + "\n")
 
-        df_train_classes = _get_class_count(jsonl_train)
-        df_val_classes = _get_class_count(jsonl_val)
         df_classes_overall = pd.merge(
             df_train_classes,
             df_val_classes,
@@ -277,14 +501,7 @@ def main(
             f" after splitting \n {df_classes_overall}"
         )
 
-        for mltable_dir, jsonl_list in zip(
-            [train_output_dir, val_output_dir], [jsonl_train, jsonl_val]
-        ):
-            mltable_dir.mkdir(exist_ok=True, parents=True)
-            json_path = Path(mltable_dir / "annotations.jsonl")
-            with json_path.open("w") as dataset_f:
-                for jsonl in jsonl_list:
-                    dataset_f.write(json.dumps(jsonl) + "\n")
+        for mltable_dir in [train_output_dir, val_output_dir]:
             mltable_file_contents = _create_ml_table_file("annotations.jsonl")
             _save_ml_table_file(mltable_dir, mltable_file_contents)
 
@@ -299,6 +516,7 @@ if __name__ == "__main__":
     mandatory_val_filenames_str = args.mandatory_val_filenames
     use_stratified_split = args.use_stratified_split
     stratified_split_n_fold = args.stratified_split_n_fold
+    use_streaming_split = args.use_streaming_split
 
     main(
         input_data_path,
@@ -308,4 +526,5 @@ if __name__ == "__main__":
         mandatory_val_filenames_str,
         use_stratified_split,
         stratified_split_n_fold,
+        use_streaming_split,
     )
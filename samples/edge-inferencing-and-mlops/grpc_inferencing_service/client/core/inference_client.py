@@ -1,16 +1,123 @@
+import asyncio
+import json
+import threading
+
 import grpc
 from protos import inference_pb2, inference_pb2_grpc
 
+_SERVICE_NAME = inference_pb2.DESCRIPTOR.services_by_name["Inference"].full_name
+_RETRYABLE_STATUS_CODES = ["UNAVAILABLE"]
+
+
+# Retries of the calls, applied by gRPC through the service config of the channel.
+# Calls failing with UNAVAILABLE, e.g. while the service restarts, are retried with an exponential backoff
+# within the deadline of the call. The deadlines are set per call, as the timeout of the service config
+# expires short deadlines immediately with some grpcio versions.
+def get_service_config(max_attempts: int) -> str:
+    retry_policy = {
+        "maxAttempts": max_attempts,
+        "initialBackoff": "0.05s",
+        "maxBackoff": "1s",
+        "backoffMultiplier": 2,
+        "retryableStatusCodes": _RETRYABLE_STATUS_CODES,
+    }
+    return json.dumps({"methodConfig": [{"name": [{"service": _SERVICE_NAME}], "retryPolicy": retry_policy}]})
+
+
+def get_channel_options(max_attempts: int) -> list:
+    return [
+        ("grpc.enable_retries", 1),
+        ("grpc.service_config", get_service_config(max_attempts)),
+        # Keeps idle connections open, so that the next request does not pay for a new connection
+        ("grpc.keepalive_time_ms", 30000),
+        ("grpc.keepalive_permit_without_calls", 1),
+    ]
+
+
+# Channels are expensive to create, they hold the HTTP/2 connection to the service and multiplex all the calls.
+# The clients of a process with the same target and retry policy share one long-lived channel.
+_channels = {}
+_channels_lock = threading.Lock()
 
+
+def get_channel(target: str, max_attempts: int) -> grpc.Channel:
+    key = (target, max_attempts)
+    with _channels_lock:
+        if key not in _channels:
+            _channels[key] = grpc.insecure_channel(target, options=get_channel_options(max_attempts))
+        return _channels[key]
+
+
+# timeout is the deadline in seconds of each call, including its retries, the stream has no deadline
 class InferenceClient(inference_pb2_grpc.InferenceServicer):
-    def __init__(self, host: str, port: str):
-        # instantiate a channel
-        self.channel = grpc.insecure_channel(
-            '{}:{}'.format(host, port))
+    def __init__(self, host: str, port: str, timeout: float = 1.0, max_attempts: int = 3):
+        self.timeout = timeout
+        # reuse the channel of the process to the service
+        self.channel = get_channel('{}:{}'.format(host, port), max_attempts)
 
         # bind the client and the server
         self.stub = inference_pb2_grpc.InferenceStub(self.channel)
 
     def send_inference_request(self, x1: int, x2: int) -> object:
         request = inference_pb2.InferenceRequest(x1=x1, x2=x2)
-        return self.stub.GetRecommendation(request)
+        return self.stub.GetRecommendation(request, timeout=self.timeout)
+
+    def send_inference_request_future(self, x1: int, x2: int) -> grpc.Future:
+        # Returns without waiting for the response, result() of the future returns it
+        request = inference_pb2.InferenceRequest(x1=x1, x2=x2)
+        return self.stub.GetRecommendation.future(request, timeout=self.timeout)
+
+    def send_inference_requests(self, batch) -> list:
+        # batch is an iterable of (x1, x2), all the requests are in flight at once on the channel
+        # and the responses are returned in the same order
+        futures = [self.send_inference_request_future(x1, x2) for x1, x2 in batch]
+        return [future.result() for future in futures]
+
+    def send_inference_batch_request(self, x1: list, x2: list) -> object:
+        request = inference_pb2.InferenceBatchRequest(x1=x1, x2=x2)
+        return self.stub.GetRecommendationBatch(request, timeout=self.timeout)
+
+    def send_inference_batch_request_future(self, x1: list, x2: list) -> grpc.Future:
+        request = inference_pb2.InferenceBatchRequest(x1=x1, x2=x2)
+        return self.stub.GetRecommendationBatch.future(request, timeout=self.timeout)
+
+    def stream_inference_requests(self, batches) -> object:
+        # batches is an iterable of (x1 list, x2 list), the responses are yielded in the same order
+        requests = (inference_pb2.InferenceBatchRequest(x1=x1, x2=x2) for x1, x2 in batches)
+        return self.stub.GetRecommendationStream(requests)
+
+    def get_model_info(self) -> object:
+        return self.stub.GetModelInfo(inference_pb2.ModelInfoRequest(), timeout=self.timeout)
+
+
+# The InferenceClient for asyncio applications, its calls are awaited instead of blocking a thread.
+# The grpc.aio channel is bound to the event loop, so it is created and closed by the client.
+class AsyncInferenceClient:
+    def __init__(self, host: str, port: str, timeout: float = 1.0, max_attempts: int = 3):
+        self.timeout = timeout
+        self.channel = grpc.aio.insecure_channel('{}:{}'.format(host, port), options=get_channel_options(max_attempts))
+        self.stub = inference_pb2_grpc.InferenceStub(self.channel)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self.channel.close()
+
+    async def send_inference_request(self, x1: int, x2: int) -> object:
+        return await self.stub.GetRecommendation(
+            inference_pb2.InferenceRequest(x1=x1, x2=x2), timeout=self.timeout)
+
+    async def send_inference_requests(self, batch) -> list:
+        # batch is an iterable of (x1, x2), the responses are returned in the same order
+        return await asyncio.gather(*(self.send_inference_request(x1, x2) for x1, x2 in batch))
+
+    async def send_inference_batch_request(self, x1: list, x2: list) -> object:
+        return await self.stub.GetRecommendationBatch(
+            inference_pb2.InferenceBatchRequest(x1=x1, x2=x2), timeout=self.timeout)
+
+    async def get_model_info(self) -> object:
+        return await self.stub.GetModelInfo(inference_pb2.ModelInfoRequest(), timeout=self.timeout)
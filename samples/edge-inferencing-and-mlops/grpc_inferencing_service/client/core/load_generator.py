@@ -0,0 +1,109 @@
+import random
+import threading
+import time
+
+from core.inference_client import InferenceClient
+
+
+def percentile(latencies: list, percent: float) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class LoadResult:
+    def __init__(self, latencies: list, errors: int, elapsed: float, batch_size: int):
+        self.latencies = latencies
+        self.errors = errors
+        self.elapsed = elapsed
+        self.batch_size = batch_size
+
+    @property
+    def requests_per_second(self) -> float:
+        return len(self.latencies) / self.elapsed
+
+    def summary(self) -> str:
+        if not self.latencies:
+            return f"no successful requests, {self.errors} errors"
+        readings = len(self.latencies) * max(self.batch_size, 1)
+        return "\n".join([
+            f"{len(self.latencies)} requests in {self.elapsed:.2f}s, {self.errors} errors",
+            f"throughput: {self.requests_per_second:.0f} requests/s, {readings / self.elapsed:.0f} readings/s",
+            "latency: " + ", ".join(
+                f"p{percent} {percentile(self.latencies, percent) * 1000:.2f}ms" for percent in (50, 90, 99)),
+        ])
+
+
+# Sends requests from concurrency threads sharing one InferenceClient for duration seconds.
+# Each request is a GetRecommendation call, or a GetRecommendationBatch call of batch_size readings when it is above 0.
+def run_load_test(client: InferenceClient, concurrency: int, duration: float, batch_size: int = 0) -> LoadResult:
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def send_requests():
+        x1 = [random.uniform(-10, 10) for _ in range(max(batch_size, 1))]
+        x2 = [random.uniform(-10, 10) for _ in range(max(batch_size, 1))]
+        thread_latencies = []
+        thread_errors = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                if batch_size > 0:
+                    client.send_inference_batch_request(x1, x2)
+                else:
+                    client.send_inference_request(x1[0], x2[0])
+                thread_latencies.append(time.perf_counter() - start)
+            except Exception:
+                thread_errors += 1
+        with lock:
+            latencies.extend(thread_latencies)
+            errors[0] += thread_errors
+
+    threads = [threading.Thread(target=send_requests) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return LoadResult(latencies, errors[0], time.perf_counter() - start, batch_size)
+
+
+# Sends requests from a single thread for duration seconds, keeping in_flight requests pipelined on the channel
+# of the client: a request is sent as soon as one of the in flight requests completes.
+# This is how an application sending many readings uses the futures of the client, without a thread per request.
+def run_pipelined_load_test(client: InferenceClient, in_flight: int, duration: float,
+                            batch_size: int = 0) -> LoadResult:
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    slots = threading.Semaphore(in_flight)
+    x1 = [random.uniform(-10, 10) for _ in range(max(batch_size, 1))]
+    x2 = [random.uniform(-10, 10) for _ in range(max(batch_size, 1))]
+
+    def on_done(future, start):
+        latency = time.perf_counter() - start
+        with lock:
+            if future.exception() is None:
+                latencies.append(latency)
+            else:
+                errors[0] += 1
+        slots.release()
+
+    start = time.perf_counter()
+    deadline = start + duration
+    while time.perf_counter() < deadline:
+        slots.acquire()
+        request_start = time.perf_counter()
+        if batch_size > 0:
+            future = client.send_inference_batch_request_future(x1, x2)
+        else:
+            future = client.send_inference_request_future(x1[0], x2[0])
+        future.add_done_callback(lambda done, request_start=request_start: on_done(done, request_start))
+
+    # Waits for the requests still in flight
+    for _ in range(in_flight):
+        slots.acquire()
+
+    return LoadResult(latencies, errors[0], time.perf_counter() - start, batch_size)
@@ -1,8 +1,10 @@
+import argparse
 import math
 import os
 import time
 import random
 from core.inference_client import InferenceClient
+from core.load_generator import run_load_test, run_pipelined_load_test
 
 
 def get_env() -> dict:
@@ -16,12 +18,48 @@ def bijection_to_R(x):
     return math.tan(math.pi*(x - 1/2))
 
 
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--load-test", action="store_true", help="Measure the throughput and latency of the server")
+    parser.add_argument("--bench", action="store_true",
+                        help="Measure the throughput and latency of the server with requests pipelined from one thread")
+    parser.add_argument("--concurrency", type=int, default=16,
+                        help="Number of concurrent requests of the load test, or of requests in flight of the bench")
+    parser.add_argument("--duration", type=float, default=10, help="Duration of the load test or bench in seconds")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="Readings per GetRecommendationBatch request of the load test or bench, "
+                             "0 sends GetRecommendation requests")
+    return parser.parse_args()
+
+
+def load_test(args):
+    client = InferenceClient(**get_env())
+    print(f"load testing with {args.concurrency} concurrent requests for {args.duration}s")
+    result = run_load_test(client, args.concurrency, args.duration, args.batch_size)
+    print(result.summary())
+
+
+def bench(args):
+    client = InferenceClient(**get_env())
+    print(f"benchmarking with {args.concurrency} pipelined requests in flight for {args.duration}s")
+    result = run_pipelined_load_test(client, args.concurrency, args.duration, args.batch_size)
+    print(result.summary())
+
+
 if __name__ == '__main__':
+    args = get_args()
+    if args.load_test:
+        load_test(args)
+        exit()
+    if args.bench:
+        bench(args)
+        exit()
+
     print("inferencing client up")
+    # One client and channel for all the requests, the connection is set up once
+    client = InferenceClient(**get_env())
     while True:
         print("getting prediction")
-        env = get_env()
-        client = InferenceClient(**env)
 
         x1 = random.random()
         x1 = bijection_to_R(x1)
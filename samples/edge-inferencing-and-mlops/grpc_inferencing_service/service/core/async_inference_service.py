@@ -0,0 +1,31 @@
+import asyncio
+from concurrent import futures
+
+from core.inference_service import InferenceService
+
+
+# Serves the InferenceService handlers on the event loop of a grpc.aio server.
+# The handlers run on the event loop unless an executor is given, which is needed when the model waits
+# for another thread, e.g. the DynamicBatcher, as it would otherwise block every other request of the loop.
+class AsyncInferenceService(InferenceService):
+    def __init__(self, clf, executor: futures.Executor = None):
+        super().__init__(clf)
+        self.executor = executor
+
+    async def _run(self, handler, *args):
+        if self.executor is None:
+            return handler(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, handler, *args)
+
+    async def GetModelInfo(self, request, context):
+        return super().GetModelInfo(request, context)
+
+    async def GetRecommendation(self, request, context):
+        return await self._run(super().GetRecommendation, request, context)
+
+    async def GetRecommendationBatch(self, request, context):
+        return await self._run(super().GetRecommendationBatch, request, context)
+
+    async def GetRecommendationStream(self, request_iterator, context):
+        async for request in request_iterator:
+            yield await self._run(self._predict_stream_batch, request)
@@ -0,0 +1,80 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from core.metrics import Counter, Histogram, MetricsRegistry
+
+_BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+_QUEUE_WAIT_BUCKETS = [0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05]
+
+
+# Sits between the InferenceService and the model: the readings of concurrent requests are queued
+# and a single model worker predicts them together, up to max_batch_size readings per predict call,
+# waiting at most max_wait_us after the first queued request for more requests to join the batch.
+# It exposes the predict method of the model, so it can be passed to InferenceService as the model.
+class DynamicBatcher:
+    def __init__(self, clf, max_batch_size: int, max_wait_us: int, registry: MetricsRegistry = None):
+        self.clf = clf
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_us / 1_000_000
+        self._queue = queue.Queue()
+
+        registry = registry or MetricsRegistry()
+        self.requests = registry.register(Counter(
+            "inference_batcher_requests_total", "Number of requests predicted by the dynamic batcher"))
+        self.batches = registry.register(Counter(
+            "inference_batcher_batches_total", "Number of model predict calls of the dynamic batcher"))
+        self.batch_size = registry.register(Histogram(
+            "inference_batcher_batch_size", "Number of readings per model predict call", _BATCH_SIZE_BUCKETS))
+        self.queue_wait = registry.register(Histogram(
+            "inference_batcher_queue_wait_seconds", "Time requests wait in the queue before their batch is predicted",
+            _QUEUE_WAIT_BUCKETS))
+
+        self._worker = threading.Thread(target=self._run, name="dynamic-batcher", daemon=True)
+        self._worker.start()
+
+    def predict(self, features):
+        features = np.asarray(features, dtype=np.float64)
+        future = Future()
+        self._queue.put((features, future, time.perf_counter()))
+        return future.result()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        batch_size = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while batch_size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            batch_size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            start = time.perf_counter()
+            for _, _, enqueue_time in batch:
+                self.queue_wait.observe(start - enqueue_time)
+
+            try:
+                features = batch[0][0] if len(batch) == 1 else np.concatenate([item[0] for item in batch])
+                predictions = self.clf.predict(features)
+            except Exception as ex:
+                for _, future, _ in batch:
+                    future.set_exception(ex)
+                continue
+
+            self.requests.inc(len(batch))
+            self.batches.inc()
+            self.batch_size.observe(len(features))
+            offset = 0
+            for item_features, future, _ in batch:
+                future.set_result(predictions[offset:offset + len(item_features)])
+                offset += len(item_features)
@@ -1,4 +1,5 @@
 import grpc
+import numpy as np
 from protos import inference_pb2, inference_pb2_grpc
 
 
@@ -13,9 +14,29 @@ class RequestData:
         self.x2 = request.x2
 
 
+# Validates a batch request and holds its features as an (N, 2) array
+class BatchRequestData:
+    def __init__(self, request: inference_pb2.InferenceBatchRequest):
+        if len(request.x1) != len(request.x2):
+            raise ValueError(f"x1 and x2 must have the same length, got {len(request.x1)} and {len(request.x2)}")
+
+        self.features = np.empty((len(request.x1), 2), dtype=np.float64)
+        self.features[:, 0] = request.x1
+        self.features[:, 1] = request.x2
+
+
 class InferenceService(inference_pb2_grpc.InferenceServicer):
-    def __init__(self, clf):
+    def __init__(self, clf, model_version: str = "", model_loaded_at: str = ""):
         self.clf = clf
+        self.model_info = inference_pb2.ModelInfoResponse(version=model_version, loaded_at=model_loaded_at)
+
+    def set_model(self, clf, model_version: str, model_loaded_at: str):
+        # Swaps the model of the running service, the predict calls in progress complete with the previous model
+        self.clf = clf
+        self.model_info = inference_pb2.ModelInfoResponse(version=model_version, loaded_at=model_loaded_at)
+
+    def GetModelInfo(self, request, context):
+        return self.model_info
 
     def _send_result(self, prediction: int, warnings, errors):
         result = {
@@ -30,6 +51,51 @@ class InferenceService(inference_pb2_grpc.InferenceServicer):
         # This function allows for more complex preprocessing to be done if needed
         return self.clf.predict([[requestData.x1, requestData.x2]])[0]
 
+    def _send_batch_result(self, predictions, warnings, errors):
+        return inference_pb2.InferenceBatchResponse(predictions=predictions, warnings=warnings, errors=errors)
+
+    def _get_batch_predictions(self, requestData: BatchRequestData):
+        # A single predict call for the whole batch instead of one per reading
+        if len(requestData.features) == 0:
+            return []
+        return self.clf.predict(requestData.features).tolist()
+
+    def _predict_batch(self, request):
+        if request is None:
+            return self._send_batch_result([], [], ["Input cannot be None"])
+
+        try:
+            requestData = BatchRequestData(request)
+        except ValueError as ex:
+            return self._send_batch_result([], [], [str(ex)])
+
+        if self.clf is None:
+            return self._send_batch_result([], [], ["Error: There is no model"])
+
+        return self._send_batch_result(self._get_batch_predictions(requestData), [], [])
+
+    def GetRecommendationBatch(self, request, context):
+        try:
+            return self._predict_batch(request)
+
+        except Exception as ex:
+            msg = f"Runtime error occurred during inferencing: {ex}"
+            context.set_details(msg)
+            context.set_code(grpc.StatusCode.INTERNAL)
+
+            return inference_pb2.InferenceBatchResponse()
+
+    def _predict_stream_batch(self, request):
+        # A failed batch is reported in its response so that the stream can go on
+        try:
+            return self._predict_batch(request)
+        except Exception as ex:
+            return self._send_batch_result([], [], [f"Runtime error occurred during inferencing: {ex}"])
+
+    def GetRecommendationStream(self, request_iterator, context):
+        for request in request_iterator:
+            yield self._predict_stream_batch(request)
+
     def GetRecommendation(self, request, context):
         if request is None or not request:  # not request checks if request is an empty object
             return inference_pb2.InferenceResponse(errors=["Input cannot be None"])
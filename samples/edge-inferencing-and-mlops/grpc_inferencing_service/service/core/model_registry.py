@@ -0,0 +1,98 @@
+import hashlib
+import os
+import pickle
+import threading
+from datetime import datetime, timezone
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+
+# A model with the version it was loaded from, replaced as a whole on reload
+class LoadedModel(NamedTuple):
+    model: object
+    version: str
+    loaded_at: str
+
+
+# Owns the model of the service and replaces it when the model file changes, without restarting the service.
+# The file is polled in a background thread. A changed file is loaded and warmed up with a synthetic batch
+# off the request path, then handed to the listeners, which swap the reference used by the InferenceService.
+# Requests keep using the previous model until the swap, and the previous model is kept when loading fails.
+# The version of a model is the start of the SHA-256 of its file, so touching a file does not reload it.
+class ModelRegistry:
+    def __init__(self, model_path: str, poll_interval: float = 5.0, warmup_batch_size: int = 32,
+                 loader: Callable[[bytes], object] = pickle.loads):
+        self.model_path = model_path
+        self.poll_interval = poll_interval
+        self.warmup_batch_size = warmup_batch_size
+        self.loader = loader
+        self.current = None
+        self._listeners = []
+        self._file_state = None
+        self._reload_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._watcher = None
+
+    def add_listener(self, listener: Callable[[LoadedModel], None]):
+        self._listeners.append(listener)
+        if self.current is not None:
+            listener(self.current)
+
+    def _get_file_state(self):
+        try:
+            stat = os.stat(self.model_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _warm_up(self, model):
+        # The first predict calls of a model are slower, they are made here instead of in the first requests
+        if self.warmup_batch_size > 0:
+            model.predict(np.zeros((1, 2)))
+            model.predict(np.zeros((self.warmup_batch_size, 2)))
+
+    def reload(self) -> bool:
+        # Loads the model file if it changed since the last call, returns whether a new model is in use
+        with self._reload_lock:
+            file_state = self._get_file_state()
+            if file_state is None or file_state == self._file_state:
+                return False
+            self._file_state = file_state
+
+            try:
+                with open(self.model_path, 'rb') as model_file:
+                    content = model_file.read()
+                version = hashlib.sha256(content).hexdigest()[:12]
+                if self.current is not None and self.current.version == version:
+                    return False
+                model = self.loader(content)
+                self._warm_up(model)
+            except Exception as ex:
+                # A file that is still being written fails to load, it is loaded again once its write completes
+                print(f"Failed to load the model {self.model_path}, keeping the current model: {ex}")
+                return False
+
+            self.current = LoadedModel(model, version, datetime.now(timezone.utc).isoformat())
+            for listener in self._listeners:
+                listener(self.current)
+            print(f"Loaded model version {version} from {self.model_path}")
+            return True
+
+    def _watch(self):
+        while not self._stopped.wait(self.poll_interval):
+            self.reload()
+
+    def start(self):
+        # Polls the model file, a poll interval of 0 disables the reloads
+        if self.poll_interval <= 0 or self._watcher is not None:
+            return
+        self._stopped.clear()
+        self._watcher = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
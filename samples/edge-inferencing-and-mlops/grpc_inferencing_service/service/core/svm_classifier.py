@@ -0,0 +1,91 @@
+import io
+
+import numpy as np
+
+# Version of the classifier.npz format written by model/export_model.py
+FORMAT_VERSION = 1
+
+
+# Predicts with an SVC exported to classifier.npz by model/export_model.py, with NumPy only.
+# Loading it does not import sklearn, which takes most of the startup time and memory of the service,
+# and a linear model predicts with a single dot product instead of going through libsvm.
+# The predictions are the ones of SVC.predict, the parity is checked by the tests.
+class SvmClassifier:
+    def __init__(self, arrays):
+        format_version = int(arrays["format_version"])
+        if format_version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported model format version {format_version}, expected {FORMAT_VERSION}")
+
+        self.kernel = str(arrays["kernel"])
+        self.classes = arrays["classes"]
+        self.intercept = arrays["intercept"]
+        if self.kernel == "linear":
+            self.coef = arrays["coef"]
+        else:
+            self.support_vectors = arrays["support_vectors"]
+            self.dual_coef = arrays["dual_coef"]
+            self.gamma = float(arrays["gamma"])
+            self.coef0 = float(arrays["coef0"])
+            self.degree = int(arrays["degree"])
+            # Support vectors are grouped by class, sv_slices[i] are the ones of class i
+            ends = np.cumsum(arrays["n_support"])
+            self.sv_slices = [slice(end - count, end) for end, count in zip(ends, arrays["n_support"])]
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls(arrays)
+
+    @classmethod
+    def loads(cls, content: bytes):
+        return cls.load(io.BytesIO(content))
+
+    def _kernel(self, features):
+        if self.kernel == "rbf":
+            distances = (
+                np.einsum("ij,ij->i", features, features)[:, np.newaxis]
+                - 2 * features @ self.support_vectors.T
+                + np.einsum("ij,ij->i", self.support_vectors, self.support_vectors)[np.newaxis, :])
+            return np.exp(-self.gamma * np.maximum(distances, 0))
+        products = features @ self.support_vectors.T
+        if self.kernel == "poly":
+            return (self.gamma * products + self.coef0) ** self.degree
+        if self.kernel == "sigmoid":
+            return np.tanh(self.gamma * products + self.coef0)
+        raise ValueError(f"Unsupported kernel {self.kernel}")
+
+    def decision_function(self, features):
+        # One column per pair of classes (i, j), i < j, in the order of SVC
+        features = np.asarray(features, dtype=np.float64)
+        if self.kernel == "linear":
+            return features @ self.coef.T + self.intercept
+
+        kernel = self._kernel(features)
+        n_classes = len(self.classes)
+        decisions = np.empty((len(features), len(self.intercept)))
+        pair = 0
+        for i in range(n_classes):
+            for j in range(i + 1, n_classes):
+                decisions[:, pair] = (
+                    kernel[:, self.sv_slices[i]] @ self.dual_coef[j - 1, self.sv_slices[i]]
+                    + kernel[:, self.sv_slices[j]] @ self.dual_coef[i, self.sv_slices[j]]
+                    + self.intercept[pair])
+                pair += 1
+        return decisions
+
+    def predict(self, features):
+        decisions = self.decision_function(features)
+        n_classes = len(self.classes)
+        if n_classes == 2:
+            # SVC negates the coefficients of binary models, a positive decision is the second class
+            return self.classes[(decisions[:, 0] > 0).astype(np.intp)]
+
+        # One vs one vote, a positive decision of the pair (i, j) is a vote for i, ties go to the first class
+        votes = np.zeros((len(decisions), n_classes), dtype=np.intp)
+        rows = np.arange(len(decisions))
+        pair = 0
+        for i in range(n_classes):
+            for j in range(i + 1, n_classes):
+                votes[rows, np.where(decisions[:, pair] > 0, i, j)] += 1
+                pair += 1
+        return self.classes[np.argmax(votes, axis=1)]
@@ -0,0 +1,53 @@
+import asyncio
+from concurrent import futures
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from protos import inference_pb2
+from core.async_inference_service import AsyncInferenceService
+
+
+async def _iterate(items):
+    for item in items:
+        yield item
+
+
+def _create_clf():
+    clf = MagicMock()
+    clf.predict.side_effect = lambda features: np.arange(len(features))
+    return clf
+
+
+class TestAsyncInferenceService:
+    """Unit tests for AsyncInferenceService class"""
+
+    @pytest.mark.parametrize('executor', [None, futures.ThreadPoolExecutor(max_workers=1)])
+    def test_get_recommendation(self, executor):
+        service = AsyncInferenceService(_create_clf(), executor)
+        response = asyncio.run(service.GetRecommendation(inference_pb2.InferenceRequest(x1=1, x2=2), None))
+
+        assert response.prediction == 0
+        assert len(response.errors) == 0
+
+    @pytest.mark.parametrize('executor', [None, futures.ThreadPoolExecutor(max_workers=1)])
+    def test_get_recommendation_batch(self, executor):
+        service = AsyncInferenceService(_create_clf(), executor)
+        request = inference_pb2.InferenceBatchRequest(x1=[1, 2, 3], x2=[1, 2, 3])
+        response = asyncio.run(service.GetRecommendationBatch(request, None))
+
+        assert list(response.predictions) == [0, 1, 2]
+
+    def test_get_recommendation_stream(self):
+        service = AsyncInferenceService(_create_clf())
+        requests = [inference_pb2.InferenceBatchRequest(x1=[1, 2], x2=[1, 2]),
+                    inference_pb2.InferenceBatchRequest(x1=[1], x2=[])]
+
+        async def collect():
+            return [response async for response in service.GetRecommendationStream(_iterate(requests), None)]
+
+        responses = asyncio.run(collect())
+
+        assert list(responses[0].predictions) == [0, 1]
+        assert len(responses[1].errors) == 1
@@ -0,0 +1,72 @@
+import threading
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from core.dynamic_batcher import DynamicBatcher
+from core.metrics import MetricsRegistry
+
+
+def _predict_first_column(features):
+    return features[:, 0].astype(int)
+
+
+class TestDynamicBatcher:
+    """Unit tests for DynamicBatcher class"""
+
+    def test_concurrent_requests_are_predicted_in_one_batch(self):
+        clf = MagicMock()
+        clf.predict.side_effect = _predict_first_column
+        batcher = DynamicBatcher(clf, max_batch_size=4, max_wait_us=1_000_000)
+        results = {}
+
+        def send(features):
+            results[features[0][0]] = batcher.predict(features).tolist()
+
+        requests = [[[1, 0], [2, 0]], [[3, 0]], [[4, 0]]]
+        threads = [threading.Thread(target=send, args=(features,)) for features in requests]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        clf.predict.assert_called_once()
+        assert results == {1: [1, 2], 3: [3], 4: [4]}
+        assert batcher.batch_size.count == 1
+        assert batcher.batch_size.sum == 4
+        assert batcher.requests.value == 3
+        assert batcher.queue_wait.count == 3
+
+    def test_single_request_is_predicted_after_max_wait(self):
+        clf = MagicMock()
+        clf.predict.side_effect = _predict_first_column
+        batcher = DynamicBatcher(clf, max_batch_size=32, max_wait_us=100)
+
+        assert batcher.predict([[7, 0]]).tolist() == [7]
+        assert batcher.batches.value == 1
+
+    def test_predict_exception_is_raised_to_requests(self):
+        clf = MagicMock()
+        clf.predict.side_effect = ValueError("Some runtime error occurred")
+        batcher = DynamicBatcher(clf, max_batch_size=32, max_wait_us=100)
+
+        with pytest.raises(ValueError):
+            batcher.predict([[1, 2]])
+
+    def test_metrics_are_rendered_in_prometheus_format(self):
+        registry = MetricsRegistry()
+        clf = MagicMock()
+        clf.predict.side_effect = _predict_first_column
+        batcher = DynamicBatcher(clf, max_batch_size=32, max_wait_us=100, registry=registry)
+
+        batcher.predict(np.zeros((3, 2)))
+        rendered = registry.render()
+
+        assert "# TYPE inference_batcher_batch_size histogram" in rendered
+        assert 'inference_batcher_batch_size_bucket{le="2"} 0' in rendered
+        assert 'inference_batcher_batch_size_bucket{le="4"} 1' in rendered
+        assert 'inference_batcher_batch_size_bucket{le="+Inf"} 1' in rendered
+        assert "inference_batcher_batch_size_sum 3" in rendered
+        assert "inference_batcher_requests_total 1" in rendered
+        assert "inference_batcher_queue_wait_seconds_count 1" in rendered
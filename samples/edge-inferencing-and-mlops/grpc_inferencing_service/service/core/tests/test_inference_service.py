@@ -1,5 +1,6 @@
 from unittest.mock import MagicMock, patch
 import grpc
+import numpy as np
 
 from protos import inference_pb2
 from core.inference_service import InferenceService
@@ -67,3 +68,89 @@ class TestGetRecommendation:
             response = service.GetRecommendation(self.request, mock_context)
             mock_context.set_code.assert_called_with(grpc.StatusCode.INTERNAL)
             assert response is not None
+
+
+class TestGetRecommendationBatch:
+    """Unit tests for GetRecommendationBatch and GetRecommendationStream functions"""
+    request = inference_pb2.InferenceBatchRequest(
+        x1=[-0.697672367, 1.5, 2.0],
+        x2=[79.73386858, -3.2, 0.0],
+    )
+
+    def _create_service(self):
+        service = InferenceService(MagicMock())
+        service.clf.predict.side_effect = lambda features: np.arange(len(features))
+        return service
+
+    def test_batch_is_predicted_in_one_call(self):
+        service = self._create_service()
+        response = service.GetRecommendationBatch(self.request, None)
+
+        assert list(response.predictions) == [0, 1, 2]
+        assert len(response.errors) == 0
+        service.clf.predict.assert_called_once()
+        features = service.clf.predict.call_args[0][0]
+        np.testing.assert_array_equal(features, [[-0.697672367, 79.73386858], [1.5, -3.2], [2.0, 0.0]])
+
+    def test_empty_batch(self):
+        service = self._create_service()
+        response = service.GetRecommendationBatch(inference_pb2.InferenceBatchRequest(), None)
+
+        assert len(response.predictions) == 0
+        assert len(response.errors) == 0
+        service.clf.predict.assert_not_called()
+
+    def test_mismatched_lengths(self):
+        service = self._create_service()
+        response = service.GetRecommendationBatch(inference_pb2.InferenceBatchRequest(x1=[1, 2], x2=[1]), None)
+
+        assert len(response.predictions) == 0
+        assert len(response.errors) == 1
+
+    def test_no_model(self):
+        service = InferenceService(None)
+        response = service.GetRecommendationBatch(self.request, None)
+
+        assert response.errors == ["Error: There is no model"]
+
+    def test_handles_exception(self):
+        service = self._create_service()
+        service.clf.predict.side_effect = Exception('Some runtime error occurred')
+        mock_context = MagicMock()
+        response = service.GetRecommendationBatch(self.request, mock_context)
+
+        mock_context.set_code.assert_called_with(grpc.StatusCode.INTERNAL)
+        assert response is not None
+
+    def test_stream_responds_to_each_batch(self):
+        service = self._create_service()
+        requests = [self.request, inference_pb2.InferenceBatchRequest(x1=[1], x2=[2])]
+        responses = list(service.GetRecommendationStream(iter(requests), None))
+
+        assert [list(response.predictions) for response in responses] == [[0, 1, 2], [0]]
+
+    def test_stream_reports_errors_and_continues(self):
+        service = self._create_service()
+        service.clf.predict.side_effect = [Exception('Some runtime error occurred'), np.array([1])]
+        requests = [self.request, inference_pb2.InferenceBatchRequest(x1=[1], x2=[2])]
+        responses = list(service.GetRecommendationStream(iter(requests), None))
+
+        assert len(responses[0].errors) == 1
+        assert list(responses[1].predictions) == [1]
+
+
+class TestGetModelInfo:
+    """Unit tests for GetModelInfo function"""
+
+    def test_without_model(self):
+        response = InferenceService(None).GetModelInfo(inference_pb2.ModelInfoRequest(), None)
+
+        assert response.version == ""
+
+    def test_after_set_model(self):
+        service = InferenceService(None)
+        service.set_model(MagicMock(), "0123456789ab", "2022-01-01T00:00:00+00:00")
+        response = service.GetModelInfo(inference_pb2.ModelInfoRequest(), None)
+
+        assert response.version == "0123456789ab"
+        assert response.loaded_at == "2022-01-01T00:00:00+00:00"
@@ -0,0 +1,137 @@
+import itertools
+import os
+import pickle
+import time
+from unittest.mock import MagicMock
+
+import numpy as np
+from sklearn.dummy import DummyClassifier
+
+from protos import inference_pb2
+from core.inference_service import InferenceService
+from core.model_registry import ModelRegistry
+
+# Each written model gets a later modification time, as writes within the file system time resolution
+# would have the same one, and the models of the tests have the same size
+_mtime_offsets = itertools.count(1)
+
+
+def _create_classifier(prediction: int):
+    clf = DummyClassifier(strategy="constant", constant=prediction)
+    clf.fit(np.zeros((2, 2)), [0, 1])
+    return clf
+
+
+def _write_model(path, clf):
+    # Models are replaced with a rename, so that the registry never reads a partially written file
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as model_file:
+        pickle.dump(clf, model_file)
+    os.replace(temp_path, path)
+    _touch(path)
+
+
+def _touch(path):
+    mtime_ns = time.time_ns() + next(_mtime_offsets) * 10 ** 9
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+class TestModelRegistry:
+    """Unit tests for ModelRegistry class"""
+
+    def test_reload_without_model_file(self, tmp_path):
+        registry = ModelRegistry(str(tmp_path / "classifier.pkl"))
+
+        assert not registry.reload()
+        assert registry.current is None
+
+    def test_reload_loads_and_warms_up_the_model(self, tmp_path):
+        model_path = tmp_path / "classifier.pkl"
+        model_path.write_bytes(b"model")
+        clf = MagicMock()
+        registry = ModelRegistry(str(model_path), warmup_batch_size=8, loader=lambda content: clf)
+
+        assert registry.reload()
+        assert registry.current.model is clf
+        assert len(registry.current.version) == 12
+        assert [len(call.args[0]) for call in clf.predict.call_args_list] == [1, 8]
+
+    def test_reload_skips_unchanged_model(self, tmp_path):
+        model_path = tmp_path / "classifier.pkl"
+        model_path.write_bytes(b"model")
+        loader = MagicMock()
+        registry = ModelRegistry(str(model_path), loader=loader)
+        registry.reload()
+
+        # Same content with a new modification time has the same version
+        _touch(model_path)
+
+        assert not registry.reload()
+        assert loader.call_count == 1
+
+    def test_failed_load_keeps_the_current_model(self, tmp_path):
+        model_path = tmp_path / "classifier.pkl"
+        _write_model(str(model_path), _create_classifier(1))
+        registry = ModelRegistry(str(model_path))
+        registry.reload()
+        current = registry.current
+
+        model_path.write_bytes(b"partially written model")
+        _touch(model_path)
+
+        assert not registry.reload()
+        assert registry.current is current
+
+    def test_failed_warm_up_keeps_the_current_model(self, tmp_path):
+        model_path = tmp_path / "classifier.pkl"
+        model_path.write_bytes(b"model")
+        clf = MagicMock()
+        clf.predict.side_effect = ValueError("expected 3 features")
+        registry = ModelRegistry(str(model_path), loader=lambda content: clf)
+
+        assert not registry.reload()
+        assert registry.current is None
+
+    def test_listeners_get_current_and_new_models(self, tmp_path):
+        model_path = tmp_path / "classifier.pkl"
+        _write_model(str(model_path), _create_classifier(1))
+        registry = ModelRegistry(str(model_path))
+        registry.reload()
+        versions = []
+        registry.add_listener(lambda loaded_model: versions.append(loaded_model.version))
+
+        _write_model(str(model_path), _create_classifier(0))
+        registry.reload()
+
+        assert len(versions) == 2
+        assert versions[0] != versions[1]
+        assert versions[1] == registry.current.version
+
+    def test_watcher_swaps_the_model_of_the_service(self, tmp_path):
+        model_path = tmp_path / "classifier.pkl"
+        _write_model(str(model_path), _create_classifier(1))
+        registry = ModelRegistry(str(model_path), poll_interval=0.01)
+        registry.reload()
+        service = InferenceService(None)
+        registry.add_listener(
+            lambda loaded_model: service.set_model(loaded_model.model, loaded_model.version, loaded_model.loaded_at))
+        request = inference_pb2.InferenceRequest(x1=1, x2=2)
+        assert service.GetRecommendation(request, None).prediction == 1
+
+        registry.start()
+        try:
+            _write_model(str(model_path), _create_classifier(0))
+            deadline = time.time() + 5
+            while service.GetRecommendation(request, None).prediction != 0 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            registry.stop()
+
+        assert service.GetRecommendation(request, None).prediction == 0
+        assert service.GetModelInfo(inference_pb2.ModelInfoRequest(), None).version == registry.current.version
+
+    def test_no_watcher_without_poll_interval(self, tmp_path):
+        registry = ModelRegistry(str(tmp_path / "classifier.pkl"), poll_interval=0)
+        registry.start()
+
+        assert registry._watcher is None
@@ -0,0 +1,72 @@
+import io
+
+import numpy as np
+import pytest
+from sklearn import svm
+
+from core.svm_classifier import FORMAT_VERSION, SvmClassifier
+
+
+# Writes an SVC in the classifier.npz format of model/export_model.py
+def _export(clf, **overrides) -> bytes:
+    arrays = {
+        "format_version": np.array(FORMAT_VERSION),
+        "kernel": np.array(clf.kernel),
+        "classes": clf.classes_,
+        "intercept": clf.intercept_,
+    }
+    if clf.kernel == "linear":
+        arrays["coef"] = clf.coef_
+    else:
+        arrays.update({
+            "support_vectors": clf.support_vectors_,
+            "dual_coef": clf.dual_coef_,
+            "n_support": clf.n_support_,
+            "gamma": np.array(clf._gamma),
+            "coef0": np.array(clf.coef0),
+            "degree": np.array(clf.degree),
+        })
+    arrays.update(overrides)
+    content = io.BytesIO()
+    np.savez(content, **arrays)
+    return content.getvalue()
+
+
+def _create_dataset(n_classes: int):
+    rng = np.random.default_rng(7)
+    features = rng.normal(size=(300, 2)) * [1, 40]
+    labels = np.digitize(features[:, 0] + features[:, 1] / 40 + rng.normal(scale=0.3, size=300),
+                         np.linspace(-1.5, 1.5, n_classes - 1))
+    return features, labels
+
+
+class TestSvmClassifier:
+    """Parity tests of SvmClassifier with sklearn SVC"""
+
+    @pytest.mark.parametrize('kernel', ['linear', 'rbf', 'poly', 'sigmoid'])
+    @pytest.mark.parametrize('n_classes', [2, 3])
+    def test_predict_parity(self, kernel, n_classes):
+        features, labels = _create_dataset(n_classes)
+        clf = svm.SVC(kernel=kernel, C=0.025 if kernel == 'linear' else 1.0, degree=2, coef0=1.0,
+                      decision_function_shape='ovo')
+        clf.fit(features[:200], labels[:200])
+        classifier = SvmClassifier.loads(_export(clf))
+
+        np.testing.assert_array_equal(classifier.predict(features), clf.predict(features))
+        np.testing.assert_allclose(
+            classifier.decision_function(features).ravel(), clf.decision_function(features).ravel(), atol=1e-6)
+
+    def test_predict_list_of_readings(self):
+        features, labels = _create_dataset(2)
+        clf = svm.SVC(kernel='linear', C=0.025).fit(features, labels)
+        classifier = SvmClassifier.loads(_export(clf))
+
+        assert classifier.predict([[-0.697672367, 79.73386858]]).tolist() == \
+            clf.predict([[-0.697672367, 79.73386858]]).tolist()
+
+    def test_unsupported_format_version(self):
+        features, labels = _create_dataset(2)
+        clf = svm.SVC(kernel='linear').fit(features, labels)
+
+        with pytest.raises(ValueError):
+            SvmClassifier.loads(_export(clf, format_version=np.array(FORMAT_VERSION + 1)))
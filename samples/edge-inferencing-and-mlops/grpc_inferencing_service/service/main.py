@@ -1,9 +1,17 @@
+import asyncio
 import grpc
 import os
 import pickle
+import threading
 
 from concurrent import futures
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from core.async_inference_service import AsyncInferenceService
+from core.dynamic_batcher import DynamicBatcher
 from core.inference_service import InferenceService
+from core.metrics import MetricsRegistry
+from core.model_registry import LoadedModel, ModelRegistry
+from core.svm_classifier import SvmClassifier
 
 from grpc_health.v1 import health
 from grpc_health.v1 import health_pb2
@@ -14,18 +22,111 @@ from protos import inference_pb2
 from protos import inference_pb2_grpc
 
 _LISTEN_HOST = "[::]"
-_MODEL_PATH = "./lib/classifier.pkl"
-_THREAD_POOL_SIZE = 4
+# The NumPy export of the model is preferred to the pickled model, loading it does not import sklearn
+_DEFAULT_MODEL_PATHS = ["./lib/classifier.npz", "./lib/classifier.pkl"]
+_MODEL_PATH = os.getenv("MODEL_PATH") or next(
+    (path for path in _DEFAULT_MODEL_PATHS if os.path.exists(path)), _DEFAULT_MODEL_PATHS[-1])
+# Seconds between two checks of the model file for a new model, 0 disables the reloads
+_MODEL_POLL_INTERVAL = float(os.getenv("MODEL_POLL_INTERVAL", "5"))
+_MODEL_WARMUP_BATCH_SIZE = int(os.getenv("MODEL_WARMUP_BATCH_SIZE", "32"))
+_THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", "4"))
+_DYNAMIC_BATCHING = os.getenv("DYNAMIC_BATCHING", "false").lower() == "true"
+_MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "32"))
+_MAX_BATCH_WAIT_US = int(os.getenv("MAX_BATCH_WAIT_US", "500"))
+# "sync" serves with a thread pool per server, "aio" serves inference and health on one asyncio event loop
+_SERVER_MODE = os.getenv("SERVER_MODE", "sync").lower()
+_MAX_CONCURRENT_RPCS = os.getenv("MAX_CONCURRENT_RPCS")
+
+# gRPC channel arguments set from environment variables, the gRPC defaults are used for unset ones
+_SERVER_OPTION_ENV_VARIABLES = {
+    "MAX_CONCURRENT_STREAMS": "grpc.max_concurrent_streams",
+    "KEEPALIVE_TIME_MS": "grpc.keepalive_time_ms",
+    "KEEPALIVE_TIMEOUT_MS": "grpc.keepalive_timeout_ms",
+    "KEEPALIVE_PERMIT_WITHOUT_CALLS": "grpc.keepalive_permit_without_calls",
+    "MAX_RECEIVE_MESSAGE_LENGTH": "grpc.max_receive_message_length",
+    "MAX_SEND_MESSAGE_LENGTH": "grpc.max_send_message_length",
+}
+
+_INFERENCE_SERVICE_NAME = inference_pb2.DESCRIPTOR.services_by_name["Inference"].full_name
+
+_metrics_registry = MetricsRegistry()
+
+
+def _get_model_loader(model_path: str):
+    return SvmClassifier.loads if model_path.endswith(".npz") else pickle.loads
+
+
+def _create_model_registry() -> ModelRegistry:
+    model_registry = ModelRegistry(
+        _MODEL_PATH, _MODEL_POLL_INTERVAL, _MODEL_WARMUP_BATCH_SIZE, _get_model_loader(_MODEL_PATH))
+    # The model is loaded before the servers start, later models are loaded by the watcher
+    model_registry.reload()
+    return model_registry
+
+
+def _get_server_options() -> list:
+    return [
+        (option, int(os.environ[env_variable]))
+        for env_variable, option in _SERVER_OPTION_ENV_VARIABLES.items()
+        if os.getenv(env_variable)
+    ]
+
+
+def _get_max_concurrent_rpcs():
+    return int(_MAX_CONCURRENT_RPCS) if _MAX_CONCURRENT_RPCS else None
+
+
+def _use_model(service: InferenceService, loaded_model: LoadedModel) -> None:
+    model = loaded_model.model
+    if _DYNAMIC_BATCHING:
+        if isinstance(service.clf, DynamicBatcher):
+            # The batcher keeps its queue and metrics, the batches after the swap are predicted by the new model
+            service.clf.clf = model
+            model = service.clf
+        else:
+            # Concurrent requests are predicted together by a single model worker
+            model = DynamicBatcher(model, _MAX_BATCH_SIZE, _MAX_BATCH_WAIT_US, _metrics_registry)
+            print(f"Dynamic batching up to {_MAX_BATCH_SIZE} readings, waiting up to {_MAX_BATCH_WAIT_US}us")
+    service.set_model(model, loaded_model.version, loaded_model.loaded_at)
+
+
+def _get_serving_status(service: str, model_registry: ModelRegistry):
+    # The inference service is only serving once it has a model
+    if service == _INFERENCE_SERVICE_NAME and model_registry.current is None:
+        return health_pb2.HealthCheckResponse.NOT_SERVING
+    return health_pb2.HealthCheckResponse.SERVING
+
+
+def _get_reflection_services() -> tuple:
+    # Create a tuple of all of the services we want to export via reflection.
+    return tuple(
+        service.full_name
+        for service in inference_pb2.DESCRIPTOR.services_by_name.values()) + (
+            reflection.SERVICE_NAME, health.SERVICE_NAME)
 
 
-def load_model():
-    if not os.path.exists(_MODEL_PATH):
-        return None
-    clf = pickle.load(open(_MODEL_PATH, 'rb'))
-    return clf
+def _start_metrics_server(port: int) -> None:
+    # Serves the metrics of the service in the Prometheus text format on /metrics
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = _metrics_registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
 
+        def log_message(self, format, *args):
+            pass
 
-def _configure_health_server(server: grpc.Server, port: int) -> None:
+    metrics_server = ThreadingHTTPServer(("", port), MetricsHandler)
+    threading.Thread(target=metrics_server.serve_forever, daemon=True).start()
+
+
+def _configure_health_server(server: grpc.Server, port: int, model_registry: ModelRegistry) -> None:
     # Add the health servicer to the server.
     listen_address = f"{_LISTEN_HOST}:{port}"
     server.add_insecure_port(listen_address)
@@ -37,43 +138,94 @@ def _configure_health_server(server: grpc.Server, port: int) -> None:
     )
 
     health_pb2_grpc.add_HealthServicer_to_server(health_servicer, server)
+    services = _get_reflection_services()
 
-    # Create a tuple of all of the services we want to export via reflection.
-    services = tuple(
-        service.full_name
-        for service in inference_pb2.DESCRIPTOR.services_by_name.values()) + (
-            reflection.SERVICE_NAME, health.SERVICE_NAME)
-
-    # Mark all services as healthy.
     for service in services:
-        health_servicer.set(service, health_pb2.HealthCheckResponse.SERVING)
+        health_servicer.set(service, _get_serving_status(service, model_registry))
+    model_registry.add_listener(
+        lambda _: health_servicer.set(_INFERENCE_SERVICE_NAME, health_pb2.HealthCheckResponse.SERVING))
 
     reflection.enable_server_reflection(services, server)
 
 
-def _configure_inferencing_server(server: grpc.Server, port: int) -> None:
+def _configure_inferencing_server(server: grpc.Server, port: int, model_registry: ModelRegistry) -> None:
     # Add the application servicer to the server.
-    inference_pb2_grpc.add_InferenceServicer_to_server(InferenceService(load_model()), server)
+    inference_service = InferenceService(None)
+    model_registry.add_listener(lambda loaded_model: _use_model(inference_service, loaded_model))
+    inference_pb2_grpc.add_InferenceServicer_to_server(inference_service, server)
     listen_address = f"{_LISTEN_HOST}:{port}"
     server.add_insecure_port(listen_address)
 
 
-def serve(inferencing_port: int, health_port: int):
-    inferencing_server = grpc.server(futures.ThreadPoolExecutor(max_workers=_THREAD_POOL_SIZE))
-    _configure_inferencing_server(inferencing_server, inferencing_port)
+async def _configure_aio_health_server(server: grpc.aio.Server, port: int, model_registry: ModelRegistry) -> None:
+    # Add the asyncio health servicer to the server, on its own port as in the sync mode.
+    server.add_insecure_port(f"{_LISTEN_HOST}:{port}")
+    health_servicer = health.aio.HealthServicer()
+    health_pb2_grpc.add_HealthServicer_to_server(health_servicer, server)
+    services = _get_reflection_services()
+
+    for service in services:
+        await health_servicer.set(service, _get_serving_status(service, model_registry))
+    # The models are loaded by the watcher thread, the status is set on the event loop of the servicer
+    loop = asyncio.get_running_loop()
+    model_registry.add_listener(lambda _: asyncio.run_coroutine_threadsafe(
+        health_servicer.set(_INFERENCE_SERVICE_NAME, health_pb2.HealthCheckResponse.SERVING), loop))
+
+    reflection.enable_server_reflection(services, server)
+
+
+async def serve_aio(inferencing_port: int, health_port: int, metrics_port: int = None):
+    if metrics_port:
+        _start_metrics_server(int(metrics_port))
+        print(f"Metrics server listening on port {metrics_port}")
+
+    server = grpc.aio.server(options=_get_server_options(), maximum_concurrent_rpcs=_get_max_concurrent_rpcs())
+
+    model_registry = _create_model_registry()
+    # The dynamic batcher blocks the calling thread until the batch is predicted, so it is called from a thread pool
+    executor = futures.ThreadPoolExecutor(max_workers=_THREAD_POOL_SIZE) if _DYNAMIC_BATCHING else None
+    inference_service = AsyncInferenceService(None, executor)
+    model_registry.add_listener(lambda loaded_model: _use_model(inference_service, loaded_model))
+    inference_pb2_grpc.add_InferenceServicer_to_server(inference_service, server)
+    server.add_insecure_port(f"{_LISTEN_HOST}:{inferencing_port}")
+    await _configure_aio_health_server(server, health_port, model_registry)
+
+    await server.start()
+    model_registry.start()
+    print(f"asyncio server listening on port {inferencing_port} for inferencing and {health_port} for health")
+    await server.wait_for_termination()
+
+
+def serve(inferencing_port: int, health_port: int, metrics_port: int = None):
+    if metrics_port:
+        _start_metrics_server(int(metrics_port))
+        print(f"Metrics server listening on port {metrics_port}")
+
+    model_registry = _create_model_registry()
+    inferencing_server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=_THREAD_POOL_SIZE),
+        options=_get_server_options(),
+        maximum_concurrent_rpcs=_get_max_concurrent_rpcs())
+    _configure_inferencing_server(inferencing_server, inferencing_port, model_registry)
     inferencing_server.start()
     print(f"Inferencing server listening on port {inferencing_port}")
 
     health_server = grpc.server(futures.ThreadPoolExecutor(max_workers=_THREAD_POOL_SIZE))
-    _configure_health_server(health_server, health_port)
+    _configure_health_server(health_server, health_port, model_registry)
     health_server.start()
     print(f"Health server listening on port {health_port}")
 
+    model_registry.start()
+
     inferencing_server.wait_for_termination()
     health_server.wait_for_termination()
 
 
 if __name__ == "__main__":
     inferencing_port = os.getenv("INFERENCING_PORT", "50051")
-    health_port = os.getenv("INFERENCING_PORT", "50039")
-    serve(inferencing_port, health_port)
+    health_port = os.getenv("HEALTH_PORT", "50039")
+    metrics_port = os.getenv("METRICS_PORT")
+    if _SERVER_MODE == "aio":
+        asyncio.run(serve_aio(inferencing_port, health_port, metrics_port))
+    else:
+        serve(inferencing_port, health_port, metrics_port)
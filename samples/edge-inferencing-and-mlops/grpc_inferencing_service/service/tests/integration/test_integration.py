@@ -24,3 +24,18 @@ class TestFeaturizer:
         assert hasattr(result, 'prediction')
         assert len(result.warnings) == 0
         assert len(result.errors) == 0
+
+    def test_batch_response(self):
+        request = inference_pb2.InferenceBatchRequest(x1=[1, 2, 3], x2=[1, 2, 3])
+        result = self.stub.GetRecommendationBatch(request)
+
+        assert len(result.predictions) == 3
+        assert len(result.warnings) == 0
+        assert len(result.errors) == 0
+
+    def test_stream_response(self):
+        requests = [inference_pb2.InferenceBatchRequest(x1=[1, 2], x2=[1, 2]),
+                    inference_pb2.InferenceBatchRequest(x1=[3], x2=[3])]
+        results = list(self.stub.GetRecommendationStream(iter(requests)))
+
+        assert [len(result.predictions) for result in results] == [2, 1]
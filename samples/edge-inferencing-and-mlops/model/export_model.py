@@ -0,0 +1,36 @@
+import numpy as np
+from sklearn import svm
+
+# Version of the classifier.npz format, read by the SvmClassifier of the inferencing service
+FORMAT_VERSION = 1
+SUPPORTED_KERNELS = ("linear", "rbf", "poly", "sigmoid")
+
+
+def get_model_arrays(clf: svm.SVC) -> dict:
+    # The parameters of a fitted SVC needed to predict, a linear model only needs its weights
+    if clf.kernel not in SUPPORTED_KERNELS:
+        raise ValueError(f"Unsupported kernel {clf.kernel}, supported kernels are {SUPPORTED_KERNELS}")
+
+    arrays = {
+        "format_version": np.array(FORMAT_VERSION),
+        "kernel": np.array(clf.kernel),
+        "classes": clf.classes_,
+        "intercept": clf.intercept_,
+    }
+    if clf.kernel == "linear":
+        arrays["coef"] = clf.coef_
+    else:
+        arrays.update({
+            "support_vectors": clf.support_vectors_,
+            "dual_coef": clf.dual_coef_,
+            "n_support": clf.n_support_,
+            "gamma": np.array(clf._gamma),
+            "coef0": np.array(clf.coef0),
+            "degree": np.array(clf.degree),
+        })
+    return arrays
+
+
+def export_model(clf: svm.SVC, path: str):
+    # Writes the model to an npz file, which the inferencing service loads with NumPy only
+    np.savez(path, **get_model_arrays(clf))
@@ -6,6 +6,7 @@ from sklearn.metrics import accuracy_score
 from sklearn.model_selection import cross_val_score
 
 from dataloader import DataLoader
+from export_model import export_model
 
 # model params
 C = 0.025
@@ -67,6 +68,9 @@ def main():
     model_output = f"{args.output_folder}/classifier.pkl"
     pickle.dump(clf, open(model_output, 'wb'))
 
+    # The inferencing service loads the npz export when present, without importing sklearn
+    export_model(clf, f"{args.output_folder}/classifier.npz")
+
 
 if __name__ == "__main__":
     main()
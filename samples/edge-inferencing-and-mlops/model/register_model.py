@@ -24,6 +24,7 @@ def parse_args():
 
 def copy_req_model_files(data_path, model_path):
     copy2(os.path.join(data_path, "classifier.pkl"), model_path)
+    copy2(os.path.join(data_path, "classifier.npz"), model_path)
 
 
 def main():
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from sklearn import svm
+
+from export_model import FORMAT_VERSION, export_model
+
+features = np.array([[0.0, 0.0], [1.0, 1.0], [0.0, 1.0], [1.0, 0.0], [2.0, 2.0], [-1.0, -1.0]])
+labels = np.array([0, 1, 0, 1, 1, 0])
+
+
+def test_export_linear_model(tmp_path):
+    clf = svm.SVC(kernel="linear", C=0.025).fit(features, labels)
+    export_model(clf, tmp_path / "classifier.npz")
+
+    with np.load(tmp_path / "classifier.npz", allow_pickle=False) as arrays:
+        assert int(arrays["format_version"]) == FORMAT_VERSION
+        assert str(arrays["kernel"]) == "linear"
+        assert "support_vectors" not in arrays
+        # The exported weights give the decisions of the model
+        np.testing.assert_allclose(
+            features @ arrays["coef"].T + arrays["intercept"], clf.decision_function(features)[:, np.newaxis])
+
+
+def test_export_kernel_model(tmp_path):
+    clf = svm.SVC(kernel="rbf").fit(features, labels)
+    export_model(clf, tmp_path / "classifier.npz")
+
+    with np.load(tmp_path / "classifier.npz", allow_pickle=False) as arrays:
+        np.testing.assert_array_equal(arrays["support_vectors"], clf.support_vectors_)
+        assert float(arrays["gamma"]) == clf._gamma
+
+
+def test_export_unsupported_kernel(tmp_path):
+    clf = svm.SVC(kernel="precomputed").fit(features @ features.T, labels)
+
+    with pytest.raises(ValueError):
+        export_model(clf, tmp_path / "classifier.npz")
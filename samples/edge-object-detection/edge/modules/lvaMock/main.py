@@ -1,17 +1,24 @@
 import asyncio
 import json
+import signal
 import sys
-import time
 
 from azure.iot.device import Message, MethodResponse
 from azure.iot.device.aio import IoTHubModuleClient
 
 module_client = None
 
-# Define behavior to keep the application running
+# Define behavior to keep the application running until the module is asked to stop,
+# without blocking the event loop the IoT Hub client relies on
 async def continuous_loop():
-    while True:
-        time.sleep(100)
+    shutdown_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for shutdown_signal in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(shutdown_signal, shutdown_event.set)
+        except NotImplementedError:
+            pass
+    await shutdown_event.wait()
 
 # Define behavior for receiving an input method
 async def method_request_handler(method_request):
@@ -5,33 +5,151 @@ import json
 import asyncio
 import logging
 import re
+import signal
+from collections import deque
 
 from opencensus.ext.azure.log_exporter import AzureLogHandler
 from azure.iot.device import Message
 from azure.iot.device.aio import IoTHubModuleClient
-from datetime import datetime, timedelta
+from datetime import datetime
+from rule_engine import RuleEngine, summarize_frame
+from suppression_store import SuppressionStore
 
 TWIN_CALLBACKS = 0
 OBJECT_TAGS = ['truck']
 OBJECT_CONFIDENCE = 0.5
+# confidence thresholds of single tags, e.g. {"person": 0.8}, overriding OBJECT_CONFIDENCE
+OBJECT_TAG_CONFIDENCE = {}
+# properties overriding the ones above for single graph instances, e.g. {"Gate": {"objectTags": ["person"]}}
+GRAPH_INSTANCE_RULES = {}
 NOTIFICATION_TIMEOUT = '5m'
-EVENT_TIMEOUT_DICT = {}
+DEFAULT_NOTIFICATION_TIMEOUT_SECONDS = 900
 DATETIME_STRING_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+DATETIME_STRING_RE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})T(\d{1,2}):(\d{1,2}):(\d{1,2})\.(\d{1,6})Z$')
 LOG_LEVEL = 'INFO'
+MESSAGE_HANDLER_COUNT = int(os.environ.get('MESSAGE_HANDLER_COUNT', 8))
+MESSAGE_QUEUE_SIZE = int(os.environ.get('MESSAGE_QUEUE_SIZE', 256))
+OUTPUT_BATCH_SIZE = int(os.environ.get('OUTPUT_BATCH_SIZE', 32))
+SUPPRESSION_STORE_SIZE = int(os.environ.get('SUPPRESSION_STORE_SIZE', 100000))
+# the suppressed keys are saved to this file, if set, to be suppressed again after a restart of the module
+SUPPRESSION_STORE_PATH = os.environ.get('SUPPRESSION_STORE_PATH')
+SUPPRESSION_SAVE_INTERVAL = float(os.environ.get('SUPPRESSION_SAVE_INTERVAL', 10))
+# seconds the timeout of a key is kept past its expiry, for the messages of the cameras behind the latest event time
+SUPPRESSION_EVICTION_GRACE = float(os.environ.get('SUPPRESSION_EVICTION_GRACE', 600))
+EPOCH = datetime(1970, 1, 1)
 
 module_client = None
+runtime = None
+rule_engine = None
+suppression_store = SuppressionStore(SUPPRESSION_STORE_SIZE, SUPPRESSION_STORE_PATH, SUPPRESSION_EVICTION_GRACE)
+# the notification timeout string and its value in seconds, parsed again when the twin changes the timeout
+notification_timeout_cache = (None, None)
 logger = logging.getLogger(__name__)
 
-# Define behavior to keep the application running
+# ModuleRuntime handles the input messages with a bounded pool of handler tasks and sends the output
+# messages in batches, all on the event loop of main(), which is never blocked while waiting
+class ModuleRuntime:
+    def __init__(self, client, handler_count=MESSAGE_HANDLER_COUNT, queue_size=MESSAGE_QUEUE_SIZE, output_batch_size=OUTPUT_BATCH_SIZE):
+        self.client = client
+        self.handler_count = handler_count
+        self.queue_size = queue_size
+        self.output_batch_size = output_batch_size
+        self.handled_count = 0
+        self.sent_count = 0
+        # durations in seconds of the latest handled messages
+        self.handler_latencies = deque(maxlen=10000)
+        self.loop = None
+        self.message_queue = None
+        self.output_queue = None
+        self.shutdown_event = None
+        self.tasks = []
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.message_queue = asyncio.Queue(maxsize=self.queue_size)
+        self.output_queue = asyncio.Queue(maxsize=self.queue_size)
+        self.shutdown_event = asyncio.Event()
+        self.tasks = [asyncio.create_task(self.message_worker()) for _ in range(self.handler_count)]
+        self.tasks.append(asyncio.create_task(self.output_sender()))
+
+    async def stop(self):
+        # let the queued messages be handled and sent before stopping
+        await self.message_queue.join()
+        await self.output_queue.join()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    # submit queues an input message, waiting while the queue is full; the IoT Hub client may run
+    # its handlers on another thread and event loop, so the message is put from the runtime loop
+    async def submit(self, message):
+        try:
+            current_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            current_loop = None
+
+        if current_loop is self.loop:
+            await self.message_queue.put(message)
+        else:
+            future = asyncio.run_coroutine_threadsafe(self.message_queue.put(message), self.loop)
+            await asyncio.wrap_future(future)
+
+    async def send_output(self, message, route):
+        await self.output_queue.put((message, route))
+
+    def shutdown(self):
+        self.loop.call_soon_threadsafe(self.shutdown_event.set)
+
+    async def wait_for_shutdown(self):
+        for shutdown_signal in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self.loop.add_signal_handler(shutdown_signal, self.shutdown_event.set)
+            except (NotImplementedError, RuntimeError):
+                # signal handlers are only available on the main thread of unix systems
+                pass
+        await self.shutdown_event.wait()
+
+    async def message_worker(self):
+        while True:
+            message = await self.message_queue.get()
+            start = time.perf_counter()
+            try:
+                await handle_message(message)
+            finally:
+                self.handler_latencies.append(time.perf_counter() - start)
+                self.handled_count += 1
+                self.message_queue.task_done()
+
+    async def output_sender(self):
+        while True:
+            batch = [await self.output_queue.get()]
+            while len(batch) < self.output_batch_size and not self.output_queue.empty():
+                batch.append(self.output_queue.get_nowait())
+
+            # the messages of a batch are sent concurrently over the same connection
+            results = await asyncio.gather(
+                *[self.client.send_message_to_output(message, route) for message, route in batch],
+                return_exceptions=True)
+
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error('Failed to send output message: %s' % result)
+                else:
+                    self.sent_count += 1
+                self.output_queue.task_done()
+
+# Define behavior to keep the application running until the module is asked to stop
 async def continuous_loop():
-    while True:
-        time.sleep(100)
+    await runtime.wait_for_shutdown()
 
 # twin_patch_handler is invoked when the module twin's desired properties are updated
 def twin_patch_handler(patch):
     global TWIN_CALLBACKS
     global OBJECT_TAGS
     global OBJECT_CONFIDENCE
+    global OBJECT_TAG_CONFIDENCE
+    global GRAPH_INSTANCE_RULES
     global NOTIFICATION_TIMEOUT
     global LOG_LEVEL
 
@@ -41,6 +159,10 @@ def twin_patch_handler(patch):
         OBJECT_TAGS = patch['objectTags']
     if 'objectConfidence' in patch:
         OBJECT_CONFIDENCE = patch['objectConfidence']
+    if 'objectTagConfidence' in patch:
+        OBJECT_TAG_CONFIDENCE = patch['objectTagConfidence'] or {}
+    if 'graphInstances' in patch:
+        GRAPH_INSTANCE_RULES = patch['graphInstances'] or {}
     if 'notificationTimeout' in patch:
         NOTIFICATION_TIMEOUT = patch['notificationTimeout']
     if 'logLevel' in patch:
@@ -50,8 +172,25 @@ def twin_patch_handler(patch):
     TWIN_CALLBACKS += 1
     logger.debug('Total calls confirmed: %d\n' % TWIN_CALLBACKS)
 
-# Define behavior for receiving an input message on the 'detectedObjects' route
+# get_rule_engine returns the rules compiled from the current twin properties, they are compiled again
+# on the first frame after a twin patch changes them
+def get_rule_engine():
+    global rule_engine
+
+    if rule_engine is None or not rule_engine.is_compiled_from(OBJECT_TAGS, OBJECT_CONFIDENCE, OBJECT_TAG_CONFIDENCE, GRAPH_INSTANCE_RULES):
+        rule_engine = RuleEngine(OBJECT_TAGS, OBJECT_CONFIDENCE, OBJECT_TAG_CONFIDENCE, GRAPH_INSTANCE_RULES)
+    return rule_engine
+
+# Define behavior for receiving an input message, the message is queued for the handlers
+# when the runtime is started, and handled right away otherwise
 async def message_handler(message):
+    if runtime is not None:
+        await runtime.submit(message)
+    else:
+        await handle_message(message)
+
+# Define behavior for handling an input message on the 'detectedObjects' route
+async def handle_message(message):
     if message.input_name == 'detectedObjects':
         logger.debug('Message received on detectedObjects route')
         await object_detected_handler(message)
@@ -66,38 +205,27 @@ async def object_detected_handler(input_message):
             logger.warning('input_message is None')
             return
 
-        # List to hold inferences with desired tag and confidence level
-        inferences = []
-
         message = input_message.data.decode('utf-8')
         data = json.loads(message)
 
         detected_objects = data['inferences']
         graph_instance = extract_graph_instance_from_subject(input_message.custom_properties['subject'])
 
-        logger.info(f'{graph_instance}: Detected {len(detected_objects)} object(s)')
-
-        for inference in detected_objects:
-            entity = inference['entity']
-            tag = entity['tag']
-            confidence = tag['confidence']
-            detected_object = tag['value']
-
-            event_data = {
-                'detected_object': detected_object,
-                'confidence': confidence,
-                'graph_instance': graph_instance
-            }
+        # All the detections of the frame are evaluated in one pass, and logged in one summary
+        result = get_rule_engine().evaluate(graph_instance, detected_objects)
+        inferences = result.matches
 
-            logger.info(f'{graph_instance}: {detected_object} detected. Confidence: {confidence}', extra={'custom_dimensions': event_data})
-
-            if (detected_object.lower() in OBJECT_TAGS) and (confidence > OBJECT_CONFIDENCE):
-                logger.info(f'>>>>> Match found: {tag} <<<<<')
-                inferences.append(inference)
+        logger.info(
+            f'{graph_instance}: {result.detection_count} object(s) detected, {len(inferences)} match(es)',
+            extra={'custom_dimensions': summarize_frame(graph_instance, result)})
+        if logger.isEnabledFor(logging.DEBUG):
+            for inference in inferences:
+                logger.debug(f'>>>>> Match found: {inference["entity"]["tag"]} <<<<<')
 
         if len(inferences) > 0:
             event_time = input_message.custom_properties['eventTime']
-            should_send_message = check_event_timeout(event_time, input_message.custom_properties['subject'])
+            inferences = filter_suppressed_inferences(inferences, event_time, input_message.custom_properties['subject'])
+            should_send_message = len(inferences) > 0
 
             logger.debug(f'Send message: {should_send_message}')
 
@@ -108,7 +236,10 @@ async def object_detected_handler(input_message):
                     inferences,
                     event_time)
                 output_message_route = 'Event-' + graph_instance
-                await module_client.send_message_to_output(output_message, output_message_route)
+                if runtime is not None:
+                    await runtime.send_output(output_message, output_message_route)
+                else:
+                    await module_client.send_message_to_output(output_message, output_message_route)
 
     except Exception as ex:
         logger.exception('Unexpected error: %s' % ex)
@@ -127,36 +258,75 @@ def extract_graph_instance_from_subject(subject):
     words = subject.split('/')
     return words[2]
 
-# check_event_timeout determines if we should send a message for a given graph instance based on the
+# filter_suppressed_inferences returns the inferences whose tag is not in its notification timeout,
+# each tag of a graph instance has its own timeout
+def filter_suppressed_inferences(inferences, event_time, subject):
+    sent_tags = {}
+    for inference in inferences:
+        detected_object = inference['entity']['tag']['value'].lower()
+        if detected_object not in sent_tags:
+            sent_tags[detected_object] = check_event_timeout(event_time, subject, detected_object)
+    return [inference for inference in inferences if sent_tags[inference['entity']['tag']['value'].lower()]]
+
+# check_event_timeout determines if we should send a message for a given graph instance and tag based on the
 # notification time out value. For example, we may only want to send a message for the same graph instance
-# every 5 minutes to avoid spam messages.
-def check_event_timeout(event_time, subject):
+# and tag every 5 minutes to avoid spam messages.
+def check_event_timeout(event_time, subject, tag):
     graph_instance = extract_graph_instance_from_subject(subject)
-    input_msg_event_time_object = datetime.strptime((event_time), DATETIME_STRING_FORMAT)
-
-    if NOTIFICATION_TIMEOUT == '0' or NOTIFICATION_TIMEOUT == '0s':
-        EVENT_TIMEOUT_DICT[graph_instance] = 0
-        return True
-
-    logger.debug(f'Current input time: {input_msg_event_time_object}')
-
-    if graph_instance in EVENT_TIMEOUT_DICT and input_msg_event_time_object <= EVENT_TIMEOUT_DICT[graph_instance]:
-        logger.debug(f'This message already exists, but it\'s timeout of {NOTIFICATION_TIMEOUT} is still active')
-        return False
-    else:
-        timeout_seconds = time_to_seconds(NOTIFICATION_TIMEOUT)
-
-        if timeout_seconds == -1:
-            timeout_seconds = 900
-            logger.warning('NOTIFICATION_TIMEOUT is not configured correctly, defaulting to 15m')
-
-        EVENT_TIMEOUT_DICT[graph_instance] = input_msg_event_time_object + timedelta(seconds=timeout_seconds)
+    input_msg_event_time = (parse_event_time(event_time) - EPOCH).total_seconds()
+    timeout_seconds = get_notification_timeout_seconds()
 
+    if suppression_store.try_suppress((graph_instance, tag), input_msg_event_time, timeout_seconds):
         logger.debug('Adding this event for the first time or updating to a new timeout')
-        logger.debug(f'New input time: {EVENT_TIMEOUT_DICT[graph_instance]}')
-
         return True
 
+    logger.debug(f'This message already exists, but it\'s timeout of {NOTIFICATION_TIMEOUT} is still active')
+    return False
+
+# get_notification_timeout_seconds returns NOTIFICATION_TIMEOUT in seconds, it is only parsed again after it changes
+def get_notification_timeout_seconds():
+    global notification_timeout_cache
+
+    notification_timeout, timeout_seconds = notification_timeout_cache
+    if notification_timeout != NOTIFICATION_TIMEOUT or timeout_seconds is None:
+        if NOTIFICATION_TIMEOUT == '0' or NOTIFICATION_TIMEOUT == '0s':
+            timeout_seconds = 0
+        else:
+            timeout_seconds = time_to_seconds(NOTIFICATION_TIMEOUT)
+            if timeout_seconds == -1:
+                timeout_seconds = DEFAULT_NOTIFICATION_TIMEOUT_SECONDS
+                logger.warning('NOTIFICATION_TIMEOUT is not configured correctly, defaulting to 15m')
+        notification_timeout_cache = (NOTIFICATION_TIMEOUT, timeout_seconds)
+    return timeout_seconds
+
+# save_suppression_store saves the suppressed keys every SUPPRESSION_SAVE_INTERVAL seconds,
+# the file is written on another thread to keep the event loop free for the messages
+async def save_suppression_store():
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(SUPPRESSION_SAVE_INTERVAL)
+        if not suppression_store.dirty:
+            continue
+        write = loop.run_in_executor(None, suppression_store.write, suppression_store.snapshot())
+        try:
+            await asyncio.shield(write)
+        except asyncio.CancelledError:
+            # the write goes on in its thread, wait for it so that it does not race the save at shutdown
+            await asyncio.wait([write])
+            raise
+        except Exception as ex:
+            logger.error('Failed to save the suppression store: %s' % ex)
+
+# parse_event_time parses an event time in DATETIME_STRING_FORMAT with a precompiled pattern,
+# which is several times faster than datetime.strptime
+def parse_event_time(event_time):
+    match = DATETIME_STRING_RE.match(event_time)
+    if match is None:
+        raise ValueError(f'time data {event_time!r} does not match format {DATETIME_STRING_FORMAT!r}')
+
+    year, month, day, hour, minute, second, fraction = match.groups()
+    return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second), int(fraction.ljust(6, '0')))
+
 # construct_output_message creates the output message we will send to IoT Hub
 def construct_output_message(graph_instance, device_id, inferences, event_time):
     logger.debug("Constructing output message")
@@ -197,6 +367,7 @@ def time_to_seconds(time_string):
 
 async def main():
     global module_client
+    global runtime
 
     logger.setLevel(LOG_LEVEL)
 
@@ -225,7 +396,12 @@ async def main():
 
         logger.info('Starting the object detection business logic module ...')
 
+        suppression_store.load()
+        save_task = asyncio.create_task(save_suppression_store()) if SUPPRESSION_STORE_PATH else None
+
         module_client = IoTHubModuleClient.create_from_edge_environment(websockets=True)
+        runtime = ModuleRuntime(module_client)
+        await runtime.start()
 
         await module_client.connect()
         module_client.on_twin_desired_properties_patch_received = twin_patch_handler
@@ -234,6 +410,16 @@ async def main():
         logger.info('The object detection business logic module is now waiting for messages.')
 
         await continuous_loop()
+
+        logger.info('Stopping the object detection business logic module ...')
+        await runtime.stop()
+        if save_task is not None:
+            save_task.cancel()
+            try:
+                await save_task
+            except asyncio.CancelledError:
+                pass
+        suppression_store.save()
         await module_client.disconnect()
     except Exception as ex:
         logger.exception('Unexpected error: %s' % ex)
@@ -0,0 +1,73 @@
+from collections import namedtuple
+
+# FrameResult is the evaluation of the detections of a frame: the inferences matching the rule,
+# the number of detections, and the count and max confidence of each detected tag
+FrameResult = namedtuple('FrameResult', ['matches', 'detection_count', 'tag_counts', 'max_confidences'])
+
+# DetectionRule is the compiled rule of a graph instance: a detection matches when its lowercased tag
+# is one of the tags and its confidence is above the threshold of the tag
+class DetectionRule:
+    __slots__ = ('tags', 'thresholds')
+
+    def __init__(self, object_tags, object_confidence, tag_confidence=None):
+        thresholds = {tag.lower(): object_confidence for tag in object_tags}
+        thresholds.update({tag.lower(): confidence for tag, confidence in (tag_confidence or {}).items()})
+        self.tags = frozenset(thresholds)
+        self.thresholds = thresholds
+
+    def evaluate(self, inferences):
+        matches = []
+        tag_counts = {}
+        max_confidences = {}
+        thresholds = self.thresholds
+
+        for inference in inferences:
+            tag = inference['entity']['tag']
+            detected_object = tag['value'].lower()
+            confidence = tag['confidence']
+
+            tag_counts[detected_object] = tag_counts.get(detected_object, 0) + 1
+            if confidence > max_confidences.get(detected_object, -1):
+                max_confidences[detected_object] = confidence
+
+            threshold = thresholds.get(detected_object)
+            if threshold is not None and confidence > threshold:
+                matches.append(inference)
+
+        return FrameResult(matches, len(inferences), tag_counts, max_confidences)
+
+# RuleEngine compiles the detection rules of the module twin once, instead of on every frame:
+# the default rule from 'objectTags', 'objectConfidence' and 'objectTagConfidence', and a rule per graph instance
+# of 'graphInstances' whose properties override the default ones, e.g. {"Gate": {"objectConfidence": 0.8}}
+class RuleEngine:
+    def __init__(self, object_tags, object_confidence, tag_confidence=None, graph_instances=None):
+        self.config = (object_tags, object_confidence, tag_confidence, graph_instances)
+        self.default_rule = DetectionRule(object_tags, object_confidence, tag_confidence)
+        self.rules = {}
+        for graph_instance, overrides in (graph_instances or {}).items():
+            self.rules[graph_instance] = DetectionRule(
+                overrides.get('objectTags', object_tags),
+                overrides.get('objectConfidence', object_confidence),
+                overrides.get('objectTagConfidence', tag_confidence))
+
+    # is_compiled_from tells if the engine was compiled from these twin properties, they are compared by identity
+    # as the twin patch handler assigns new objects, which keeps the check cheap enough to run on every frame
+    def is_compiled_from(self, object_tags, object_confidence, tag_confidence=None, graph_instances=None):
+        return all(current is new for current, new in zip(
+            self.config, (object_tags, object_confidence, tag_confidence, graph_instances)))
+
+    def rule_for(self, graph_instance):
+        return self.rules.get(graph_instance, self.default_rule)
+
+    def evaluate(self, graph_instance, inferences):
+        return self.rule_for(graph_instance).evaluate(inferences)
+
+# summarize_frame creates the custom dimensions of the log of a frame, which replaces a log per detection
+def summarize_frame(graph_instance, result):
+    return {
+        'graph_instance': graph_instance,
+        'detection_count': result.detection_count,
+        'match_count': len(result.matches),
+        'detected_objects': ','.join(f'{tag}:{count}' for tag, count in sorted(result.tag_counts.items())),
+        'max_confidence': max(result.max_confidences.values(), default=0),
+    }
@@ -0,0 +1,123 @@
+import os
+import json
+import heapq
+import logging
+
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT_VERSION = 1
+
+# SuppressionStore holds the notification timeouts of the (graph instance, tag) keys, as event times in seconds.
+# A key is suppressed until its expiry, then the next event of the key is sent and suppresses it again.
+# The expired keys are evicted with a heap ordered by expiry, the clock being the latest event time seen
+# by any graph instance. A key is only evicted once the clock is eviction_grace seconds past its expiry,
+# so that a camera whose messages are delayed or whose clock is behind is still suppressed until its own
+# events pass the expiry. At most max_entries keys are kept: past it, the keys closest to their expiry
+# are evicted first.
+# The heap may hold stale expiries of keys suppressed again, they are skipped when popped.
+class SuppressionStore:
+    def __init__(self, max_entries=100000, path=None, eviction_grace=600):
+        self.max_entries = max_entries
+        self.path = path
+        self.eviction_grace = eviction_grace
+        self.expiries = {}
+        self.heap = []
+        self.now = float('-inf')
+        self.evicted_count = 0
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.expiries)
+
+    def __contains__(self, key):
+        return key in self.expiries
+
+    def get(self, key):
+        return self.expiries.get(key)
+
+    # try_suppress returns True when the key is not suppressed at event_time, it is then suppressed for timeout seconds
+    def try_suppress(self, key, event_time, timeout):
+        expiry = self.expiries.get(key)
+        if expiry is not None and event_time <= expiry:
+            return False
+
+        if timeout <= 0:
+            # suppression is disabled
+            if expiry is not None:
+                del self.expiries[key]
+            return True
+
+        if event_time > self.now:
+            self.now = event_time
+        self.suppress_until(key, event_time + timeout)
+        return True
+
+    # suppress_until suppresses the key until the expiry event time, replacing its current expiry
+    def suppress_until(self, key, expiry):
+        self.expiries[key] = expiry
+        heapq.heappush(self.heap, (expiry, key))
+        self.dirty = True
+        self.evict()
+
+    def evict(self):
+        heap = self.heap
+        expiries = self.expiries
+        evict_before = self.now - self.eviction_grace
+        while heap and (heap[0][0] < evict_before or len(expiries) > self.max_entries):
+            expiry, key = heapq.heappop(heap)
+            if expiries.get(key) != expiry:
+                continue
+            del expiries[key]
+            if expiry >= evict_before:
+                self.evicted_count += 1
+
+        # drops the stale expiries when they outnumber the keys, so that the heap stays bounded as well
+        if len(heap) > 2 * max(len(expiries), 1024):
+            self.heap = [(expiry, key) for key, expiry in expiries.items()]
+            heapq.heapify(self.heap)
+
+    def clear(self):
+        self.expiries.clear()
+        self.heap = []
+        self.now = float('-inf')
+        self.dirty = True
+
+    # snapshot returns the content to save, it is cheap enough to run on the event loop, while write is not
+    def snapshot(self):
+        self.dirty = False
+        return {
+            'version': STORE_FORMAT_VERSION,
+            'entries': [[graph_instance, tag, expiry] for (graph_instance, tag), expiry in self.expiries.items()]
+        }
+
+    # write replaces the file at path at once, so that a crash leaves a complete file
+    def write(self, content):
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as store_file:
+            store_file.write(json.dumps(content, separators=(',', ':')))
+        os.replace(temp_path, self.path)
+
+    def save(self):
+        if self.path is not None and self.dirty:
+            self.write(self.snapshot())
+
+    # load reads the keys saved by a previous run of the module, a missing or invalid file leaves the store empty
+    def load(self):
+        if self.path is None or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as store_file:
+                content = json.load(store_file)
+            if content.get('version') != STORE_FORMAT_VERSION:
+                raise ValueError(f'unsupported version {content.get("version")}')
+            for graph_instance, tag, expiry in content['entries']:
+                self.expiries[(graph_instance, tag)] = expiry
+                self.heap.append((expiry, (graph_instance, tag)))
+        except Exception as ex:
+            logger.warning(f'Could not load the suppression store {self.path}: {ex}')
+            self.expiries.clear()
+            self.heap.clear()
+            return
+        heapq.heapify(self.heap)
+        self.evict()
+        self.dirty = False
@@ -0,0 +1,72 @@
+# Benchmark of the notification timeouts of objectDetectionBusinessLogic with many graph instances.
+# It checks the timeout of --events events spread over --graph-instances graph instances and --tags tags,
+# one event every --event-interval-ms of event time, and reports the checks per second, the number of
+# keys kept by the suppression store, and the time to save and load the store.
+#
+# python tests/load-tests/benchmark_suppression_store.py --graph-instances 10000 --events 200000
+# python tests/load-tests/benchmark_suppression_store.py --graph-instances 10000 --max-entries 5000
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+# Import main.py from objectDetectionBusinessLogic edge module
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../modules/objectDetectionBusinessLogic'))
+import main  # noqa: E402
+from suppression_store import SuppressionStore  # noqa: E402
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--graph-instances', type=int, default=10000, help='Number of graph instances sending events')
+    parser.add_argument('--tags', type=int, default=3, help='Number of tags detected by each graph instance')
+    parser.add_argument('--events', type=int, default=200000, help='Number of events')
+    parser.add_argument('--event-interval-ms', type=float, default=1, help='Event time between two events')
+    parser.add_argument('--notification-timeout', type=str, default='1m', help='Notification timeout of the keys')
+    parser.add_argument('--max-entries', type=int, default=main.SUPPRESSION_STORE_SIZE, help='Max number of keys of the store')
+    parser.add_argument('--eviction-grace', type=float, default=main.SUPPRESSION_EVICTION_GRACE, help='Seconds a key is kept past its expiry')
+    return parser.parse_args()
+
+def generate_events(args):
+    start = datetime(2020, 11, 24, 19, 22, 5)
+    tags = [f'tag{index}' for index in range(args.tags)]
+    return [
+        (
+            (start + timedelta(milliseconds=index * args.event_interval_ms)).strftime(main.DATETIME_STRING_FORMAT),
+            f'/graphInstances/camera{random.randrange(args.graph_instances)}/processors/grpcExtension',
+            random.choice(tags)
+        )
+        for index in range(args.events)
+    ]
+
+def main_benchmark():
+    args = get_args()
+    events = generate_events(args)
+    main.NOTIFICATION_TIMEOUT = args.notification_timeout
+    main.suppression_store = SuppressionStore(args.max_entries, os.path.join(tempfile.mkdtemp(), 'suppression.json'), args.eviction_grace)
+
+    start = time.perf_counter()
+    sent_count = sum(main.check_event_timeout(event_time, subject, tag) for event_time, subject, tag in events)
+    elapsed = time.perf_counter() - start
+
+    store = main.suppression_store
+    print(f'{len(events)} events of {args.graph_instances} graph instances in {elapsed:.2f}s: {len(events) / elapsed:.0f} checks/s')
+    print(f'{sent_count} events sent, {len(store)} keys and {len(store.heap)} heap entries kept, {store.evicted_count} keys evicted before their expiry')
+
+    start = time.perf_counter()
+    content = store.snapshot()
+    snapshot_elapsed = time.perf_counter() - start
+    store.write(content)
+    save_elapsed = time.perf_counter() - start
+    loaded_store = SuppressionStore(args.max_entries, store.path, args.eviction_grace)
+    start = time.perf_counter()
+    loaded_store.load()
+    load_elapsed = time.perf_counter() - start
+    print(f'save {save_elapsed * 1000:.1f}ms of which {snapshot_elapsed * 1000:.1f}ms on the event loop, '
+          f'load {load_elapsed * 1000:.1f}ms, {os.path.getsize(store.path) / 1024:.0f}KB')
+
+
+if __name__ == '__main__':
+    main_benchmark()
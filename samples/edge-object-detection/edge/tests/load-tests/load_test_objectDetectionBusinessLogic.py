@@ -0,0 +1,109 @@
+# Load test of the objectDetectionBusinessLogic message handling. A fake module client replaces
+# IoT Hub, it takes --send-latency-ms to send each output message. The messages are submitted
+# from separate threads, as the IoT Hub client does, and the script reports messages/s and the
+# handler latency percentiles.
+#
+# python tests/load-tests/load_test_objectDetectionBusinessLogic.py --messages 20000 --handler-count 8
+# python tests/load-tests/load_test_objectDetectionBusinessLogic.py --messages 20000 --inline
+import os
+import sys
+import time
+import asyncio
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# Import main.py from objectDetectionBusinessLogic edge module
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../modules/objectDetectionBusinessLogic'))
+import main  # noqa: E402
+
+# Import message helper from tests/
+sys.path.append(os.path.join(os.path.dirname(__file__), '../'))
+from iotHubMessageHelper import GenerateDetectedObjectsMessage, DATETIME_STRING_FORMAT  # noqa: E402
+
+class FakeModuleClient():
+    """Counts the output messages, each one takes send_latency seconds to send"""
+
+    def __init__(self, send_latency):
+        self.send_latency = send_latency
+        self.sent_count = 0
+
+    async def send_message_to_output(self, message, output_name):
+        await asyncio.sleep(self.send_latency)
+        self.sent_count += 1
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=10000, help='Number of input messages')
+    parser.add_argument('--graph-instances', type=int, default=50, help='Number of graph instances sending messages')
+    parser.add_argument('--producers', type=int, default=2, help='Number of threads submitting messages')
+    parser.add_argument('--handler-count', type=int, default=main.MESSAGE_HANDLER_COUNT, help='Number of message handlers')
+    parser.add_argument('--queue-size', type=int, default=main.MESSAGE_QUEUE_SIZE, help='Size of the message and output queues')
+    parser.add_argument('--output-batch-size', type=int, default=main.OUTPUT_BATCH_SIZE, help='Max number of output messages sent at once')
+    parser.add_argument('--send-latency-ms', type=float, default=5, help='Time to send an output message')
+    parser.add_argument('--notification-timeout', type=str, default='1s', help='Notification timeout of the graph instances')
+    parser.add_argument('--log-level', type=str, default='WARNING', help='Log level of the module')
+    parser.add_argument('--inline', action='store_true', help='Handle the messages on the producer threads, without the runtime')
+    return parser.parse_args()
+
+def generate_messages(count, graph_instances):
+    start = datetime(2020, 11, 24, 19, 22, 5)
+    messages = []
+    for i in range(count):
+        event_time = (start + timedelta(milliseconds=100 * i)).strftime(DATETIME_STRING_FORMAT)
+        message = GenerateDetectedObjectsMessage('detectedObjects', 'truck', 0.9, event_time)
+        message.custom_properties['subject'] = f'/graphInstances/Camera{i % graph_instances}/processors/grpcExtension'
+        messages.append(message)
+    return messages
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+def submit_messages(messages):
+    # every producer thread runs its own event loop, like the IoT Hub client handler thread
+    async def submit():
+        for message in messages:
+            start = time.perf_counter()
+            await main.message_handler(message)
+            if main.runtime is None:
+                inline_latencies.append(time.perf_counter() - start)
+
+    inline_latencies = []
+    asyncio.run(submit())
+    return inline_latencies
+
+async def run_load_test(args):
+    client = FakeModuleClient(args.send_latency_ms / 1000)
+    main.module_client = client
+    main.NOTIFICATION_TIMEOUT = args.notification_timeout
+    main.logger.setLevel(args.log_level)
+    main.suppression_store.clear()
+
+    messages = generate_messages(args.messages, args.graph_instances)
+    chunks = [messages[i::args.producers] for i in range(args.producers)]
+
+    if not args.inline:
+        main.runtime = main.ModuleRuntime(client, args.handler_count, args.queue_size, args.output_batch_size)
+        await main.runtime.start()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.producers) as executor:
+        results = await asyncio.gather(*[
+            asyncio.get_running_loop().run_in_executor(executor, submit_messages, chunk) for chunk in chunks])
+    if main.runtime is not None:
+        await main.runtime.stop()
+        latencies = list(main.runtime.handler_latencies)
+    else:
+        latencies = [latency for result in results for latency in result]
+    elapsed = time.perf_counter() - start
+
+    mode = 'inline' if args.inline else f'runtime with {args.handler_count} handlers'
+    print(f'{args.messages} messages in {elapsed:.2f}s ({mode}), {client.sent_count} output messages sent')
+    print(f'throughput: {args.messages / elapsed:.0f} messages/s')
+    print(f'handler latency: p50 {percentile(latencies, 50) * 1000:.3f}ms, p99 {percentile(latencies, 99) * 1000:.3f}ms')
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    asyncio.run(run_load_test(get_args()))
@@ -1,5 +1,6 @@
 import os
 import sys
+import time
 
 import json
 import pytest
@@ -9,11 +10,23 @@ import logging
 from testfixtures import LogCapture
 from unittest import TestCase
 from unittest.mock import patch, Mock
-from datetime import datetime, timedelta
+from datetime import datetime
 
 # Import main.py from objectDetectionBusinessLogic edge module
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../modules/objectDetectionBusinessLogic'))
 import main
+from rule_engine import RuleEngine, summarize_frame
+from suppression_store import SuppressionStore
+
+def event_seconds(event_time):
+    return (datetime.strptime(event_time, '%Y-%m-%dT%H:%M:%S.%fZ') - datetime(1970, 1, 1)).total_seconds()
+
+def create_store(expiries):
+    store = SuppressionStore()
+    for key, expiry in expiries.items():
+        store.suppress_until(key, expiry)
+    return store
+
 
 # Import message helper from tests/
 sys.path.append(os.path.join(os.path.dirname(__file__), '../'))
@@ -48,6 +61,8 @@ class TestTwinPatchHandlerFunction(TestCase):
         main.TWIN_CALLBACKS = 0
         main.OBJECT_TAGS = []
         main.OBJECT_CONFIDENCE = 0
+        main.OBJECT_TAG_CONFIDENCE = {}
+        main.GRAPH_INSTANCE_RULES = {}
         main.NOTIFICATION_TIMEOUT = ''
 
     def tearDown(self):
@@ -55,6 +70,8 @@ class TestTwinPatchHandlerFunction(TestCase):
         main.TWIN_CALLBACKS = 0
         main.OBJECT_TAGS = ['truck']
         main.OBJECT_CONFIDENCE = 0.5
+        main.OBJECT_TAG_CONFIDENCE = {}
+        main.GRAPH_INSTANCE_RULES = {}
         main.NOTIFICATION_TIMEOUT = '2m'
 
     def test_message_handler_twin_patch_handler_objectTags(self):
@@ -69,6 +86,18 @@ class TestTwinPatchHandlerFunction(TestCase):
         assert main.OBJECT_CONFIDENCE == 0.3
         assert main.TWIN_CALLBACKS == 1
 
+    def test_message_handler_twin_patch_handler_objectTagConfidence(self):
+        main.twin_patch_handler({"objectTagConfidence": {"person": 0.8}})
+
+        assert main.OBJECT_TAG_CONFIDENCE == {"person": 0.8}
+        assert main.TWIN_CALLBACKS == 1
+
+    def test_message_handler_twin_patch_handler_graphInstances(self):
+        main.twin_patch_handler({"graphInstances": {"Gate": {"objectTags": ["person"]}}})
+
+        assert main.GRAPH_INSTANCE_RULES == {"Gate": {"objectTags": ["person"]}}
+        assert main.TWIN_CALLBACKS == 1
+
     def test_message_handler_twin_patch_handler_notificationTimeout(self):
         main.twin_patch_handler({"notificationTimeout": "23s"})
 
@@ -106,24 +135,26 @@ class TestObjectDetectedHandlerFunction():
     ])
     def test_object_detected_handler_invalid_values_throws_exception(self, input_message, event_dict, timeout):
         with(patch('main.NOTIFICATION_TIMEOUT', timeout)):
-            with(patch('main.EVENT_TIMEOUT_DICT', event_dict)):
+            with(patch('main.suppression_store', create_store(event_dict))):
                 with pytest.raises(Exception):
                     loop = asyncio.run()
                     loop.run_until_complete(main.object_detected_handler(input_message))
 
     @pytest.mark.parametrize('event_dict,timeout,expected_call_count,expected_time,confidence,tag', [
         ({}, '1s', 1, '2020-11-24T19:22:06.912000Z', 0.7, 'truck'),
-        ({'Truck': datetime.strptime(('2020-11-24T19:22:05.912Z'), '%Y-%m-%dT%H:%M:%S.%fZ')}, '1s', 0, '2020-11-24T19:22:05.912000Z', 0.8, 'truck'),
-        ({}, '1s', 0, '2020-11-24T19:22:05.912000Z', 0.1, 'truck'),
-        ({}, '1s', 0, '2020-11-24T19:22:06.912000Z', 0.9, 'apple')
+        ({('Truck', 'truck'): event_seconds('2020-11-24T19:22:05.912Z')}, '1s', 0, '2020-11-24T19:22:05.912000Z', 0.8, 'truck'),
+        ({('Truck', 'person'): event_seconds('2020-11-24T19:22:05.912Z')}, '1s', 1, '2020-11-24T19:22:06.912000Z', 0.8, 'truck'),
+        ({}, '1s', 0, None, 0.1, 'truck'),
+        ({}, '1s', 0, None, 0.9, 'apple')
     ])
     def test_object_detected_handler(self, event_dict, timeout, expected_call_count, expected_time, confidence, tag):
         mock = Mock()
         mock.send_message_to_output.return_value = True
+        store = create_store(event_dict)
 
         with LogCapture() as logs:
             with(patch('main.NOTIFICATION_TIMEOUT', timeout)):
-                with(patch('main.EVENT_TIMEOUT_DICT', event_dict)):
+                with(patch('main.suppression_store', store)):
                     with (patch('main.module_client', mock)):
                         sample_message = GenerateDetectedObjectsMessage('detectedObjects', tag, confidence)
                         loop = asyncio.get_event_loop()
@@ -131,15 +162,70 @@ class TestObjectDetectedHandlerFunction():
 
                         assert mock.send_message_to_output.call_count == expected_call_count
 
-                        if 'Truck' in main.EVENT_TIMEOUT_DICT:
-                            assert main.EVENT_TIMEOUT_DICT['Truck'].strftime('%Y-%m-%dT%H:%M:%S.%fZ') == expected_time
+                        if expected_time is not None:
+                            assert store.get(('Truck', 'truck')) == pytest.approx(event_seconds(expected_time))
+                        else:
+                            assert ('Truck', 'truck') not in store
 
+        # a single summary log for all the detections of the frame
         events = [r.custom_dimensions for r in logs.records if 'detected' in r.msg]
         assert len(events) == 1
-        assert events[0]['detected_object'] == tag
-        assert events[0]['confidence'] == confidence
+        assert events[0]['detected_objects'] == f'{tag}:1'
+        assert events[0]['detection_count'] == 1
+        assert events[0]['max_confidence'] == confidence
         assert events[0]['graph_instance'] == 'Truck'
 
+def inference(tag, confidence):
+    return {'type': 'entity', 'entity': {'tag': {'value': tag, 'confidence': confidence}}}
+
+class TestRuleEngine():
+    """Unit tests for the rule engine of the detections"""
+
+    def test_evaluate_frame_in_one_pass(self):
+        engine = RuleEngine(['truck', 'Person'], 0.5)
+        frame = [inference('Truck', 0.7), inference('truck', 0.4), inference('person', 0.9), inference('car', 0.99)]
+
+        result = engine.evaluate('Truck', frame)
+
+        assert result.matches == [frame[0], frame[2]]
+        assert result.detection_count == 4
+        assert result.tag_counts == {'truck': 2, 'person': 1, 'car': 1}
+        assert result.max_confidences['truck'] == 0.7
+
+    def test_evaluate_per_tag_confidence(self):
+        engine = RuleEngine(['truck'], 0.5, {'person': 0.8, 'truck': 0.3})
+        frame = [inference('truck', 0.4), inference('person', 0.7), inference('person', 0.85)]
+
+        assert engine.evaluate('Truck', frame).matches == [frame[0], frame[2]]
+
+    def test_evaluate_per_graph_instance_rules(self):
+        engine = RuleEngine(['truck'], 0.5, graph_instances={'Gate': {'objectTags': ['person'], 'objectConfidence': 0.8}})
+        frame = [inference('truck', 0.9), inference('person', 0.7), inference('person', 0.9)]
+
+        assert engine.evaluate('Truck', frame).matches == [frame[0]]
+        assert engine.evaluate('Gate', frame).matches == [frame[2]]
+
+    def test_get_rule_engine_compiles_after_twin_patch(self):
+        with patch('main.OBJECT_TAGS', ['truck']), patch('main.OBJECT_CONFIDENCE', 0.5):
+            engine = main.get_rule_engine()
+            assert main.get_rule_engine() is engine
+
+            main.twin_patch_handler({'objectTags': ['apple']})
+
+            assert main.get_rule_engine() is not engine
+            assert main.get_rule_engine().default_rule.tags == frozenset(['apple'])
+
+    def test_summarize_frame(self):
+        result = RuleEngine(['truck'], 0.5).evaluate('Truck', [inference('truck', 0.7), inference('car', 0.9), inference('truck', 0.6)])
+
+        assert summarize_frame('Truck', result) == {
+            'graph_instance': 'Truck',
+            'detection_count': 3,
+            'match_count': 2,
+            'detected_objects': 'car:1,truck:2',
+            'max_confidence': 0.9,
+        }
+
 class TestTimeToSecondsFunction():
     """Unit tests for time_to_seconds function"""
 
@@ -176,27 +262,29 @@ class TestCheckEventTimeoutFunction():
     ])
     def test_check_event_timeout_invalid_values_throws_exception(self, event_time, subject, event_dict, timeout):
         with(patch('main.NOTIFICATION_TIMEOUT', timeout)):
-            with(patch('main.EVENT_TIMEOUT_DICT', event_dict)):
+            with(patch('main.suppression_store', create_store(event_dict))):
                 with pytest.raises(Exception):
-                    main.check_event_timeout(event_time, subject)
+                    main.check_event_timeout(event_time, subject, 'truck')
 
     @pytest.mark.parametrize('event_time,subject,event_dict,timeout,expected', [
         ('2020-11-24T10:00:00.00Z', '/graphInstances/Truck', {}, '1s', True),
         ('2020-11-24T10:00:00.00Z', '/graphInstances/Truck', {}, '1m', True),
         ('2020-11-24T10:00:00.00Z', '/graphInstances/Truck', {}, '1h', True),
-        ('2020-11-24T10:00:00.00Z', '/graphInstances/Truck', {'Truck': datetime(2020, 11, 23, 10)}, '1m', True),
-        ('2020-11-24T10:00:00.00Z', '/graphInstances/Truck', {'Truck': datetime(2020, 11, 25, 10)}, '1m', False)
+        ('2020-11-24T10:00:00.00Z', '/graphInstances/Truck', {('Truck', 'truck'): event_seconds('2020-11-23T10:00:00.00Z')}, '1m', True),
+        ('2020-11-24T10:00:00.00Z', '/graphInstances/Truck', {('Truck', 'truck'): event_seconds('2020-11-25T10:00:00.00Z')}, '1m', False),
+        ('2020-11-24T10:00:00.00Z', '/graphInstances/Truck', {('Truck', 'person'): event_seconds('2020-11-25T10:00:00.00Z')}, '1m', True),
+        ('2020-11-24T10:00:00.00Z', '/graphInstances/Truck', {('Gate', 'truck'): event_seconds('2020-11-25T10:00:00.00Z')}, '1m', True)
     ])
     def test_check_event_timeout(self, event_time, subject, event_dict, timeout, expected):
+        store = create_store(event_dict)
         with(patch('main.NOTIFICATION_TIMEOUT', timeout)):
-            with(patch('main.EVENT_TIMEOUT_DICT', event_dict)):
-                result = main.check_event_timeout(event_time, subject)
+            with(patch('main.suppression_store', store)):
+                result = main.check_event_timeout(event_time, subject, 'truck')
 
-                # if True, then we are expecting a change to EVENT_TIMEOUT_DICT
+                # if True, then we are expecting a new timeout of the graph instance and tag
                 if expected:
-                    event_time_obj = datetime.strptime((event_time), "%Y-%m-%dT%H:%M:%S.%fZ")
-                    expected_time = event_time_obj + timedelta(seconds=main.time_to_seconds(timeout))
-                    assert main.EVENT_TIMEOUT_DICT['Truck'] == expected_time
+                    expected_time = event_seconds(event_time) + main.time_to_seconds(timeout)
+                    assert store.get(('Truck', 'truck')) == expected_time
 
         assert result == expected
 
@@ -206,17 +294,17 @@ class TestCheckEventTimeoutFunction():
         ('2020-11-24T10:00:00.00Z', '/graphInstances/Truck', {}, 'words', True)
     ])
     def test_check_event_timeout_default_timeout(self, event_time, subject, event_dict, timeout, expected):
+        store = create_store(event_dict)
         with(patch('main.NOTIFICATION_TIMEOUT', timeout)):
-            with(patch('main.EVENT_TIMEOUT_DICT', event_dict)):
-                result = main.check_event_timeout(event_time, subject)
+            with(patch('main.suppression_store', store)):
+                result = main.check_event_timeout(event_time, subject, 'truck')
 
-                # if True, then we are expecting a change to EVENT_TIMEOUT_DICT
+                # if True, then we are expecting a new timeout of the graph instance and tag
                 if expected:
                     timeout = '15m'  # our default timout is 15 minutes
 
-                    event_time_obj = datetime.strptime((event_time), "%Y-%m-%dT%H:%M:%S.%fZ")
-                    expected_time = event_time_obj + timedelta(seconds=main.time_to_seconds(timeout))
-                    assert main.EVENT_TIMEOUT_DICT['Truck'] == expected_time
+                    expected_time = event_seconds(event_time) + main.time_to_seconds(timeout)
+                    assert store.get(('Truck', 'truck')) == expected_time
 
         assert result == expected
 
@@ -225,11 +313,108 @@ class TestCheckEventTimeoutFunction():
         ('2020-11-24T10:00:00.00Z', '/graphInstances/Truck', {}, '0s', True),
     ])
     def test_check_event_timeout_disable_feature(self, event_time, subject, event_dict, timeout, expected):
+        store = create_store(event_dict)
         with(patch('main.NOTIFICATION_TIMEOUT', timeout)):
-            with(patch('main.EVENT_TIMEOUT_DICT', event_dict)):
-                result = main.check_event_timeout(event_time, subject)
-                assert main.EVENT_TIMEOUT_DICT['Truck'] == 0
-        assert result == expected
+            with(patch('main.suppression_store', store)):
+                assert main.check_event_timeout(event_time, subject, 'truck') == expected
+                assert main.check_event_timeout(event_time, subject, 'truck') == expected
+                assert len(store) == 0
+
+    def test_notification_timeout_is_parsed_once(self):
+        with patch('main.NOTIFICATION_TIMEOUT', '2m'), patch('main.time_to_seconds', return_value=120) as time_to_seconds:
+            assert main.get_notification_timeout_seconds() == 120
+            assert main.get_notification_timeout_seconds() == 120
+            assert time_to_seconds.call_count == 1
+
+            main.twin_patch_handler({'notificationTimeout': '3m'})
+            main.get_notification_timeout_seconds()
+
+            assert time_to_seconds.call_count == 2
+
+class TestSuppressionStore():
+    """Unit tests for SuppressionStore class"""
+
+    def test_try_suppress(self):
+        store = SuppressionStore()
+
+        assert store.try_suppress(('Truck', 'truck'), 100, 60)
+        assert not store.try_suppress(('Truck', 'truck'), 160, 60)
+        assert store.try_suppress(('Truck', 'person'), 160, 60)
+        assert store.try_suppress(('Truck', 'truck'), 161, 60)
+        assert store.get(('Truck', 'truck')) == 221
+
+    def test_expired_keys_are_evicted(self):
+        store = SuppressionStore(eviction_grace=20)
+        for graph_instance in range(100):
+            store.try_suppress((str(graph_instance), 'truck'), graph_instance, 10)
+
+        # the clock is the latest event time, 99, so the keys expiring more than 20s before it are evicted
+        assert len(store) == 31
+        assert store.evicted_count == 0
+
+    def test_delayed_key_is_suppressed_within_grace(self):
+        store = SuppressionStore(eviction_grace=100)
+
+        assert store.try_suppress(('A', 't'), 0, 100)
+        # a later event of another camera moves the clock past the expiry of ('A', 't')
+        assert store.try_suppress(('B', 't'), 150, 100)
+        assert not store.try_suppress(('A', 't'), 50, 100)
+        assert store.try_suppress(('C', 't'), 250, 100)
+        assert ('A', 't') not in store
+
+    def test_save_task_waits_for_write_when_cancelled(self, tmp_path):
+        store = SuppressionStore(path=str(tmp_path / 'suppression.json'))
+        store.try_suppress(('Truck', 'truck'), 100, 60)
+        writes = []
+
+        def write(content):
+            time.sleep(0.1)
+            writes.append(content)
+
+        async def run():
+            save_task = asyncio.create_task(main.save_suppression_store())
+            await asyncio.sleep(0.05)
+            save_task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await save_task
+            return len(writes)
+
+        with patch.object(main, 'suppression_store', store), \
+                patch.object(main, 'SUPPRESSION_SAVE_INTERVAL', 0.01), \
+                patch.object(store, 'write', side_effect=write):
+            assert asyncio.run(run()) == 1
+
+    def test_store_is_bounded(self):
+        store = SuppressionStore(max_entries=10)
+        for graph_instance in range(100):
+            store.try_suppress((str(graph_instance), 'truck'), 0, 1000 + graph_instance)
+
+        assert len(store) == 10
+        assert len(store.heap) <= 2 * 1024
+        assert store.evicted_count == 90
+        # the keys closest to their expiry are evicted first
+        assert ('99', 'truck') in store and ('0', 'truck') not in store
+
+    def test_save_and_load(self, tmp_path):
+        path = str(tmp_path / 'suppression.json')
+        store = SuppressionStore(path=path)
+        store.try_suppress(('Truck', 'truck'), 100, 60)
+        store.save()
+
+        loaded_store = SuppressionStore(path=path)
+        loaded_store.load()
+
+        assert loaded_store.get(('Truck', 'truck')) == 160
+        assert not loaded_store.try_suppress(('Truck', 'truck'), 150, 60)
+
+    def test_load_invalid_file(self, tmp_path):
+        path = tmp_path / 'suppression.json'
+        path.write_text('{"version": 1, "entries": [["Truck"]]}')
+        store = SuppressionStore(path=str(path))
+
+        store.load()
+
+        assert len(store) == 0
 
 class TestExtractInstanceFromSubjectFunction():
     """Unit tests for extract_graph_instance_from_subject function"""
@@ -308,3 +493,86 @@ class TestConstructOutputMessage():
         assert data['graphInstance'] == graph_instance
         assert data['deviceId'] == device_id
         assert data['inferences'][0]['entity']['tag']['confidence'] == expected_confidence
+
+class TestParseEventTimeFunction():
+    """Unit tests for parse_event_time function"""
+
+    @pytest.mark.parametrize('event_time', [
+        '2020-11-24T19:22:05.912Z',
+        '2020-11-24T10:00:00.00Z',
+        '2020-01-02T03:04:05.123456Z'
+    ])
+    def test_parse_event_time_matches_strptime(self, event_time):
+        result = main.parse_event_time(event_time)
+        assert result == datetime.strptime(event_time, main.DATETIME_STRING_FORMAT)
+
+    @pytest.mark.parametrize('event_time', [
+        '2020-11-24',
+        '2020-11-24T10:00:00Z',
+        '2020-11-24T10:00:00.1234567Z',
+        '2020-13-24T10:00:00.00Z'
+    ])
+    def test_parse_event_time_invalid_values_throws_exception(self, event_time):
+        with pytest.raises(ValueError):
+            main.parse_event_time(event_time)
+
+class FakeModuleClient():
+    """Records the output messages instead of sending them to IoT Hub"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_message_to_output(self, message, output_name):
+        await asyncio.sleep(0)
+        self.sent.append((message, output_name))
+
+class TestModuleRuntime():
+    """Unit tests for ModuleRuntime class"""
+
+    def setup_method(self):
+        main.suppression_store.clear()
+
+    def teardown_method(self):
+        main.suppression_store.clear()
+
+    def run_messages(self, messages, submit_from_thread=False):
+        client = FakeModuleClient()
+
+        async def run():
+            runtime = main.ModuleRuntime(client, handler_count=2, queue_size=2, output_batch_size=4)
+            await runtime.start()
+            with patch('main.runtime', runtime):
+                if submit_from_thread:
+                    # the IoT Hub client runs the handlers on its own thread and event loop
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, lambda: [asyncio.run(main.message_handler(message)) for message in messages])
+                else:
+                    for message in messages:
+                        await main.message_handler(message)
+                await runtime.stop()
+            return runtime
+
+        with patch('main.NOTIFICATION_TIMEOUT', '0'):
+            runtime = asyncio.run(run())
+        return runtime, client
+
+    @pytest.mark.parametrize('submit_from_thread', [False, True])
+    def test_runtime_handles_messages_and_sends_outputs(self, submit_from_thread):
+        messages = [GenerateDetectedObjectsMessage('detectedObjects', tag, 0.9) for tag in ['truck', 'apple', 'truck']]
+
+        runtime, client = self.run_messages(messages, submit_from_thread)
+
+        assert runtime.handled_count == 3
+        assert len(runtime.handler_latencies) == 3
+        assert runtime.sent_count == 2
+        assert [route for _, route in client.sent] == ['Event-Truck', 'Event-Truck']
+
+    def test_runtime_wait_for_shutdown_returns_after_shutdown(self):
+        async def run():
+            runtime = main.ModuleRuntime(FakeModuleClient())
+            await runtime.start()
+            asyncio.get_running_loop().call_later(0.01, runtime.shutdown)
+            await asyncio.wait_for(runtime.wait_for_shutdown(), timeout=5)
+            await runtime.stop()
+
+        asyncio.run(run())
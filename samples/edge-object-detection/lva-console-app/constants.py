@@ -5,3 +5,15 @@ tag_value = "TAG_VALUE"
 module_id = "MODULE_ID"
 iot_connection_string = "IOTHUB_CONNECTION_STRING"
 operations_file = "OPERATIONS_FILENAME"
+fan_out_parallelism = "FAN_OUT_PARALLELISM"
+method_max_attempts = "METHOD_MAX_ATTEMPTS"
+method_response_timeout = "METHOD_RESPONSE_TIMEOUT"
+device_list_ttl = "DEVICE_LIST_TTL"
+device_page_size = "DEVICE_PAGE_SIZE"
+report_filename = "REPORT_FILENAME"
+
+default_fan_out_parallelism = 16
+default_method_max_attempts = 3
+default_method_response_timeout = 30
+default_device_list_ttl = 300
+default_device_page_size = 100
@@ -0,0 +1,83 @@
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# statuses of the failed direct method calls worth retrying: the module has not yet initialized (404),
+# the device did not respond in time (504), or IoT Hub throttled (429) or failed the call (5xx)
+RETRY_STATUS_CODES = {404, 408, 429, 500, 502, 503, 504}
+
+# DeviceResult is the outcome of a direct method call on a device: the status returned by the module or,
+# when the call failed, the HTTP status of the failure, with the attempts and the latency including the retries
+DeviceResult = namedtuple('DeviceResult', ['device_id', 'status', 'attempts', 'latency', 'payload', 'error'])
+
+
+def succeeded(result):
+    return result.error is None and 200 <= result.status < 300
+
+
+def get_status_code(ex):
+    response = getattr(ex, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+# FanOutExecutor calls a direct method on many devices at once, at most parallelism calls at a time,
+# retrying each call up to max_attempts times with an exponential backoff
+class FanOutExecutor:
+    def __init__(self, parallelism=16, max_attempts=3, retry_backoff=1.0):
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.executor = ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix='fan-out')
+
+    def call(self, invoke, device_id):
+        start = time.perf_counter()
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                resp = invoke(device_id)
+                return DeviceResult(device_id, resp.status, attempt, time.perf_counter() - start, resp.payload, None)
+            except Exception as ex:
+                status_code = get_status_code(ex)
+                # connection errors have no status and are retried as well
+                if attempt == self.max_attempts or (status_code is not None and status_code not in RETRY_STATUS_CODES):
+                    return DeviceResult(device_id, status_code, attempt, time.perf_counter() - start, None, str(ex))
+            time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+    # map calls invoke(device_id) for each device and returns the results in the order of device_ids,
+    # on_result is called in the calling thread with each result as soon as it completes
+    def map(self, invoke, device_ids, on_result=None):
+        futures = {self.executor.submit(self.call, invoke, device_id): index for index, device_id in enumerate(device_ids)}
+        results = [None] * len(futures)
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if on_result is not None:
+                on_result(result)
+        return results
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+
+# summarize returns the report of a fan-out: the count of succeeded and failed calls and the latencies
+def summarize(method_name, results, elapsed):
+    latencies = sorted(result.latency for result in results)
+    failed = [result for result in results if not succeeded(result)]
+    return {
+        'method_name': method_name,
+        'device_count': len(results),
+        'succeeded_count': len(results) - len(failed),
+        'failed_count': len(failed),
+        'failed_devices': [result.device_id for result in failed],
+        'elapsed': round(elapsed, 3),
+        'latency_p50': round(latencies[len(latencies) // 2], 3) if latencies else 0,
+        'latency_max': round(latencies[-1], 3) if latencies else 0,
+        'devices': [
+            {
+                'device_id': result.device_id,
+                'status': result.status,
+                'attempts': result.attempts,
+                'latency': round(result.latency, 3),
+                'error': result.error
+            }
+            for result in results
+        ]
+    }
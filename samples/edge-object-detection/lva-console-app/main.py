@@ -3,6 +3,7 @@ from pathlib import Path
 from ssl import _create_unverified_context
 from urllib import request
 from builtins import input
+from time import monotonic, perf_counter
 
 from dotenv import load_dotenv
 from azure.iot.hub import IoTHubRegistryManager
@@ -10,6 +11,7 @@ from azure.iot.hub.models import CloudToDeviceMethod, QuerySpecification
 
 import json
 import constants
+from fan_out import FanOutExecutor, summarize
 
 load_dotenv()
 
@@ -27,17 +29,39 @@ class GraphManager:
         self.tag_value = getenv(constants.tag_value)
         self.module_id = getenv(constants.module_id)
         self.api_version = constants.topology_api_version
+        self.response_timeout = int(getenv(constants.method_response_timeout, constants.default_method_response_timeout))
+        self.device_list_ttl = float(getenv(constants.device_list_ttl, constants.default_device_list_ttl))
+        self.device_page_size = int(getenv(constants.device_page_size, constants.default_device_page_size))
+        self.report = []
 
         self.registry_manager = IoTHubRegistryManager(getenv(constants.iot_connection_string))
+        self.fan_out = FanOutExecutor(
+            int(getenv(constants.fan_out_parallelism, constants.default_fan_out_parallelism)),
+            int(getenv(constants.method_max_attempts, constants.default_method_max_attempts)))
 
-        if self.device_id is None:
-            self.device_list = self.get_device_list()
+        self.device_list = None
+        self.device_list_time = None
 
+    # get_device_list returns the ids of the devices with the tag, cached for DEVICE_LIST_TTL seconds
+    # so that the operations of a run do not query the device twins again
     def get_device_list(self):
-        query_string = f"SELECT * FROM devices WHERE tags.{self.device_tag} = '{self.tag_value}'"
+        if self.device_list is None or monotonic() - self.device_list_time > self.device_list_ttl:
+            self.device_list = self.query_device_list()
+            self.device_list_time = monotonic()
+        return self.device_list
+
+    def query_device_list(self):
+        # only the device ids are needed, not the whole twins
+        query_string = f"SELECT deviceId FROM devices WHERE tags.{self.device_tag} = '{self.tag_value}'"
         query_spec = QuerySpecification(query=query_string)
-        response = self.registry_manager.query_iot_hub(query_spec, None, None)
-        return response.items
+        device_list = []
+        continuation_token = None
+        while True:
+            response = self.registry_manager.query_iot_hub(query_spec, continuation_token, self.device_page_size)
+            device_list.extend(twin.device_id for twin in response.items)
+            continuation_token = response.continuation_token
+            if not continuation_token:
+                return device_list
 
     def invoke(self, method_name, payload):
         if method_name == 'GraphTopologySet':
@@ -58,33 +82,42 @@ class GraphManager:
         module_method = CloudToDeviceMethod(
             method_name=method_name,
             payload=payload,
-            response_timeout_in_seconds=30)
-
-        device_id = self.device_id
-        try:
-            if device_id is None:
-                for device in self.device_list:
-                    device_id = device.device_id
-                    self.invoke_device_module_method(device_id, method_name, module_method, payload)
-            else:
-                self.invoke_device_module_method(device_id, method_name, module_method, payload)
+            response_timeout_in_seconds=self.response_timeout)
 
-        except Exception as ex:
-            if ex.response.status_code == 404:
-                print(">>>>>>>>>> Warning: device '%s' does not have the '%s' module deployed, or the module has not yet initalized <<<<<<<<<<" %
-                      (device_id, self.module_id))
+        device_list = [self.device_id] if self.device_id is not None else self.get_device_list()
 
-    def invoke_device_module_method(self, device_id, method_name, module_method, payload):
-        print("\n----------------------- Device: %s - Request: %s  --------------------------------------------------\n" % (device_id, method_name))
+        print("\n----------------------- Devices: %d - Request: %s  --------------------------------------------------\n" % (len(device_list), method_name))
         print(json.dumps(payload, indent=4))
 
-        resp = self.registry_manager.invoke_device_module_method(device_id, self.module_id, module_method)
+        start = perf_counter()
+        results = self.fan_out.map(
+            lambda device_id: self.registry_manager.invoke_device_module_method(device_id, self.module_id, module_method),
+            device_list,
+            lambda result: self.print_device_result(method_name, result))
+        summary = summarize(method_name, results, perf_counter() - start)
+        self.report.append(summary)
 
-        print("\n----------------------- Device: %s - Response: %s - Status: %s  ------------------------------------\n" %
-              (device_id, method_name, resp.status))
+        print("\n----------------------- Request: %s - Succeeded: %d - Failed: %d - Elapsed: %.1fs - Latency p50: %.1fs max: %.1fs  ----------\n" %
+              (method_name, summary['succeeded_count'], summary['failed_count'], summary['elapsed'], summary['latency_p50'], summary['latency_max']))
 
-        if resp.payload is not None:
-            print(json.dumps(resp.payload, indent=4))
+    def print_device_result(self, method_name, result):
+        if result.error is not None:
+            if result.status == 404:
+                print(">>>>>>>>>> Warning: device '%s' does not have the '%s' module deployed, or the module has not yet initalized <<<<<<<<<<" %
+                      (result.device_id, self.module_id))
+            else:
+                print(">>>>>>>>>> Warning: device '%s' - Request: %s failed after %d attempts: %s <<<<<<<<<<" %
+                      (result.device_id, method_name, result.attempts, result.error))
+            return
+
+        print("\n----------------------- Device: %s - Response: %s - Status: %s - Latency: %.2fs  ------------------------------------\n" %
+              (result.device_id, method_name, result.status, result.latency))
+
+        if result.payload is not None:
+            print(json.dumps(result.payload, indent=4))
+
+    def write_report(self, report_path):
+        Path(report_path).write_text(json.dumps(self.report, indent=4))
 
     def graph_topology_set(self, op_parameters):
         if op_parameters is None:
@@ -109,5 +142,11 @@ if __name__ == '__main__':
     operations_data_json = Path(getenv(constants.operations_file)).read_text()
     operations_data = json.loads(operations_data_json)
 
-    for operation in operations_data['operations']:
-        manager.invoke(operation['opName'], operation['opParams'])
+    try:
+        for operation in operations_data['operations']:
+            manager.invoke(operation['opName'], operation['opParams'])
+    finally:
+        manager.fan_out.shutdown()
+
+    if getenv(constants.report_filename) is not None:
+        manager.write_report(getenv(constants.report_filename))
@@ -27,6 +27,7 @@ from azureml.core import Run
 import argparse
 import json
 from util.model_helper import get_model, get_aml_context
+from util.model_helper import get_parent_run, get_run_metrics
 
 
 def evaluate_model_performs_better(model, run):
@@ -34,7 +35,8 @@ def evaluate_model_performs_better(model, run):
     production_model_accuracy = 0
     if (metric_eval in model.tags):
         production_model_accuracy = float(model.tags[metric_eval])
-    new_model_accuracy = float(run.parent.get_metrics().get(metric_eval))
+    new_model_accuracy = float(
+        get_run_metrics(get_parent_run(run)).get(metric_eval))
     if (production_model_accuracy is None or new_model_accuracy is None):
         raise Exception(f"Unable to find {metric_eval} metrics, exiting evaluation")  # NOQA: E501
     else:
@@ -58,7 +60,7 @@ def parse_ml_params(run, ml_params):
     print(f"evaluation parameters {evaluate_args}")
     for (k, v) in evaluate_args.items():
         run.log(k, v)
-        run.parent.log(k, v)
+        get_parent_run(run).log(k, v)
 
     cancel_if_perform_worse = \
         evaluate_args['cancel_if_perform_worse'].lower() == 'true'
@@ -90,7 +92,7 @@ def main():
     if (args.run_id is not None):
         run_id = args.run_id
     if (run_id == 'amlcompute'):
-        run_id = run.parent.id
+        run_id = get_parent_run(run).id
     model_name = args.model_name
     tag_name = 'experiment_name'
 
@@ -105,7 +107,7 @@ def main():
     if (model is not None):
         should_register = evaluate_model_performs_better(model, run)
         if((not should_register) and cancel_if_perform_worse):
-            run.parent.cancel()
+            get_parent_run(run).cancel()
     else:
         print("This is the first model, register it")
 
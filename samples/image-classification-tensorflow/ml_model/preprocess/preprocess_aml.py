@@ -26,10 +26,29 @@ POSSIBILITY OF SUCH DAMAGE.
 from azureml.core.run import Run
 import argparse
 import json
+import tempfile
 from preprocess_images import resize_images
+from preprocess_shards import write_shards
 from util.model_helper import get_or_register_dataset, get_aml_context
 
 
+# Resize the images to outdir, or when the 'output_format' preprocessing
+# parameter is 'tfrecord', resize them to a local folder and pack them in
+# TFRecord shards of 'shard_size_mb' MB written to outdir, so that training
+# reads a few large files instead of opening each image of the datastore.
+# With use_cache, the cache of the resized images is kept in outdir so that
+# the next run to outdir only resizes the changed images.
+def preprocess(indir, outdir, preprocessing_args, use_cache=False):
+    if preprocessing_args.get('output_format') != 'tfrecord':
+        resize_images(indir, outdir, preprocessing_args, use_cache=use_cache)
+        return
+
+    with tempfile.TemporaryDirectory() as resized_dir:
+        resize_images(indir, resized_dir, preprocessing_args, use_cache=False)
+        write_shards(resized_dir, outdir,
+                     preprocessing_args.get('shard_size_mb', 100))
+
+
 def main():
     print("Running preprocess.py")
 
@@ -98,7 +117,8 @@ def main():
             run.parent.log(k, v)
 
     if is_local_run:
-        resize_images(data_file_path, output_dataset, preprocessing_args)  # NOQA: E501
+        preprocess(data_file_path, output_dataset, preprocessing_args,
+                   use_cache=True)
         run.complete()
         return
 
@@ -115,7 +135,9 @@ def main():
     mount_context = dataset.mount()
     mount_context.start()
     print(f"mount_point is: {mount_context.mount_point}")
-    resize_images(mount_context.mount_point, output_dataset, preprocessing_args)  # NOQA: E501
+    # the output is a new folder of the run, registered as the dataset,
+    # so it doesn't get the cache file
+    preprocess(mount_context.mount_point, output_dataset, preprocessing_args)  # NOQA: E501
     mount_context.stop()
 
     run.tag("run_type", value="preprocess")
@@ -1,36 +1,132 @@
 import os
+import json
+import time
 import shutil
-import numpy as np
+from multiprocessing import Pool
 from PIL import Image
 
+# Name of the file of the output dir listing the source images
+# the output dir has been created from, see load_cache. It is part of the
+# output dir, resize_images doesn't write it when use_cache is False.
+CACHE_FILENAME = '.preprocess_cache.json'
+CACHE_VERSION = 1
+
 
 def resize_image(img, size):
+    # decode JPEG images at a reduced resolution, still larger than the
+    # target size, instead of decoding all of their pixels to downsize them
+    img.draft(None, size)
+
     # resize the image so the longest dimension matches our target size
     img.thumbnail(size, Image.ANTIALIAS)
 
     # Create a new square white background image
     newimg = Image.new("RGB", size, (255, 255, 255))
+    offset = (int((size[0] - img.size[0]) / 2),
+              int((size[1] - img.size[1]) / 2))
 
     # Paste the resized image into the center of the square background
-    if np.array(img).shape[2] == 4:
-        # If the source is in RGBA format,
-        # use a mask to eliminate the transparency
-        newimg.paste(
-            img,
-            (int((size[0] - img.size[0]) / 2),
-             int((size[1] - img.size[1]) / 2)),
-            mask=img.split()[3])
+    if img.mode == 'P' and 'transparency' in img.info:
+        img = img.convert('RGBA')
+    if img.mode in ('RGBA', 'LA'):
+        # If the source has an alpha channel,
+        # use it as a mask to eliminate the transparency
+        newimg.paste(img, offset, mask=img.getchannel('A'))
     else:
-        newimg.paste(
-            img,
-            (int((size[0] - img.size[0]) / 2),
-             int((size[1] - img.size[1]) / 2)))
+        newimg.paste(img, offset)
 
     return newimg
 
 
-# Create resized copies of all of the source images
-def resize_images(indir, outdir, preprocessing_args):
+# Resize a chunk of (relative path, source, destination) images, returns the
+# (relative path, error) of each image, error being None when it succeeded
+def resize_files(work_unit):
+    files, size = work_unit
+    results = []
+    for relpath, imgFile, saveAs in files:
+        try:
+            with Image.open(imgFile) as img:
+                proc_img = resize_image(img, size)
+            proc_img.save(saveAs)
+            results.append((relpath, None))
+        except Exception as ex:
+            results.append((relpath, str(ex)))
+    return results
+
+
+def get_file_key(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+# The cache lists the mtime and size of the source images resized by the
+# previous run, an image is only resized again when they have changed.
+# It is only valid for the same image size.
+def load_cache(outdir, size):
+    cache_path = os.path.join(outdir, CACHE_FILENAME)
+    try:
+        with open(cache_path) as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+    if cache.get('version') != CACHE_VERSION or \
+            cache.get('image_size') != list(size):
+        return None
+    return cache['files']
+
+
+def save_cache(outdir, size, files):
+    cache_path = os.path.join(outdir, CACHE_FILENAME)
+    with open(cache_path + '.tmp', 'w') as cache_file:
+        json.dump({'version': CACHE_VERSION,
+                   'image_size': list(size),
+                   'files': files}, cache_file)
+    os.replace(cache_path + '.tmp', cache_path)
+
+
+def clear_outdir(outdir):
+    for filename in os.listdir(outdir):
+        file_path = os.path.join(outdir, filename)
+        if os.path.isfile(file_path):
+            os.unlink(file_path)
+        elif os.path.isdir(file_path):
+            shutil.rmtree(file_path)
+
+
+# List the (relative path, source, destination) of the images of each
+# subfolder of the input dir, creating the matching output subfolders
+def list_images(indir, outdir):
+    for root, dirs, filenames in os.walk(indir):
+        for d in dirs:
+            # Create a matching subfolder in the output dir
+            saveFolder = os.path.join(outdir, d)
+            os.makedirs(saveFolder, exist_ok=True)
+            for f in os.listdir(os.path.join(root, d)):
+                imgFile = os.path.join(root, d, f)
+                if os.path.isfile(imgFile):
+                    yield (os.path.join(d, f), imgFile,
+                           os.path.join(saveFolder, f))
+
+
+# Split the images to resize in chunks, the work units of the processes
+def chunk_images(images, size, chunk_size):
+    chunk = []
+    for image in images:
+        chunk.append(image)
+        if len(chunk) == chunk_size:
+            yield chunk, size
+            chunk = []
+    if chunk:
+        yield chunk, size
+
+
+# Create resized copies of all of the source images, the images are
+# resized by a pool of worker processes, default to the number of CPUs,
+# each of them resizing chunk_size images at a time. With use_cache, only
+# the images changed since the previous run to outdir are resized.
+def resize_images(indir, outdir, preprocessing_args,
+                  workers=None, chunk_size=32, use_cache=True):
     size = (preprocessing_args['image_size']['x'],
             preprocessing_args['image_size']['y'])
     print(f"indir: {indir}")
@@ -40,35 +136,50 @@ def resize_images(indir, outdir, preprocessing_args):
     else:
         print("indir doesn't exit")
 
-    if os.path.exists(outdir):
-        print("outdir exists, delete all files")
-        for filename in os.listdir(outdir):
-            file_path = os.path.join(outdir, filename)
-            if os.path.isfile(file_path):
-                os.unlink(file_path)
-            elif os.path.isdir(file_path):
-                shutil.rmtree(file_path)
+    start = time.perf_counter()
+    os.makedirs(outdir, exist_ok=True)
+    cached_files = load_cache(outdir, size) if use_cache else None
+    if cached_files is None:
+        print("no cache of a previous run, delete all files of outdir")
+        clear_outdir(outdir)
+        cached_files = {}
 
-    # Loop through each subfolder in the input dir
-    for root, dirs, filenames in os.walk(indir):
-        for d in dirs:
-            print('processing folder ' + d)
-            # Create a matching subfolder in the output dir
-            saveFolder = os.path.join(outdir, d)
-            if not os.path.exists(saveFolder):
-                os.makedirs(saveFolder)
-            # Loop through the files in the subfolder
-            files = os.listdir(os.path.join(root, d))
-            for f in files:
-                # Open the file
-                imgFile = os.path.join(root, d, f)
-                print("reading " + imgFile)
-                img = Image.open(imgFile)
-                # Create a resized version and save it
-                proc_img = resize_image(img, size)
-                saveAs = os.path.join(saveFolder, f)
-                print("writing " + saveAs)
-                proc_img.save(saveAs)
+    files = {}
+    to_resize = []
+    for relpath, imgFile, saveAs in list_images(indir, outdir):
+        files[relpath] = get_file_key(imgFile)
+        if cached_files.get(relpath) != files[relpath] or \
+                not os.path.exists(saveAs):
+            to_resize.append((relpath, imgFile, saveAs))
+    skipped_count = len(files) - len(to_resize)
+
+    # Delete the resized copies of the images deleted from the input dir
+    for relpath in cached_files.keys() - files.keys():
+        saveAs = os.path.join(outdir, relpath)
+        if os.path.exists(saveAs):
+            os.unlink(saveAs)
+
+    failed_count = 0
+    if to_resize:
+        with Pool(workers) as pool:
+            work_units = chunk_images(to_resize, size, chunk_size)
+            for results in pool.imap_unordered(resize_files, work_units):
+                for relpath, error in results:
+                    if error is not None:
+                        print(f"failed to resize {relpath}: {error}")
+                        failed_count += 1
+                        # the image is resized again by the next run, its
+                        # copy resized from a previous version is deleted
+                        del files[relpath]
+                        saveAs = os.path.join(outdir, relpath)
+                        if os.path.exists(saveAs):
+                            os.unlink(saveAs)
+
+    if use_cache:
+        save_cache(outdir, size, files)
+    print(f"resized {len(to_resize) - failed_count} images, "
+          f"skipped {skipped_count} unchanged images, "
+          f"{failed_count} failed, in {time.perf_counter() - start:.1f}s")
 
 
 def main():
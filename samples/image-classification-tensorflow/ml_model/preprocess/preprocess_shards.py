@@ -0,0 +1,74 @@
+import os
+import json
+import tensorflow as tf
+
+# The shards are TFRecord files of tf.train.Example records with the
+# features 'image' (the encoded resized image), 'label' (the index of its
+# class) and 'position' (the index of the image in the sorted images of its
+# class, which train.py splits the training and validation images with).
+# The index file lists the classes, the number of images of each class and
+# the shards, it is read by train.py to find the shards.
+INDEX_FILENAME = 'index.json'
+INDEX_VERSION = 1
+SHARD_FILENAME = 'shard-{:05d}.tfrecord'
+# image formats read by flow_from_directory
+IMAGE_EXTENSIONS = ('png', 'jpg', 'jpeg', 'bmp', 'ppm', 'tif', 'tiff')
+
+
+def int64_feature(value):
+    return tf.train.Feature(int64_list=tf.train.Int64List(value=[value]))
+
+
+def create_example(image_bytes, label, position):
+    return tf.train.Example(features=tf.train.Features(feature={
+        'image': tf.train.Feature(
+            bytes_list=tf.train.BytesList(value=[image_bytes])),
+        'label': int64_feature(label),
+        'position': int64_feature(position)}))
+
+
+# Pack the resized images of each class subfolder of indir, with their
+# labels, in TFRecord files of about shard_size_mb MB each, written to
+# outdir with the index file listing them
+def write_shards(indir, outdir, shard_size_mb=100):
+    shard_size = shard_size_mb * 1024 * 1024
+    classes = sorted(
+        d for d in os.listdir(indir) if os.path.isdir(os.path.join(indir, d)))
+    os.makedirs(outdir, exist_ok=True)
+
+    class_counts = []
+    shards = []
+    writer = None
+    for label, class_name in enumerate(classes):
+        files = sorted(
+            f for f in os.listdir(os.path.join(indir, class_name))
+            if f.lower().endswith(IMAGE_EXTENSIONS))
+        class_counts.append(len(files))
+        for position, f in enumerate(files):
+            if writer is None or shards[-1]['bytes'] >= shard_size:
+                if writer is not None:
+                    writer.close()
+                shards.append({'path': SHARD_FILENAME.format(len(shards)),
+                               'count': 0,
+                               'bytes': 0})
+                writer = tf.io.TFRecordWriter(
+                    os.path.join(outdir, shards[-1]['path']))
+
+            with open(os.path.join(indir, class_name, f), 'rb') as img_file:
+                record = create_example(
+                    img_file.read(), label, position).SerializeToString()
+            writer.write(record)
+            shards[-1]['count'] += 1
+            shards[-1]['bytes'] += len(record)
+    if writer is not None:
+        writer.close()
+
+    index = {'version': INDEX_VERSION,
+             'classes': classes,
+             'class_counts': class_counts,
+             'shards': shards}
+    with open(os.path.join(outdir, INDEX_FILENAME), 'w') as index_file:
+        json.dump(index, index_file, indent=2)
+    print(f"packed {sum(class_counts)} images of {len(classes)} classes "
+          f"in {len(shards)} shards")
+    return index
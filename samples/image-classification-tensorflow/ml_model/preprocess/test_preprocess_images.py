@@ -1,3 +1,125 @@
+import os
+from PIL import Image
+from preprocess.preprocess_images import (
+    CACHE_FILENAME, resize_image, resize_images)
+
+preprocessing_args = {'image_size': {'x': 32, 'y': 32}}
+
+
+def create_images(indir):
+    os.makedirs(os.path.join(indir, 'daisy'))
+    os.makedirs(os.path.join(indir, 'rose'))
+    Image.new('RGB', (320, 160), (255, 0, 0)).save(
+        os.path.join(indir, 'daisy', 'red.jpg'))
+    Image.new('L', (100, 200), 0).save(
+        os.path.join(indir, 'rose', 'black.png'))
+    Image.new('RGBA', (64, 64), (0, 0, 255, 0)).save(
+        os.path.join(indir, 'rose', 'transparent.png'))
+
+
 def test_resize_image():
-    # TODO: implement tests
-    assert True
+    img = Image.new('RGB', (320, 160), (255, 0, 0))
+
+    newimg = resize_image(img, (32, 32))
+
+    assert newimg.size == (32, 32)
+    assert newimg.mode == 'RGB'
+    # the image is centered on a white background
+    assert newimg.getpixel((16, 16)) == (255, 0, 0)
+    assert newimg.getpixel((16, 0)) == (255, 255, 255)
+
+
+def test_resize_image_jpeg_draft(tmp_path):
+    Image.new('RGB', (1024, 512), (0, 255, 0)).save(tmp_path / 'green.jpg')
+
+    with Image.open(tmp_path / 'green.jpg') as img:
+        newimg = resize_image(img, (32, 32))
+
+    assert newimg.size == (32, 32)
+    assert newimg.getpixel((16, 16))[1] > 250
+
+
+def test_resize_image_modes():
+    # grayscale images have no channel axis, transparent pixels are white
+    gray = resize_image(Image.new('L', (64, 64), 0), (32, 32))
+    transparent = resize_image(Image.new('RGBA', (64, 64), (0, 0, 255, 0)),
+                               (32, 32))
+
+    assert gray.getpixel((16, 16)) == (0, 0, 0)
+    assert transparent.getpixel((16, 16)) == (255, 255, 255)
+
+
+def test_resize_images(tmp_path):
+    indir, outdir = str(tmp_path / 'in'), str(tmp_path / 'out')
+    create_images(indir)
+
+    resize_images(indir, outdir, preprocessing_args, workers=2, chunk_size=1)
+
+    assert sorted(os.listdir(os.path.join(outdir, 'rose'))) == \
+        ['black.png', 'transparent.png']
+    with Image.open(os.path.join(outdir, 'daisy', 'red.jpg')) as img:
+        assert img.size == (32, 32)
+
+
+def test_resize_images_skips_unchanged(tmp_path, capsys):
+    indir, outdir = str(tmp_path / 'in'), str(tmp_path / 'out')
+    create_images(indir)
+    resize_images(indir, outdir, preprocessing_args, workers=2)
+    os.unlink(os.path.join(indir, 'rose', 'black.png'))
+    Image.new('RGB', (50, 50)).save(os.path.join(indir, 'daisy', 'red.jpg'))
+    capsys.readouterr()
+
+    resize_images(indir, outdir, preprocessing_args, workers=2)
+
+    assert 'resized 1 images, skipped 1 unchanged images' in \
+        capsys.readouterr().out
+    assert os.listdir(os.path.join(outdir, 'rose')) == ['transparent.png']
+
+
+def test_resize_images_new_size(tmp_path, capsys):
+    indir, outdir = str(tmp_path / 'in'), str(tmp_path / 'out')
+    create_images(indir)
+    resize_images(indir, outdir, preprocessing_args, workers=2)
+    capsys.readouterr()
+
+    resize_images(indir, outdir, {'image_size': {'x': 16, 'y': 16}},
+                  workers=2)
+
+    assert 'resized 3 images, skipped 0' in capsys.readouterr().out
+    with Image.open(os.path.join(outdir, 'daisy', 'red.jpg')) as img:
+        assert img.size == (16, 16)
+
+
+def test_resize_images_invalid_image(tmp_path, capsys):
+    indir, outdir = str(tmp_path / 'in'), str(tmp_path / 'out')
+    create_images(indir)
+    with open(os.path.join(indir, 'rose', 'notes.txt'), 'w') as f:
+        f.write('not an image')
+
+    resize_images(indir, outdir, preprocessing_args, workers=2)
+
+    out = capsys.readouterr().out
+    assert 'failed to resize' in out and '1 failed' in out
+
+
+def test_resize_images_deletes_failed_copy(tmp_path):
+    indir, outdir = str(tmp_path / 'in'), str(tmp_path / 'out')
+    create_images(indir)
+    resize_images(indir, outdir, preprocessing_args, workers=2)
+    with open(os.path.join(indir, 'daisy', 'red.jpg'), 'w') as f:
+        f.write('not an image anymore')
+
+    resize_images(indir, outdir, preprocessing_args, workers=2)
+
+    assert os.listdir(os.path.join(outdir, 'daisy')) == []
+
+
+def test_resize_images_without_cache(tmp_path):
+    indir, outdir = str(tmp_path / 'in'), str(tmp_path / 'out')
+    create_images(indir)
+
+    resize_images(indir, outdir, preprocessing_args, workers=2,
+                  use_cache=False)
+
+    assert sorted(os.listdir(outdir)) == ['daisy', 'rose']
+    assert not os.path.exists(os.path.join(outdir, CACHE_FILENAME))
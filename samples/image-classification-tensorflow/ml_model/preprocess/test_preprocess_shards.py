@@ -0,0 +1,51 @@
+import os
+import json
+import tensorflow as tf
+from PIL import Image
+from preprocess.preprocess_shards import INDEX_FILENAME, write_shards
+
+
+def create_images(indir):
+    for class_name, count in [('daisy', 3), ('rose', 4)]:
+        os.makedirs(os.path.join(indir, class_name))
+        for i in range(count):
+            Image.new('RGB', (32, 32), (i * 50, 0, 0)).save(
+                os.path.join(indir, class_name, f'{i}.png'))
+
+
+def read_records(outdir, index):
+    files = [os.path.join(outdir, shard['path']) for shard in index['shards']]
+    features = {'image': tf.io.FixedLenFeature([], tf.string),
+                'label': tf.io.FixedLenFeature([], tf.int64),
+                'position': tf.io.FixedLenFeature([], tf.int64)}
+    return [tf.io.parse_single_example(record, features)
+            for record in tf.data.TFRecordDataset(files)]
+
+
+def test_write_shards(tmp_path):
+    indir, outdir = str(tmp_path / 'in'), str(tmp_path / 'out')
+    create_images(indir)
+
+    index = write_shards(indir, outdir)
+
+    with open(os.path.join(outdir, INDEX_FILENAME)) as index_file:
+        assert json.load(index_file) == index
+    assert index['classes'] == ['daisy', 'rose']
+    assert index['class_counts'] == [3, 4]
+    assert len(index['shards']) == 1
+    records = read_records(outdir, index)
+    assert [(int(r['label']), int(r['position'])) for r in records] == \
+        [(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2), (1, 3)]
+    with open(os.path.join(indir, 'rose', '3.png'), 'rb') as img_file:
+        assert records[-1]['image'].numpy() == img_file.read()
+
+
+def test_write_shards_size(tmp_path):
+    indir, outdir = str(tmp_path / 'in'), str(tmp_path / 'out')
+    create_images(indir)
+
+    # a shard is closed once it is larger than 100 bytes
+    index = write_shards(indir, outdir, shard_size_mb=100 / 1024 / 1024)
+
+    assert [shard['count'] for shard in index['shards']] == [1] * 7
+    assert len(read_records(outdir, index)) == 7
@@ -30,27 +30,8 @@ import argparse
 import traceback
 from azureml.core import Run
 from azureml.core.model import Model as AMLModel
-from util.model_helper import get_aml_context
-
-
-def find_child_run(parent_run, child_run_id):
-    found_run = None
-    runs = parent_run.get_children()
-    for r in runs:
-        if r.id == child_run_id:
-            found_run = r
-            break
-    return found_run
-
-
-def find_run(experiment, run_id):
-    found_run = None
-    runs = experiment.get_runs()
-    for r in runs:
-        if r.id == run_id:
-            found_run = r
-            break
-    return found_run
+from util.model_helper import get_aml_context, get_run, get_child_run
+from util.model_helper import get_parent_run, get_run_metrics
 
 
 def parse_ml_params(run, ml_params):
@@ -98,10 +79,10 @@ def main():
     args = parser.parse_args()
     if (args.run_id is not None):
         run_id = args.run_id
-        run = find_run(exp, run_id)
+        run = get_run(exp, run_id)
     if (run_id == 'amlcompute'):
-        run_id = run.parent.id
-        run = run.parent
+        run = get_parent_run(run)
+        run_id = run.id
     print(f"parent run_id is {run_id}")
     model_name = args.model_name
     model_path = args.step_input
@@ -111,9 +92,10 @@ def main():
     register_args = parse_ml_params(run, args.ml_params)
 
     model_tags = {}
+    metrics = get_run_metrics(run)
     for tag in register_args["tags"]:
         try:
-            mtag = run.get_metrics()[tag]
+            mtag = metrics[tag]
             model_tags[tag] = mtag
         except KeyError:
             print(f"Could not find {tag} metric on parent run.")
@@ -138,7 +120,7 @@ def main():
         training_run_id = text_file.read().replace('\n', '')
 
     # the parent pipeline run consists of training, evaluation, and registration  # NOQA: E501
-    training_run = find_child_run(run, training_run_id)
+    training_run = get_child_run(run, training_run_id)
 
     if training_run is not None:
         if (build_id is None):
@@ -0,0 +1,112 @@
+"""
+Benchmark of the request formats of the scoring service, for batches of
+1, 32 and 256 images. For each format, it measures the size of the request,
+the time of the client to encode it and of score.py to decode it and to
+predict the classes, end to end without the network:
+
+- json: gzip compressed JSON of the images as nested lists, as decoded by
+  the previous version of score.py, with a float32 copy of the images
+  normalized in numpy
+- json fused: the same request, decoded by score.py with the normalization
+  in the model graph
+- npy: the NPY document of the uint8 images, decoded without a copy
+
+Run from the ml_model folder, with the model downloaded from the workspace,
+or with an untrained model of the same architecture when --model is not set:
+
+    python score/benchmark_score.py --model /path/to/flower_classifier
+"""
+import argparse
+import gzip
+import json
+import time
+from io import BytesIO
+import numpy as np
+from keras.models import load_model, Sequential
+from keras.layers import Conv2D, MaxPooling2D, Flatten, Dense
+import score
+
+
+def build_model(image_size):
+    return Sequential([
+        Conv2D(24, (6, 6), input_shape=image_size + (3,), activation='relu'),
+        MaxPooling2D(pool_size=(2, 2)),
+        Conv2D(48, (6, 6), activation='relu'),
+        MaxPooling2D(pool_size=(2, 2)),
+        Conv2D(96, (6, 6), activation='relu'),
+        MaxPooling2D(pool_size=(2, 2)),
+        Flatten(),
+        Dense(len(score.CLASSNAMES), activation='softmax')])
+
+
+def encode_json(images):
+    input_json = json.dumps({"data": images.tolist()})
+    return gzip.compress(input_json.encode('utf-8'))
+
+
+def encode_npy(images):
+    data = BytesIO()
+    np.save(data, images)
+    return data.getvalue()
+
+
+# The decoding and prediction of the previous version of score.py
+def run_json(classifier, raw_data):
+    json_data = gzip.decompress(raw_data).decode('utf-8')
+    imgfeatures = np.array(json.loads(json_data)['data']).astype('float32')
+    imgfeatures /= 255
+    predictions = classifier.predict_on_batch(imgfeatures)
+    return [score.CLASSNAMES[int(np.argmax(prediction))]
+            for prediction in predictions]
+
+
+def run_fused(scoring_model, raw_data):
+    data = score.decode_images(raw_data)
+    return score.predict_image(scoring_model, data)
+
+
+def measure(encode, run, images, repeat):
+    encode_time, run_time = 0, 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        raw_data = encode(images)
+        encode_time += time.perf_counter() - start
+        start = time.perf_counter()
+        run(raw_data)
+        run_time += time.perf_counter() - start
+    return len(raw_data), encode_time / repeat, run_time / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser("benchmark_score.py")
+    parser.add_argument("--model", type=str, help="Path of the model")
+    parser.add_argument("--image_size", type=int, default=128)
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    image_size = (args.image_size, args.image_size)
+    classifier = load_model(args.model) if args.model \
+        else build_model(image_size)
+    scoring_model = score.build_scoring_model(classifier)
+    formats = [
+        ('json', encode_json, lambda d: run_json(classifier, d)),
+        ('json fused', encode_json, lambda d: run_fused(scoring_model, d)),
+        ('npy', encode_npy, lambda d: run_fused(scoring_model, d))]
+
+    print(f"{'format':>10} {'batch':>5} {'request KB':>10} "
+          f"{'encode ms':>9} {'server ms':>9} {'images/s':>8}")
+    for batch_size in [1, 32, 256]:
+        images = np.random.randint(
+            0, 256, size=(batch_size,) + image_size + (3,), dtype=np.uint8)
+        for name, encode, run in formats:
+            # warm up the graph for this batch size
+            run(encode(images))
+            size, encode_time, run_time = measure(
+                encode, run, images, args.repeat)
+            print(f"{name:>10} {batch_size:>5} {size / 1024:>10.1f} "
+                  f"{encode_time * 1000:>9.1f} {run_time * 1000:>9.1f} "
+                  f"{batch_size / (encode_time + run_time):>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -23,26 +23,51 @@ IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
 ARISING IN ANY WAY OUT OF THE USE OF THE SOFTWARE CODE, EVEN IF ADVISED OF THE
 POSSIBILITY OF SUCH DAMAGE.
 """
+import io
 import json
 import numpy as np
-from keras.models import load_model
+from keras import backend as K
+from keras.layers import Input, Lambda
+from keras.models import load_model, Model as KerasModel
 from azureml.core.model import Model
 from azureml.contrib.services.aml_request import rawhttp
 import gzip
 
+# These are the classes our model can predict
+CLASSNAMES = ['daisy', 'dandelion', 'roses', 'sunflowers', 'tulips']
+
+GZIP_MAGIC = b'\x1f\x8b'
+NPY_MAGIC = b'\x93NUMPY'
+
 
 def init():
-    global model
+    global model, scoring_model
 
     # we assume that we have just one model
     model_path = Model.get_model_path('flower_classifier')
     model = load_model(model_path)
+    scoring_model = build_scoring_model(model)
+
+    # trace the graph of the scoring model before the first request
+    scoring_model.predict_on_batch(
+        np.zeros((1,) + model.input_shape[1:], dtype=np.uint8))
+
+
+# Wrap the model in a model taking the uint8 images and returning the index
+# of the predicted class of each image, so that the normalization and the
+# argmax run in the model graph instead of creating float copies in numpy
+def build_scoring_model(classifier):
+    images = Input(shape=classifier.input_shape[1:], dtype='uint8')
+    features = Lambda(lambda x: K.cast(x, 'float32') / 255)(images)
+    predictions = classifier(features)
+    class_indices = Lambda(lambda x: K.argmax(x, axis=-1))(predictions)
+    return KerasModel(images, class_indices)
 
 
 @rawhttp
 def run(request):
     try:
-        # raw_data is gziped
+        # raw_data is NPY or JSON, optionally gzipped, see decode_images
         raw_data = request.get_data()
         return internal_run(raw_data)
 
@@ -52,28 +77,48 @@ def run(request):
 
 
 def internal_run(raw_data):
-    json_data = gzip.decompress(raw_data).decode('utf-8')
-    data = np.array(json.loads(json_data)['data'])
-    predicted_classes = predict_image(model, data)
+    data = decode_images(raw_data)
+    predicted_classes = predict_image(scoring_model, data)
     json_result = json.dumps(predicted_classes)
     return json_result
 
 
-def predict_image(classifier, image_array):
-    imgfeatures = image_array.astype('float32')
-    imgfeatures /= 255
+# The request is either a NPY document of the uint8 images of shape
+# (count, height, width, channels), as written by np.save, or the JSON
+# document {"data": images} of the images as nested lists, both of them
+# optionally gzip compressed
+def decode_images(raw_data):
+    if raw_data[:len(GZIP_MAGIC)] == GZIP_MAGIC:
+        raw_data = gzip.decompress(raw_data)
+    if raw_data[:len(NPY_MAGIC)] == NPY_MAGIC:
+        return decode_npy(raw_data)
+    return np.array(json.loads(raw_data)['data'], dtype=np.uint8)
+
+
+# Read the header of the NPY document, the images are then
+# a view of the request bytes instead of a copy
+def decode_npy(raw_data):
+    stream = io.BytesIO(raw_data)
+    version = np.lib.format.read_magic(stream)
+    if version == (1, 0):
+        header = np.lib.format.read_array_header_1_0(stream)
+    else:
+        header = np.lib.format.read_array_header_2_0(stream)
+    shape, fortran_order, dtype = header
+
+    if dtype != np.uint8 or fortran_order or len(shape) != 4:
+        raise ValueError(
+            f"expected a C-ordered uint8 array of 4 dimensions, "
+            f"got a {dtype} array of shape {shape}")
+    return np.frombuffer(
+        raw_data, dtype=np.uint8, count=int(np.prod(shape)),
+        offset=stream.tell()).reshape(shape)
 
-    # These are the classes our model can predict
-    classnames = ['daisy', 'dandelion', 'roses', 'sunflowers', 'tulips']
 
+def predict_image(classifier, image_array):
     # Predict the class of each input image
-    predictions = classifier.predict(imgfeatures)
-
-    predicted_classes = []
-    for prediction in predictions:
-        class_idx = np.argmax(prediction)
-        predicted_classes.append(classnames[int(class_idx)])
-    return predicted_classes
+    class_indices = classifier.predict_on_batch(image_array)
+    return [CLASSNAMES[int(class_idx)] for class_idx in class_indices]
 
 
 if __name__ == "__main__":
@@ -103,12 +148,11 @@ if __name__ == "__main__":
     for url_idx in range(len(image_urls)):
         response = requests.get(image_urls[url_idx])
         img = Image.open(BytesIO(response.content))
-        img = np.array(resize_image(img, size))
-        img_array.append(img.tolist())
+        img_array.append(np.array(resize_image(img, size)))
 
-    input_json = json.dumps({"data": img_array})
-    compressed = gzip.compress(input_json.encode('utf-8'))
-    predictions = internal_run(compressed)
+    request_data = BytesIO()
+    np.save(request_data, np.stack(img_array))
+    predictions = internal_run(request_data.getvalue())
     predicted_classes = json.loads(predictions)
     for (p, a) in zip(predicted_classes, image_classes):
         if p != a:
@@ -6,7 +6,6 @@ from azureml.core.webservice import AciWebservice
 from ml_service.util.env_variables import Env
 import secrets
 import json
-import gzip
 import os
 
 
@@ -17,7 +16,7 @@ def call_web_service(e, service_name, body):
         resource_group=e.resource_group
     )
     print("Fetching service")
-    headers = {'content-encoding': 'gzip'}
+    headers = {'Content-Type': 'application/octet-stream'}
     service = AciWebservice(aml_workspace, service_name)
     if service.auth_enabled:
         service_keys = service.get_keys()
@@ -85,12 +84,12 @@ def main():
     for url_idx in range(len(image_urls)):
         response = requests.get(image_urls[url_idx])
         img = Image.open(BytesIO(response.content))
-        img = np.array(resize_image(img, size))
-        img_array.append(img.tolist())
+        img_array.append(np.array(resize_image(img, size)))
 
-    input_json = json.dumps({"data": img_array})
-    compressed = gzip.compress(input_json.encode('utf-8'))
-    predictions = call_web_service(e, args.service, compressed)
+    # send the images as a NPY document of uint8 pixels
+    body = BytesIO()
+    np.save(body, np.stack(img_array))
+    predictions = call_web_service(e, args.service, body.getvalue())
     predicted_classes = json.loads(predictions)
     assert len(predicted_classes) == len(image_classes)
     for (p, a) in zip(predicted_classes, image_classes):
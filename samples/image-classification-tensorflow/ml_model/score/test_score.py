@@ -0,0 +1,58 @@
+import gzip
+import json
+from io import BytesIO
+import numpy as np
+import pytest
+from keras.models import Sequential
+from keras.layers import Dense, Flatten
+import score
+
+images = np.random.RandomState(7).randint(
+    0, 256, size=(3, 8, 8, 3)).astype(np.uint8)
+
+
+def to_npy(array):
+    data = BytesIO()
+    np.save(data, array)
+    return data.getvalue()
+
+
+def test_decode_images_npy():
+    data = score.decode_images(to_npy(images))
+
+    np.testing.assert_array_equal(data, images)
+    # the images are a view of the request bytes
+    assert not data.flags.owndata
+
+
+def test_decode_images_gzip_npy():
+    data = score.decode_images(gzip.compress(to_npy(images)))
+
+    np.testing.assert_array_equal(data, images)
+
+
+def test_decode_images_gzip_json():
+    input_json = json.dumps({"data": images.tolist()})
+
+    data = score.decode_images(gzip.compress(input_json.encode('utf-8')))
+
+    assert data.dtype == np.uint8
+    np.testing.assert_array_equal(data, images)
+
+
+def test_decode_images_npy_float():
+    with pytest.raises(ValueError):
+        score.decode_images(to_npy(images.astype('float32')))
+
+
+def test_internal_run():
+    classifier = Sequential([Flatten(input_shape=(8, 8, 3)),
+                             Dense(5, activation='softmax')])
+    score.scoring_model = score.build_scoring_model(classifier)
+    expected = [score.CLASSNAMES[i] for i in np.argmax(
+        classifier.predict(images.astype('float32') / 255), axis=-1)]
+
+    assert json.loads(score.internal_run(to_npy(images))) == expected
+    input_json = json.dumps({"data": images.tolist()})
+    assert json.loads(score.internal_run(
+        gzip.compress(input_json.encode('utf-8')))) == expected
@@ -1,7 +1,15 @@
+import os
+import sys
 import numpy as np
+import train
 from train import train_model, get_model_metrics
+from train import split_data, list_image_files
 import pytest
 
+# Import preprocess_shards.py, which writes the shards read by train.py
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from preprocess import preprocess_shards  # noqa: E402
+
 
 @pytest.mark.skip(reason="TODO: test simple Keras model")
 def test_train_model():
@@ -31,3 +39,72 @@ def test_get_model_metrics():
     assert 'loss' in metrics
     mse = metrics['loss']
     np.testing.assert_almost_equal(mse, 0.6115774512290955)
+
+
+def create_images(data_folder):
+    from PIL import Image
+    for class_name, count in [('daisy', 7), ('roses', 10)]:
+        os.makedirs(os.path.join(data_folder, class_name))
+        for i in range(count):
+            Image.new('RGB', (16, 16), (i * 20, 0, 0)).save(
+                os.path.join(data_folder, class_name, f'{i}.png'))
+
+
+def test_split_data_tf_data_same_split(tmp_path):
+    data_folder = str(tmp_path)
+    create_images(data_folder)
+    preprocessing_args = {"image_size": {"x": 16, "y": 16}, "batch_size": 4}
+
+    generators = split_data(data_folder, preprocessing_args)
+    classes, training, validation = list_image_files(data_folder)
+
+    assert classes == generators['classes']
+    for generator, (files, labels) in [(generators['train'], training),
+                                       (generators['test'], validation)]:
+        assert [os.path.relpath(f, data_folder) for f in files] == \
+            generator.filenames
+        assert labels == list(generator.classes)
+
+
+def test_split_data_tf_data(tmp_path):
+    data_folder = str(tmp_path)
+    create_images(data_folder)
+    preprocessing_args = {"image_size": {"x": 16, "y": 16}, "batch_size": 4}
+
+    data = split_data(data_folder, preprocessing_args,
+                      {"input_pipeline": "tf.data",
+                       "cache": str(tmp_path / "cache")})
+
+    assert data['image_shape'] == (16, 16, 3)
+    images, labels = next(iter(data['test']))
+    assert images.shape == (4, 16, 16, 3)
+    assert images.dtype == 'float32'
+    assert float(np.max(images)) <= 1.0
+    np.testing.assert_array_equal(labels[0], [1, 0])
+    # 2 daisy and 3 roses validation images
+    assert sum(len(labels) for _, labels in data['test']) == 5
+    assert sum(len(labels) for _, labels in data['train']) == 12
+
+
+def test_shard_constants_match_preprocess_shards():
+    assert train.IMAGE_EXTENSIONS == preprocess_shards.IMAGE_EXTENSIONS
+    assert train.SHARD_INDEX_FILENAME == preprocess_shards.INDEX_FILENAME
+
+
+def test_split_data_shards(tmp_path):
+    data_folder = str(tmp_path / 'images')
+    shards_folder = str(tmp_path / 'shards')
+    create_images(data_folder)
+    preprocess_shards.write_shards(data_folder, shards_folder)
+    preprocessing_args = {"image_size": {"x": 16, "y": 16}, "batch_size": 4}
+
+    files = split_data(data_folder, preprocessing_args,
+                       {"input_pipeline": "tf.data"})
+    shards = split_data(shards_folder, preprocessing_args)
+
+    assert shards['classes'] == files['classes']
+    for (images, labels), (shard_images, shard_labels) in zip(
+            files['test'], shards['test']):
+        np.testing.assert_array_equal(shard_images, images)
+        np.testing.assert_array_equal(shard_labels, labels)
+    assert sum(len(labels) for _, labels in shards['train']) == 12
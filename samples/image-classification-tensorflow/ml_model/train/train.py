@@ -25,17 +25,38 @@ POSSIBILITY OF SUCH DAMAGE.
 """
 
 # set numpy random seed to get consistent keras results
+import os
+import json
+import hashlib
 import numpy as np
 np.random.seed(7)
+import tensorflow as tf  # noqa: E402
 from keras.models import Sequential  # noqa: E402
 from keras.layers import Conv2D, MaxPooling2D  # noqa: E402
 from keras.layers import Dropout, Flatten, Dense  # noqa: E402
 from keras import optimizers  # noqa: E402
 from keras.preprocessing.image import ImageDataGenerator  # noqa: E402
 
+# hold back 30% of the images for validation
+VALIDATION_SPLIT = 0.3
+# image formats of the images of the tf.data input pipeline, and index file
+# of the TFRecord shards, the same as IMAGE_EXTENSIONS and INDEX_FILENAME of
+# preprocess_shards.py, which the training step doesn't import, test_train.py
+# checks that they match
+IMAGE_EXTENSIONS = ('png', 'jpg', 'jpeg', 'bmp', 'ppm', 'tif', 'tiff')
+SHARD_INDEX_FILENAME = 'index.json'
+
+
+# Split the dataframe into test and train data, with the tf.data input
+# pipeline when the 'input_pipeline' training parameter is 'tf.data' or
+# when the images are TFRecord shards, else with ImageDataGenerator
+def split_data(data_folder, preprocessing_args, training_args=None):
+    training_args = training_args or {}
+    if training_args.get('input_pipeline') == 'tf.data' or \
+            os.path.exists(os.path.join(data_folder, SHARD_INDEX_FILENAME)):
+        return create_datasets(
+            data_folder, preprocessing_args, training_args.get('cache', ''))
 
-# Split the dataframe into test and train data
-def split_data(data_folder, preprocessing_args):
     img_size = (
         preprocessing_args['image_size']['x'],
         preprocessing_args['image_size']['y'])
@@ -44,7 +65,7 @@ def split_data(data_folder, preprocessing_args):
     print("Getting Data...")
     datagen = ImageDataGenerator(
         rescale=1./255,  # normalize pixel values
-        validation_split=0.3)  # hold back 30% of the images for validation
+        validation_split=VALIDATION_SPLIT)
 
     print("Preparing training dataset...")
     train_generator = datagen.flow_from_directory(
@@ -69,15 +90,159 @@ def split_data(data_folder, preprocessing_args):
 
     data = {"train": train_generator,
             "test": validation_generator,
-            "classes": classes}
+            "classes": classes,
+            "image_shape": train_generator.image_shape,
+            "train_steps": train_generator.samples // batch_size,
+            "validation_steps": validation_generator.samples // batch_size}
+    return data
+
+
+# List the images of each class subfolder and split them the way
+# flow_from_directory does: the first 30% of the sorted files
+# of each class are validation images, the others training images
+def list_image_files(data_folder):
+    classes = sorted(
+        d for d in os.listdir(data_folder)
+        if os.path.isdir(os.path.join(data_folder, d)))
+    split = {'training': ([], []), 'validation': ([], [])}
+    for class_index, class_name in enumerate(classes):
+        class_files = []
+        for root, _, files in sorted(
+                os.walk(os.path.join(data_folder, class_name)),
+                key=lambda x: x[0]):
+            class_files.extend(
+                os.path.join(root, f) for f in sorted(files)
+                if f.lower().endswith(IMAGE_EXTENSIONS))
+        validation_count = int(VALIDATION_SPLIT * len(class_files))
+        for subset, subset_files in (
+                ('validation', class_files[:validation_count]),
+                ('training', class_files[validation_count:])):
+            split[subset][0].extend(subset_files)
+            split[subset][1].extend([class_index] * len(subset_files))
+    return classes, split['training'], split['validation']
+
+
+# Name the cache files of a subset after its images, so that the cache
+# of another dataset, or of another image size, is not read
+def get_cache_path(cache, *key):
+    if not cache:
+        return ''
+    os.makedirs(cache, exist_ok=True)
+    key = hashlib.sha1('\n'.join(map(str, key)).encode('utf-8')).hexdigest()
+    return os.path.join(cache, key)
+
+
+# Create the tf.data dataset of a subset from the dataset of its encoded
+# images and labels: the images are decoded and resized by parallel calls,
+# cached as uint8 in memory, or in files of the cache folder when it is
+# set, then shuffled, batched, normalized and prefetched
+def create_dataset(images, count, classes, img_size, batch_size,
+                   cache, shuffle):
+    autotune = tf.data.experimental.AUTOTUNE
+
+    def load_image(image, label):
+        img = tf.io.decode_image(image, channels=3, expand_animations=False)
+        img = tf.image.resize(img, img_size, method='nearest')
+        return img, tf.one_hot(label, len(classes))
+
+    def normalize(images, labels):
+        return tf.cast(images, tf.float32) / 255, labels
+
+    dataset = images.map(load_image, num_parallel_calls=autotune)
+    dataset = dataset.cache(cache)
+    if shuffle:
+        dataset = dataset.shuffle(count, seed=7, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size)
+    dataset = dataset.map(normalize, num_parallel_calls=autotune)
+    return dataset.prefetch(autotune)
+
+
+def read_image_files(files, labels):
+    return tf.data.Dataset.from_tensor_slices((files, labels)).map(
+        lambda path, label: (tf.io.read_file(path), label),
+        num_parallel_calls=tf.data.experimental.AUTOTUNE)
+
+
+# Read the images of a subset from the TFRecord shards written by
+# preprocess_shards.py: an image is a validation image when its position
+# is in the first 30% of the images of its class, as in list_image_files
+def read_image_shards(data_folder, index, validation):
+    shard_files = [os.path.join(data_folder, shard['path'])
+                   for shard in index['shards']]
+    validation_counts = tf.constant(
+        [int(VALIDATION_SPLIT * count) for count in index['class_counts']],
+        dtype=tf.int64)
+    features = {'image': tf.io.FixedLenFeature([], tf.string),
+                'label': tf.io.FixedLenFeature([], tf.int64),
+                'position': tf.io.FixedLenFeature([], tf.int64)}
+
+    def parse(record):
+        example = tf.io.parse_single_example(record, features)
+        return example['image'], example['label'], example['position']
+
+    def in_subset(image, label, position):
+        return (position < tf.gather(validation_counts, label)) == validation
+
+    dataset = tf.data.TFRecordDataset(
+        shard_files, num_parallel_reads=tf.data.experimental.AUTOTUNE)
+    dataset = dataset.map(parse).filter(in_subset)
+    return dataset.map(lambda image, label, position: (image, label))
+
+
+# Split the images into train and validation tf.data datasets,
+# with the same split as split_data. The images are read from the
+# TFRecord shards when the data folder has their index file,
+# else from the image files of its class subfolders
+def create_datasets(data_folder, preprocessing_args, cache=''):
+    img_size = (
+        preprocessing_args['image_size']['x'],
+        preprocessing_args['image_size']['y'])
+    batch_size = preprocessing_args['batch_size']
+
+    print("Getting Data...")
+    index_path = os.path.join(data_folder, SHARD_INDEX_FILENAME)
+    if os.path.exists(index_path):
+        with open(index_path) as index_file:
+            index = json.load(index_file)
+        classes = index['classes']
+        validation_count = sum(
+            int(VALIDATION_SPLIT * count) for count in index['class_counts'])
+        train_count = sum(index['class_counts']) - validation_count
+        train_images = read_image_shards(data_folder, index, False)
+        validation_images = read_image_shards(data_folder, index, True)
+        cache_key = [data_folder, json.dumps(index)]
+        print(f"Reading {len(index['shards'])} TFRecord shards")
+    else:
+        classes, training, validation = list_image_files(data_folder)
+        train_count, validation_count = len(training[0]), len(validation[0])
+        train_images = read_image_files(*training)
+        validation_images = read_image_files(*validation)
+        cache_key = training[0] + validation[0]
+    print(f"Found {train_count} training images and "
+          f"{validation_count} validation images "
+          f"belonging to {len(classes)} classes.")
+    print("class names: ", classes)
+
+    train_dataset = create_dataset(
+        train_images, train_count, classes, img_size, batch_size,
+        get_cache_path(cache, 'training', img_size, *cache_key),
+        shuffle=True)
+    validation_dataset = create_dataset(
+        validation_images, validation_count, classes, img_size, batch_size,
+        get_cache_path(cache, 'validation', img_size, *cache_key),
+        shuffle=False)
+
+    data = {"train": train_dataset,
+            "test": validation_dataset,
+            "classes": classes,
+            "image_shape": img_size + (3,),
+            "train_steps": None,
+            "validation_steps": None}
     return data
 
 
 # Train the model, return the model
 def train_model(data, train_args, preprocessing_args):
-    train_generator = data['train']
-    validation_generator = data['test']
-    batch_size = preprocessing_args['batch_size']
 
     # Define a CNN classifier network
     # Define the model as a sequence of layers
@@ -88,7 +253,7 @@ def train_model(data, train_args, preprocessing_args):
     model.add(Conv2D(
                 24,
                 (6, 6),
-                input_shape=train_generator.image_shape,
+                input_shape=data['image_shape'],
                 activation='relu'))
 
     # Next we'll add a max pooling layer with a 2x2 patch
@@ -111,7 +276,7 @@ def train_model(data, train_args, preprocessing_args):
     # Now we'll flatten the feature maps and generate an output
     # layer with a predicted probability for each class
     model.add(Flatten())
-    model.add(Dense(train_generator.num_classes, activation='softmax'))
+    model.add(Dense(len(data['classes']), activation='softmax'))
 
     # With the layers defined, we can now compile the model
     # for categorical (multi-class) classification
@@ -121,11 +286,11 @@ def train_model(data, train_args, preprocessing_args):
                   metrics=['accuracy'])
 
     num_epochs = train_args['num_epochs']
-    history = model.fit_generator(
-        train_generator,
-        steps_per_epoch=train_generator.samples // batch_size,
-        validation_data=validation_generator,
-        validation_steps=validation_generator.samples // batch_size,
+    history = model.fit(
+        data['train'],
+        steps_per_epoch=data['train_steps'],
+        validation_data=data['test'],
+        validation_steps=data['validation_steps'],
         epochs=num_epochs)
 
     return model, history
@@ -145,13 +310,13 @@ def get_model_metrics(history):
 def main():
     print("Running train.py")
 
-    train_args = {"num_epochs": 10}
+    train_args = {"num_epochs": 10, "input_pipeline": "tf.data"}
     preprocessing_args = {
         "image_size": {"x": 128, "y": 128},
         "batch_size": 30}
 
     data_dir = "data/processed"
-    data = split_data(data_dir, preprocessing_args)
+    data = split_data(data_dir, preprocessing_args, train_args)
     model, history = train_model(data, train_args, preprocessing_args)
 
     metrics = get_model_metrics(history)
@@ -129,7 +129,8 @@ def main():
     mount_context = dataset.mount()
     mount_context.start()
     print(f"mount_point is: {mount_context.mount_point}")
-    data = split_data(mount_context.mount_point, preprocessing_args)
+    data = split_data(
+        mount_context.mount_point, preprocessing_args, training_args)
     model, history = train_model(data, training_args, preprocessing_args)
     mount_context.stop()
 
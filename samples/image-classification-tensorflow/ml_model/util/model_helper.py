@@ -1,10 +1,68 @@
 """
 model_helper.py
 """
+import time
 from azureml.core import Run
 from azureml.core import Workspace, Dataset, Datastore
 from azureml.core.model import Model as AMLModel
 
+# Seconds the runs and metrics fetched from the workspace are kept
+CACHE_TTL_SECONDS = 300
+_cache = {}
+
+
+def get_cached(key, fetch, ttl=CACHE_TTL_SECONDS):
+    """
+    Returns the value cached for key if it is less than ttl seconds old,
+    else fetches, caches and returns it.
+    """
+    now = time.monotonic()
+    cached = _cache.get(key)
+    if cached is not None and now - cached[0] < ttl:
+        return cached[1]
+    value = fetch()
+    _cache[key] = (now, value)
+    return value
+
+
+def get_run(experiment, run_id, runs=None):
+    """
+    Retrieves and returns a run by its ID, with a single request. When the
+    run can't be fetched by its ID, it is searched in runs, a function
+    returning the runs to search, by default the runs of the experiment.
+    Returns None when the run is not found.
+    """
+    def fetch():
+        try:
+            return Run(experiment, run_id)
+        except Exception as ex:
+            print(f"Could not fetch run {run_id}: {ex}, searching the runs")
+            search_runs = runs() if runs is not None \
+                else experiment.get_runs()
+            return next((r for r in search_runs if r.id == run_id), None)
+
+    return get_cached(('run', run_id), fetch)
+
+
+def get_child_run(parent_run, child_run_id):
+    """
+    Retrieves and returns a child run of parent_run by its ID, or None.
+    """
+    run = get_run(
+        parent_run.experiment, child_run_id, parent_run.get_children)
+    if run is None or get_parent_run(run) is None or \
+            get_parent_run(run).id != parent_run.id:
+        return None
+    return run
+
+
+def get_parent_run(run):
+    return get_cached(('parent', run.id), lambda: run.parent)
+
+
+def get_run_metrics(run):
+    return get_cached(('metrics', run.id), run.get_metrics)
+
 
 def get_aml_context(run):
     if (run.id.startswith('OfflineRun')):